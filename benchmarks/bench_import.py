@@ -0,0 +1,64 @@
+import sys
+import time
+import subprocess
+
+
+# The time budget (in seconds) for ``import geowombat`` in a new interpreter, which
+# includes importing ``xarray`` to register the ``.gw`` accessors
+IMPORT_BUDGET = 1.0
+
+# Heavy packages that ``import geowombat`` should not import
+DEFERRED_MODULES = ['rasterio', 'geopandas', 'scipy', 'sklearn', 'cv2', 'arosics']
+
+
+def _run(code):
+
+    start = time.perf_counter()
+
+    proc = subprocess.run([sys.executable, '-c', code],
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE,
+                          check=True)
+
+    return time.perf_counter() - start, proc.stdout.decode('utf-8')
+
+
+class Import(object):
+
+    """
+    Importing geowombat in a new interpreter, as in short scripts and worker processes
+    """
+
+    timeout = 120
+
+    def timeraw_import_geowombat(self):
+        return 'import geowombat'
+
+    def timeraw_import_open(self):
+        return 'import geowombat as gw; gw.open'
+
+    def track_import_seconds(self):
+
+        # Subtract the interpreter start-up time
+        base_seconds = min(_run('pass')[0] for __ in range(3))
+        import_seconds = min(_run('import geowombat')[0] for __ in range(3)) - base_seconds
+
+        assert import_seconds < IMPORT_BUDGET, \
+            'import geowombat took {:.2f} seconds, over the budget of {:.2f} seconds'.format(import_seconds, IMPORT_BUDGET)
+
+        return import_seconds
+
+    track_import_seconds.unit = 'seconds'
+
+    def track_deferred_modules(self):
+
+        __, stdout = _run('import sys; import geowombat; '
+                          'print(",".join(m for m in {} if m in sys.modules))'.format(DEFERRED_MODULES))
+
+        imported = [m for m in stdout.strip().split(',') if m]
+
+        assert not imported, 'import geowombat imported {}'.format(', '.join(imported))
+
+        return len(imported)
+
+    track_deferred_modules.unit = 'modules'
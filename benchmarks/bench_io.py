@@ -0,0 +1,109 @@
+import geowombat as gw
+
+from .common import TempDir, write_raster, write_stack, write_tiles
+
+
+class OpenStack(object):
+
+    """
+    Opening and reading a time stack of files
+    """
+
+    params = [2, 8]
+    param_names = ['n_files']
+
+    def setup(self, n_files):
+
+        self.tmp = TempDir()
+        self.files = write_stack(self.tmp, n_files=n_files)
+
+    def teardown(self, n_files):
+        self.tmp.cleanup()
+
+    def time_open(self, n_files):
+
+        with gw.open(self.files, stack_dim='time'):
+            pass
+
+    def time_open_read(self, n_files):
+
+        with gw.open(self.files, stack_dim='time') as src:
+            src.data.max().compute()
+
+    def peakmem_open_read(self, n_files):
+
+        with gw.open(self.files, stack_dim='time') as src:
+            src.data.max().compute()
+
+
+class ToRaster(object):
+
+    """
+    Writing with each ``to_raster`` scheduler
+    """
+
+    params = (['mpool', 'processes', 'threads'], [False, True])
+    param_names = ['scheduler', 'pipeline']
+    timeout = 300
+
+    def setup(self, scheduler, pipeline):
+
+        self.tmp = TempDir()
+        self.in_file = write_raster(self.tmp.file('input.tif'), nrows=2048, ncols=2048)
+        self.out_file = self.tmp.file('output.tif')
+
+    def teardown(self, scheduler, pipeline):
+        self.tmp.cleanup()
+
+    def _write(self, scheduler, pipeline):
+
+        with gw.open(self.in_file, chunks=256) as src:
+
+            gw.to_raster(src,
+                         self.out_file,
+                         dtype='uint16',
+                         scheduler=scheduler,
+                         n_workers=4,
+                         n_threads=1,
+                         pipeline=pipeline,
+                         overwrite=True)
+
+    def time_to_raster(self, scheduler, pipeline):
+        self._write(scheduler, pipeline)
+
+    def peakmem_to_raster(self, scheduler, pipeline):
+        self._write(scheduler, pipeline)
+
+
+class MosaicConcat(object):
+
+    """
+    Mosaicking overlapping tiles and concatenating a stack
+    """
+
+    params = [2, 8]
+    param_names = ['n_files']
+
+    def setup(self, n_files):
+
+        self.tmp = TempDir()
+        self.tiles = write_tiles(self.tmp, n_tiles=n_files)
+        self.stack = write_stack(self.tmp, n_files=n_files, nrows=512, ncols=512)
+
+    def teardown(self, n_files):
+        self.tmp.cleanup()
+
+    def time_mosaic(self, n_files):
+
+        with gw.open(self.tiles, mosaic=True) as src:
+            src.data.max().compute()
+
+    def peakmem_mosaic(self, n_files):
+
+        with gw.open(self.tiles, mosaic=True) as src:
+            src.data.max().compute()
+
+    def time_concat(self, n_files):
+
+        with gw.open(self.stack, stack_dim='band') as src:
+            src.data.max().compute()
@@ -0,0 +1,122 @@
+import geowombat as gw
+
+from .common import TempDir, L8_BANDS, write_raster, random_points, random_boxes, class_values
+
+
+class ExtractSample(object):
+
+    """
+    Extracting values at points and sampling
+    """
+
+    params = [100, 10000]
+    param_names = ['n']
+    timeout = 300
+
+    def setup(self, n):
+
+        self.tmp = TempDir()
+        self.in_file = write_raster(self.tmp.file('input.tif'))
+        self.points = random_points(n)
+
+    def teardown(self, n):
+        self.tmp.cleanup()
+
+    def time_extract(self, n):
+
+        with gw.open(self.in_file) as src:
+            gw.extract(src, self.points, n_jobs=1)
+
+    def peakmem_extract(self, n):
+
+        with gw.open(self.in_file) as src:
+            gw.extract(src, self.points, n_jobs=1)
+
+    def time_sample(self, n):
+
+        with gw.open(self.in_file) as src:
+            gw.sample(src, n=n, verbose=0)
+
+
+class Moving(object):
+
+    """
+    Moving window statistics
+    """
+
+    params = (['mean', 'std', 'var', 'min', 'max', 'perc'], [3, 7, 15])
+    param_names = ['stat', 'w']
+    timeout = 300
+
+    def setup(self, stat, w):
+
+        self.tmp = TempDir()
+        self.in_file = write_raster(self.tmp.file('input.tif'), nbands=1, dtype='float64')
+
+    def teardown(self, stat, w):
+        self.tmp.cleanup()
+
+    def time_moving(self, stat, w):
+
+        with gw.open(self.in_file) as src:
+            gw.moving(src, stat=stat, w=w, n_jobs=1).data.compute()
+
+
+class VegetationIndices(object):
+
+    """
+    Vegetation indices
+    """
+
+    params = ['avi', 'evi', 'evi2', 'nbr', 'ndvi', 'wi']
+    param_names = ['index']
+
+    def setup(self, index):
+
+        self.tmp = TempDir()
+        self.in_file = write_raster(self.tmp.file('input.tif'), nbands=len(L8_BANDS))
+
+    def teardown(self, index):
+        self.tmp.cleanup()
+
+    def time_index(self, index):
+
+        with gw.config.update(sensor='l8', scale_factor=0.0001):
+
+            with gw.open(self.in_file, band_names=L8_BANDS) as src:
+                getattr(gw, index)(src).data.compute()
+
+
+class Conversion(object):
+
+    """
+    Vector to raster and raster to vector conversion
+    """
+
+    params = [1, 4]
+    param_names = ['num_workers']
+    timeout = 300
+
+    def setup(self, num_workers):
+
+        self.tmp = TempDir()
+        self.class_file = write_raster(self.tmp.file('classes.tif'), nbands=1, dtype='uint8', values=class_values())
+        self.polygons = random_boxes(1000)
+
+    def teardown(self, num_workers):
+        self.tmp.cleanup()
+
+    def time_polygon_to_array(self, num_workers):
+
+        with gw.open(self.class_file) as src:
+            gw.polygon_to_array(self.polygons, data=src).data.compute(num_workers=num_workers)
+
+    def time_array_to_polygon(self, num_workers):
+
+        with gw.open(self.class_file) as src:
+            gw.array_to_polygon(src, num_workers=num_workers)
+
+    def peakmem_array_to_polygon(self, num_workers):
+
+        with gw.open(self.class_file) as src:
+            gw.array_to_polygon(src, num_workers=num_workers)
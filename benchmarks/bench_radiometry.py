@@ -0,0 +1,90 @@
+import numpy as np
+import geowombat as gw
+from geowombat.radiometry import BRDF, QAMasker
+
+from .common import TempDir, write_raster
+
+
+# The bands normalized by ``norm_brdf``
+BRDF_BANDS = ['blue', 'green', 'red', 'nir', 'swir1', 'swir2']
+
+
+def _angle_values(low, high, nrows=1024, ncols=1024):
+
+    # Angles are stored as degrees x 100
+    return np.linspace(low * 100, high * 100, nrows * ncols).reshape(1, nrows, ncols).astype('int16')
+
+
+class QAMask(object):
+
+    """
+    Converting bit-packed QA bands to masks
+    """
+
+    params = ['l8-c1', 'l-c1']
+    param_names = ['sensor']
+
+    def setup(self, sensor):
+
+        rng = np.random.RandomState(0)
+
+        self.tmp = TempDir()
+        self.qa_file = write_raster(self.tmp.file('qa.tif'),
+                                    nbands=1,
+                                    dtype='uint16',
+                                    values=rng.randint(0, 2**16, size=(1, 1024, 1024)).astype('uint16'))
+
+    def teardown(self, sensor):
+        self.tmp.cleanup()
+
+    def time_to_mask(self, sensor):
+
+        with gw.open(self.qa_file) as qa:
+            QAMasker(qa, sensor, ['fill', 'cloud', 'cloudconf', 'shadowconf']).to_mask().data.compute()
+
+
+class NormBRDF(object):
+
+    """
+    BRDF normalization
+    """
+
+    timeout = 300
+
+    def setup(self):
+
+        self.tmp = TempDir()
+        self.in_file = write_raster(self.tmp.file('input.tif'), nbands=len(BRDF_BANDS))
+        self.solarz = write_raster(self.tmp.file('solarz.tif'), nbands=1, dtype='int16', nodata=-32768, values=_angle_values(30, 40))
+        self.solara = write_raster(self.tmp.file('solara.tif'), nbands=1, dtype='int16', nodata=-32768, values=_angle_values(130, 150))
+        self.sensorz = write_raster(self.tmp.file('sensorz.tif'), nbands=1, dtype='int16', nodata=-32768, values=_angle_values(0, 7))
+        self.sensora = write_raster(self.tmp.file('sensora.tif'), nbands=1, dtype='int16', nodata=-32768, values=_angle_values(90, 110))
+
+    def teardown(self):
+        self.tmp.cleanup()
+
+    def _norm(self):
+
+        with gw.config.update(sensor='l8', scale_factor=0.0001):
+
+            with gw.open(self.solarz) as solarz, \
+                    gw.open(self.solara) as solara, \
+                    gw.open(self.sensorz) as sensorz, \
+                    gw.open(self.sensora) as sensora:
+
+                with gw.open(self.in_file, band_names=BRDF_BANDS) as src:
+
+                    BRDF().norm_brdf(src,
+                                     solarz,
+                                     solara,
+                                     sensorz,
+                                     sensora,
+                                     sensor='l8',
+                                     wavelengths=BRDF_BANDS,
+                                     scale_factor=0.0001).data.compute()
+
+    def time_norm_brdf(self):
+        self._norm()
+
+    def peakmem_norm_brdf(self):
+        self._norm()
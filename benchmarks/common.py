@@ -0,0 +1,179 @@
+"""
+Synthetic data for the benchmarks
+
+Every benchmark class creates its inputs in ``setup`` under a temporary directory,
+so the suite does not depend on downloaded imagery.
+"""
+
+import tempfile
+import shutil
+from pathlib import Path
+
+import numpy as np
+import rasterio as rio
+from rasterio.crs import CRS
+from affine import Affine
+import geopandas as gpd
+from shapely.geometry import Point, box
+
+
+CRS_UTM = CRS.from_epsg(32618)
+CELL_SIZE = 30.0
+LEFT = 300000.0
+TOP = 4500000.0
+BLOCK_SIZE = 256
+
+L8_BANDS = ['coastal', 'blue', 'green', 'red', 'nir', 'swir1', 'swir2']
+
+
+class TempDir(object):
+
+    """
+    A temporary directory for benchmark inputs and outputs
+    """
+
+    def __init__(self):
+        self.path = Path(tempfile.mkdtemp(prefix='gw_bench_'))
+
+    def file(self, name):
+        return str(self.path.joinpath(name))
+
+    def cleanup(self):
+        shutil.rmtree(str(self.path), ignore_errors=True)
+
+
+def write_raster(filename,
+                 nbands=3,
+                 nrows=1024,
+                 ncols=1024,
+                 dtype='uint16',
+                 left=LEFT,
+                 top=TOP,
+                 nodata=0,
+                 values=None,
+                 seed=0):
+
+    """
+    Writes a tiled GeoTiff of random values
+
+    Args:
+        filename (str): The output file.
+        nbands (Optional[int]): The number of bands.
+        nrows (Optional[int]): The number of rows.
+        ncols (Optional[int]): The number of columns.
+        dtype (Optional[str]): The data type.
+        left (Optional[float]): The left coordinate.
+        top (Optional[float]): The top coordinate.
+        nodata (Optional[int or float]): The 'no data' value.
+        values (Optional[ndarray]): Values to write instead of random values.
+        seed (Optional[int]): The random seed.
+
+    Returns:
+        ``str``
+    """
+
+    if values is None:
+
+        rng = np.random.RandomState(seed)
+
+        if np.issubdtype(np.dtype(dtype), np.floating):
+            values = rng.random_sample((nbands, nrows, ncols)).astype(dtype)
+        else:
+            values = rng.randint(1, 10000, size=(nbands, nrows, ncols)).astype(dtype)
+
+    with rio.open(filename,
+                  mode='w',
+                  driver='GTiff',
+                  width=ncols,
+                  height=nrows,
+                  count=values.shape[0],
+                  dtype=dtype,
+                  nodata=nodata,
+                  crs=CRS_UTM,
+                  transform=Affine(CELL_SIZE, 0.0, left, 0.0, -CELL_SIZE, top),
+                  tiled=True,
+                  blockxsize=BLOCK_SIZE,
+                  blockysize=BLOCK_SIZE) as dst:
+
+        dst.write(values)
+
+    return filename
+
+
+def write_stack(tmp, n_files=4, **kwargs):
+
+    """
+    Writes a stack of co-registered rasters
+
+    Returns:
+        ``list``
+    """
+
+    return [write_raster(tmp.file('stack_{:d}.tif'.format(i)), seed=i, **kwargs) for i in range(0, n_files)]
+
+
+def write_tiles(tmp, n_tiles=4, nrows=512, ncols=512, overlap=64, **kwargs):
+
+    """
+    Writes a row of overlapping tiles for mosaics
+
+    Returns:
+        ``list``
+    """
+
+    step = (ncols - overlap) * CELL_SIZE
+
+    return [write_raster(tmp.file('tile_{:d}.tif'.format(i)),
+                         nrows=nrows,
+                         ncols=ncols,
+                         left=LEFT + i * step,
+                         seed=i,
+                         **kwargs) for i in range(0, n_tiles)]
+
+
+def random_points(n, nrows=1024, ncols=1024, seed=0):
+
+    """
+    Creates random points within the synthetic raster extent
+
+    Returns:
+        ``geopandas.GeoDataFrame``
+    """
+
+    rng = np.random.RandomState(seed)
+
+    x = LEFT + rng.random_sample(n) * ncols * CELL_SIZE
+    y = TOP - rng.random_sample(n) * nrows * CELL_SIZE
+
+    return gpd.GeoDataFrame(data=np.arange(0, n), columns=['id'], geometry=[Point(xx, yy) for xx, yy in zip(x, y)], crs=CRS_UTM.to_wkt())
+
+
+def random_boxes(n, size=20, nrows=1024, ncols=1024, seed=0):
+
+    """
+    Creates random square polygons within the synthetic raster extent
+
+    Returns:
+        ``geopandas.GeoDataFrame``
+    """
+
+    pts = random_points(n, nrows=nrows, ncols=ncols, seed=seed)
+    half = size * CELL_SIZE / 2.0
+
+    return gpd.GeoDataFrame(data=pts[['id']].values, columns=['id'], geometry=[box(p.x - half, p.y - half, p.x + half, p.y + half) for p in pts.geometry], crs=CRS_UTM.to_wkt())
+
+
+def class_values(nrows=1024, ncols=1024, n_classes=8, patch=32, seed=0):
+
+    """
+    Creates a patchy class map for polygonizing
+
+    Returns:
+        3d ``numpy.ndarray``
+    """
+
+    rng = np.random.RandomState(seed)
+
+    coarse = rng.randint(1, n_classes+1, size=(nrows // patch + 1, ncols // patch + 1)).astype('uint8')
+
+    return np.kron(coarse, np.ones((patch, patch), dtype='uint8'))[np.newaxis, :nrows, :ncols]
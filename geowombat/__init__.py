@@ -1,43 +1,58 @@
 from . import config
-from .core.api import open
-from .core import extract
-from .core import sample
-from .core import calc_area
-from .core import subset
-from .core import clip
-from .core import mask
-from .core import replace
-from .core import recode
-from .core import coregister
-from .core import polygons_to_points
-from .core import apply
-from .core import to_crs
-from .core import transform_crs
-from .core import to_raster
-from .core import to_vrt
-from .core import to_geodataframe
-from .core import geodataframe_to_array
-from .core import array_to_polygon
-from .core import polygon_to_array
-from .core import moving
-from .core import norm_diff
-from .core import avi
-from .core import evi
-from .core import evi2
-from .core import nbr
-from .core import ndvi
-from .core import wi
-from .core import tasseled_cap
-from .core import coords_to_indices
-from .core import indices_to_coords
-from .core import lonlat_to_xy
-from .core import xy_to_lonlat
-
+from .lazy import lazy_attributes, lazy_accessor
 from .version import __version__
 
+import xarray as xr
+
+# The public API is imported on first use (e.g., ``gw.open``), so that
+# ``import geowombat`` stays fast for scripts and worker processes
+_LAZY_ATTRIBUTES = {'open': ('.core.api', 'open'),
+                    'extract': ('.core', 'extract'),
+                    'extract_timeseries': ('.core', 'extract_timeseries'),
+                    'sample': ('.core', 'sample'),
+                    'calc_area': ('.core', 'calc_area'),
+                    'subset': ('.core', 'subset'),
+                    'clip': ('.core', 'clip'),
+                    'mask': ('.core', 'mask'),
+                    'replace': ('.core', 'replace'),
+                    'recode': ('.core', 'recode'),
+                    'coregister': ('.core', 'coregister'),
+                    'polygons_to_points': ('.core', 'polygons_to_points'),
+                    'apply': ('.core', 'apply'),
+                    'to_crs': ('.core', 'to_crs'),
+                    'transform_crs': ('.core', 'transform_crs'),
+                    'to_raster': ('.core', 'to_raster'),
+                    'to_vrt': ('.core', 'to_vrt'),
+                    'composite': ('.core.compositing', 'composite'),
+                    'predict': ('.core.prediction', 'predict'),
+                    'to_geodataframe': ('.core', 'to_geodataframe'),
+                    'geodataframe_to_array': ('.core', 'geodataframe_to_array'),
+                    'array_to_polygon': ('.core', 'array_to_polygon'),
+                    'polygon_to_array': ('.core', 'polygon_to_array'),
+                    'moving': ('.core', 'moving'),
+                    'norm_diff': ('.core', 'norm_diff'),
+                    'avi': ('.core', 'avi'),
+                    'evi': ('.core', 'evi'),
+                    'evi2': ('.core', 'evi2'),
+                    'nbr': ('.core', 'nbr'),
+                    'ndvi': ('.core', 'ndvi'),
+                    'wi': ('.core', 'wi'),
+                    'tasseled_cap': ('.core', 'tasseled_cap'),
+                    'coords_to_indices': ('.core', 'coords_to_indices'),
+                    'indices_to_coords': ('.core', 'indices_to_coords'),
+                    'lonlat_to_xy': ('.core', 'lonlat_to_xy'),
+                    'xy_to_lonlat': ('.core', 'xy_to_lonlat')}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
+
+# The ``.gw`` accessors are registered on import, and the accessor classes are imported on first use
+xr.register_dataset_accessor('gw')(lazy_accessor(__name__, '.core.geoxarray', 'GeoWombatDatasetAccessor'))
+xr.register_dataarray_accessor('gw')(lazy_accessor(__name__, '.core.geoxarray', 'GeoWombatAccessor'))
+
 __all__ = ['config',
            'open',
            'extract',
+           'extract_timeseries',
            'sample',
            'calc_area',
            'subset',
@@ -52,6 +67,8 @@ __all__ = ['config',
            'transform_crs',
            'to_raster',
            'to_vrt',
+           'composite',
+           'predict',
            'to_geodataframe',
            'geodataframe_to_array',
            'array_to_polygon',
@@ -0,0 +1,322 @@
+import os
+import json
+import atexit
+import hashlib
+from pathlib import Path
+
+import psutil
+import rasterio as rio
+from rasterio.vrt import WarpedVRT
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# Leases held by this process, which are released when it exits
+_LEASES = set()
+
+
+def _release_leases():
+
+    for lease in _LEASES:
+
+        try:
+            os.remove(lease)
+        except OSError:
+            pass
+
+    _LEASES.clear()
+
+
+atexit.register(_release_leases)
+
+
+class WarpCache(object):
+
+    """
+    A size-bounded, on-disk cache of warped images
+
+    Each entry is a tiled, compressed GeoTiff of one source file warped to one target grid. Entries are
+    keyed by the source file identity (path, size and modification time), the target grid (CRS, transform
+    and shape), the resampling method and the 'no data' value, so a changed source file or grid creates
+    a new entry. When the cache exceeds ``max_size`` MB, the least recently used entries are removed.
+
+    Every entry that is handed out gets a lease for the current process, and entries with a lease of a
+    running process are never removed, because lazy arrays can reopen the file at any time. The leases are
+    released when the process exits. An entry larger than ``max_size`` is not kept, and its size is
+    recorded so that later calls do not warp it again.
+
+    Args:
+        cache_dir (str): The cache directory.
+        max_size (Optional[int]): The maximum cache size (in MB).
+
+    Example:
+        >>> import geowombat as gw
+        >>>
+        >>> # Warped inputs are cached on the first open and read from the cache afterwards
+        >>> with gw.config.update(ref_crs=4326, ref_res=0.0001, warp_cache='/tmp/gw_cache', warp_cache_mb=20000):
+        >>>     with gw.open(['image1.tif', 'image2.tif'], mosaic=True) as src:
+        >>>         pass
+    """
+
+    def __init__(self, cache_dir, max_size=10240):
+
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(filename, vrt_options):
+
+        """
+        Gets the cache key of a warp
+
+        Args:
+            filename (str): The source file.
+            vrt_options (dict): The ``rasterio.vrt.WarpedVRT`` options.
+
+        Returns:
+            ``str``
+        """
+
+        fstat = os.stat(filename)
+
+        key_items = dict(filename=str(Path(filename).resolve()),
+                         size=fstat.st_size,
+                         mtime=fstat.st_mtime_ns,
+                         crs=vrt_options['crs'].to_wkt(),
+                         transform=list(vrt_options['transform'])[:6],
+                         width=vrt_options['width'],
+                         height=vrt_options['height'],
+                         resampling=vrt_options['resampling'].name,
+                         nodata=vrt_options['nodata'])
+
+        return hashlib.sha1(json.dumps(key_items, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return self.cache_dir.joinpath('{}.tif'.format(key))
+
+    def oversize_path(self, key):
+        return self.cache_dir.joinpath('{}.oversize'.format(key))
+
+    def lease(self, entry):
+
+        """
+        Marks an entry as in use by the current process
+        """
+
+        lease = entry.with_name('{}.{:d}.lease'.format(entry.name, os.getpid()))
+        lease.touch()
+
+        _LEASES.add(str(lease))
+
+    def in_use(self, entry):
+
+        """
+        Checks whether a running process holds a lease on an entry, and removes the leases of stopped processes
+
+        Returns:
+            ``bool``
+        """
+
+        leased = False
+
+        for lease in entry.parent.glob('{}.*.lease'.format(entry.name)):
+
+            pid = int(lease.name.split('.')[-2])
+
+            if (pid == os.getpid()) or psutil.pid_exists(pid):
+                leased = True
+            else:
+
+                try:
+                    lease.unlink()
+                except OSError:
+                    pass
+
+        return leased
+
+    def is_oversize(self, key):
+
+        """
+        Checks whether an entry was found to be larger than the cache
+
+        Returns:
+            ``bool``
+        """
+
+        oversize = self.oversize_path(key)
+
+        if oversize.is_file():
+
+            try:
+                return int(oversize.read_text()) > self.max_size * 1024 * 1024
+            except ValueError:
+                return False
+
+        return False
+
+    def get(self, key):
+
+        """
+        Gets a cached file and marks it as recently used
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            ``str`` or ``None``
+        """
+
+        entry = self.path(key)
+
+        if entry.is_file():
+
+            try:
+
+                # Modification time tracks recent use
+                os.utime(str(entry))
+                self.lease(entry)
+
+            except OSError:
+                return None
+
+            # The entry could have been evicted before the lease was taken
+            if entry.is_file():
+                return str(entry)
+
+        return None
+
+    def put(self, key, src, vrt_options, blocksize=256):
+
+        """
+        Warps a source dataset into the cache, block by block
+
+        Args:
+            key (str): The cache key.
+            src (object): The open source ``rasterio`` dataset.
+            vrt_options (dict): The ``rasterio.vrt.WarpedVRT`` options.
+            blocksize (Optional[int]): The cache tile size.
+
+        Returns:
+            ``str``, or ``None`` if the warped image is larger than the cache
+        """
+
+        entry = self.path(key)
+        tmp_entry = entry.with_suffix('.{:d}.tmp'.format(os.getpid()))
+
+        with WarpedVRT(src, **vrt_options) as vrt:
+
+            profile = dict(driver='GTiff',
+                           width=vrt.width,
+                           height=vrt.height,
+                           count=vrt.count,
+                           dtype=vrt.dtypes[0],
+                           crs=vrt.crs,
+                           transform=vrt.transform,
+                           nodata=vrt.nodata,
+                           tiled=True,
+                           blockxsize=blocksize,
+                           blockysize=blocksize,
+                           compress='deflate',
+                           bigtiff='IF_SAFER')
+
+            with rio.open(tmp_entry, mode='w', **profile) as dst:
+
+                for ij, w in dst.block_windows(1):
+                    dst.write(vrt.read(window=w), window=w)
+
+        entry_size = tmp_entry.stat().st_size
+
+        if entry_size > self.max_size * 1024 * 1024:
+
+            logger.warning('  The warped image ({:.1f} MB) is larger than the warp cache ({:d} MB), so it will not be cached.'.format(entry_size / 1024.0 / 1024.0,
+                                                                                                                                  int(self.max_size)))
+
+            tmp_entry.unlink()
+            self.oversize_path(key).write_text(str(entry_size))
+
+            return None
+
+        # Other processes never see a partial entry
+        os.replace(str(tmp_entry), str(entry))
+
+        self.lease(entry)
+        self.evict(keep=key)
+
+        return str(entry)
+
+    def evict(self, keep=None):
+
+        """
+        Removes the least recently used entries until the cache fits within the maximum size
+
+        Entries that are leased by a running process are not removed.
+
+        Args:
+            keep (Optional[str]): A cache key that is never removed, e.g., the entry that was just added.
+        """
+
+        entries = [(f, f.stat()) for f in self.cache_dir.glob('*.tif')]
+        total_size = sum(fstat.st_size for f, fstat in entries)
+
+        keep_entry = self.path(keep) if keep else None
+
+        for f, fstat in sorted(entries, key=lambda x_: x_[1].st_mtime):
+
+            if total_size <= self.max_size * 1024 * 1024:
+                break
+
+            if (f == keep_entry) or self.in_use(f):
+                continue
+
+            try:
+
+                f.unlink()
+                total_size -= fstat.st_size
+
+            except OSError:
+                pass
+
+    def clear(self):
+
+        """
+        Removes all cache entries
+        """
+
+        for pattern in ['*.tif', '*.lease', '*.oversize']:
+
+            for f in self.cache_dir.glob(pattern):
+                f.unlink()
+
+
+def cached_warp(filename, src, vrt_options, cache_dir, max_size):
+
+    """
+    Gets a warped file from the cache, warping it into the cache first if needed
+
+    Args:
+        filename (str): The source file.
+        src (object): The open source ``rasterio`` dataset.
+        vrt_options (dict): The ``rasterio.vrt.WarpedVRT`` options.
+        cache_dir (str): The cache directory.
+        max_size (int): The maximum cache size (in MB).
+
+    Returns:
+        ``str``, or ``None`` if the warped image is larger than the cache
+    """
+
+    cache = WarpCache(cache_dir, max_size=max_size)
+
+    key = cache.key(filename, vrt_options)
+
+    entry = cache.get(key)
+
+    if (entry is None) and not cache.is_oversize(key):
+
+        logger.info('  Caching the warped image {} ...'.format(Path(filename).name))
+
+        entry = cache.put(key, src, vrt_options)
+
+    return entry
@@ -1,10 +1,17 @@
 import os
 import shutil
+import warnings
 from pathlib import Path
+import time
 from collections import namedtuple
-import threading
+from functools import lru_cache
+
+from ..config import config, lock, thread_budget
+from ..core.profiling import window_record
+from .cache_ import cached_warp
 
 import numpy as np
+from osgeo import gdal
 import rasterio as rio
 from rasterio.crs import CRS
 from rasterio.enums import Resampling
@@ -78,7 +85,7 @@ def to_gtiff(filename, data, window, indexes, transform, n_workers, separate, ta
                               width=window.width,
                               height=window.height)
 
-        for item in ['with_config', 'ignore_warnings', 'sensor', 'scale_factor', 'ref_image', 'ref_bounds', 'ref_crs', 'ref_res', 'ref_tar', 'l57_angles_path', 'l8_angles_path']:
+        for item in ['with_config', 'ignore_warnings', 'sensor', 'scale_factor', 'ref_image', 'ref_bounds', 'ref_crs', 'ref_res', 'ref_tar', 'l57_angles_path', 'l8_angles_path', 'chunk_mem', 'max_threads', 'warp_cache', 'warp_cache_mb']:
             if item in kwargs_copy:
                 del kwargs_copy[item]
 
@@ -103,7 +110,7 @@ def to_gtiff(filename, data, window, indexes, transform, n_workers, separate, ta
 
     else:
 
-        with threading.Lock():
+        with lock:
 
             with rio.open(group_path,
                           mode='r+',
@@ -114,6 +121,184 @@ def to_gtiff(filename, data, window, indexes, transform, n_workers, separate, ta
                            indexes=indexes)
 
 
+# Overview resampling methods that only need the pixels of one window
+BLOCK_OVERVIEW_METHODS = ['nearest', 'average', 'min', 'max', 'med']
+
+
+def downsample_block(data, factor, resampling='nearest', nodata=None):
+
+    """
+    Downsamples a block by an integer factor, as for one overview level
+
+    Partial cells on the bottom and right edges are reduced from the available pixels, which
+    matches the overview size of ceil(size / factor). As with ``GDAL`` overviews, 'nearest' takes the
+    upper left pixel of each cell and integer averages are rounded half up, so the levels match
+    ``BuildOverviews`` when the image size is a multiple of the factor.
+
+    Args:
+        data (ndarray): The block data, shaped (band, rows, columns).
+        factor (int): The overview factor.
+        resampling (Optional[str]): The resampling method. Choices are ['nearest', 'average', 'min', 'max', 'med'].
+        nodata (Optional[int or float]): The 'no data' value, which is excluded from reductions.
+
+    Returns:
+        ``numpy.ndarray``, shaped (band, ceil(rows / factor), ceil(columns / factor))
+    """
+
+    nbands, nrows, ncols = data.shape
+
+    orows = int(np.ceil(nrows / factor))
+    ocols = int(np.ceil(ncols / factor))
+
+    if resampling == 'nearest':
+
+        row_idx = np.arange(0, orows) * factor
+        col_idx = np.arange(0, ocols) * factor
+
+        return data[:, row_idx][:, :, col_idx]
+
+    block = data.astype('float64')
+
+    if nodata is not None:
+        block[data == nodata] = np.nan
+
+    block = np.pad(block,
+                   ((0, 0), (0, orows * factor - nrows), (0, ocols * factor - ncols)),
+                   mode='constant',
+                   constant_values=np.nan).reshape(nbands, orows, factor, ocols, factor)
+
+    reducer = dict(average=np.nanmean,
+                   min=np.nanmin,
+                   max=np.nanmax,
+                   med=np.nanmedian)[resampling]
+
+    with warnings.catch_warnings():
+
+        # All-missing cells
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        out = reducer(block, axis=(2, 4))
+
+    out = np.where(np.isnan(out), nodata if nodata is not None else 0, out)
+
+    if np.issubdtype(data.dtype, np.integer):
+        out = np.floor(out + 0.5)
+
+    return out.astype(data.dtype)
+
+
+def _get_overview(band, factor):
+
+    """
+    Gets the overview band of a ``GDAL`` band for a factor, or the band itself for a factor of 1
+    """
+
+    if factor == 1:
+        return band
+
+    xsize = int(np.ceil(band.XSize / factor))
+    ysize = int(np.ceil(band.YSize / factor))
+
+    for oidx in range(0, band.GetOverviewCount()):
+
+        overview = band.GetOverview(oidx)
+
+        if (overview.XSize == xsize) and (overview.YSize == ysize):
+            return overview
+
+    logger.exception('  The file does not have an overview with a factor of {:d}.'.format(factor))
+    raise ValueError
+
+
+def create_overviews(filename, factors):
+
+    """
+    Allocates empty internal overview levels in a GeoTiff, to be written window by window
+
+    Args:
+        filename (str): The file name.
+        factors (list): The overview factors.
+
+    Returns:
+        ``None``
+    """
+
+    dst = gdal.Open(str(filename), gdal.GA_Update)
+
+    # 'NONE' creates the levels without computing them
+    dst.BuildOverviews('NONE', list(factors))
+    dst = None
+
+
+def write_gdal_blocks(dst, blocks, factors, window, indexes):
+
+    """
+    Writes blocks of one full-resolution window to an open ``GDAL`` dataset
+
+    Args:
+        dst (object): A ``GDAL`` dataset opened in update mode.
+        blocks (list): The blocks to write, each shaped (band, rows, columns) or (rows, columns).
+        factors (list): The factor of each block, where 1 is the full resolution and other factors are overviews.
+        window (namedtuple): The full-resolution ``rasterio.window.Window`` object.
+        indexes (int | 1d array-like): The output band indices.
+
+    Returns:
+        ``None``
+    """
+
+    indexes = np.atleast_1d(indexes)
+
+    for block, factor in zip(blocks, factors):
+
+        if block.ndim == 2:
+            block = block[np.newaxis]
+
+        for bidx, band_index in enumerate(indexes):
+
+            _get_overview(dst.GetRasterBand(int(band_index)), factor).WriteArray(block[bidx],
+                                                                                 int(window.col_off // factor),
+                                                                                 int(window.row_off // factor))
+
+
+def copy_overviews(src_file, dst_file, factors, n_rows=1024):
+
+    """
+    Copies internal overview levels from one GeoTiff to another with the same dimensions
+
+    Args:
+        src_file (str): The file to copy from.
+        dst_file (str): The file to copy to.
+        factors (list): The overview factors.
+        n_rows (Optional[int]): The number of overview rows to copy at once.
+
+    Returns:
+        ``None``
+    """
+
+    create_overviews(dst_file, factors)
+
+    src = gdal.Open(str(src_file), gdal.GA_ReadOnly)
+    dst = gdal.Open(str(dst_file), gdal.GA_Update)
+
+    for band_index in range(1, src.RasterCount+1):
+
+        for factor in factors:
+
+            src_overview = _get_overview(src.GetRasterBand(band_index), factor)
+            dst_overview = _get_overview(dst.GetRasterBand(band_index), factor)
+
+            for row_off in range(0, src_overview.YSize, n_rows):
+
+                dst_overview.WriteArray(src_overview.ReadAsArray(0,
+                                                                 row_off,
+                                                                 src_overview.XSize,
+                                                                 min(n_rows, src_overview.YSize - row_off)),
+                                        0,
+                                        row_off)
+
+    src = None
+    dst = None
+
+
 class WriteDaskArray(object):
 
     """
@@ -128,6 +313,7 @@ class WriteDaskArray(object):
         keep_blocks (Optional[bool]): Whether to keep the blocks stored on disk.
             *Only used if ``separate`` = ``True``.
         gdal_cache (Optional[int]): The GDAL cache size (in MB).
+        profiler (Optional[WindowProfiler]): A profiler to add per-chunk write records to.
         kwargs (Optional[dict]): Other keyword arguments passed to ``rasterio``.
 
     Reference:
@@ -144,6 +330,7 @@ class WriteDaskArray(object):
                  out_block_type='zarr',
                  keep_blocks=False,
                  gdal_cache=512,
+                 profiler=None,
                  **kwargs):
 
         if out_block_type == 'zarr':
@@ -156,6 +343,7 @@ class WriteDaskArray(object):
         self.out_block_type = out_block_type
         self.keep_blocks = keep_blocks
         self.gdal_cache = gdal_cache
+        self.profiler = profiler
         self.kwargs = kwargs
 
         self.d_name, f_name = os.path.split(self.filename)
@@ -187,6 +375,8 @@ class WriteDaskArray(object):
 
     def __setitem__(self, key, item):
 
+        t0 = time.time()
+
         if len(key) == 3:
 
             index_range, y, x = key
@@ -286,6 +476,12 @@ class WriteDaskArray(object):
                            window=w,
                            indexes=indexes)
 
+        if self.profiler:
+
+            self.profiler.add(window_record('y{:09d}_x{:09d}'.format(y.start, x.start),
+                                            write=(t0, time.time()),
+                                            bytes_written=item.nbytes))
+
     def __enter__(self):
 
         if self.separate:
@@ -385,6 +581,136 @@ def check_crs(crs):
     return dst_crs
 
 
+def crs_key(crs):
+
+    """
+    Gets a hashable key for a CRS
+
+    Args:
+        crs (``CRS`` | int | dict | str | DataArray): The CRS, given as a ``rasterio`` or ``pyproj`` CRS instance, an EPSG
+            code, a dictionary, a string, or a ``DataArray`` with a 'crs' attribute.
+
+    Returns:
+        ``str``
+    """
+
+    if hasattr(crs, 'gw') and hasattr(crs, 'crs'):
+        crs = crs.crs
+
+    if isinstance(crs, pyproj.crs.crs.CRS):
+        return crs.srs
+    elif isinstance(crs, CRS):
+        return crs.to_wkt()
+    elif isinstance(crs, int):
+        return 'EPSG:{:d}'.format(crs)
+    elif isinstance(crs, dict):
+        return ' '.join(['+{}'.format(k) if v is True else '+{}={}'.format(k, v) for k, v in sorted(crs.items()) if v is not False])
+    elif isinstance(crs, str):
+        return crs.strip()
+    else:
+        logger.exception('  The CRS was not understood.')
+        raise TypeError
+
+
+@lru_cache(maxsize=128)
+def _pyproj_crs(key):
+    return pyproj.CRS.from_user_input(key)
+
+
+@lru_cache(maxsize=128)
+def _transformer(src_key, dst_key):
+
+    # A missing CRS is the geographic CRS of the other
+    src_crs = _pyproj_crs(dst_key).geodetic_crs if src_key is None else _pyproj_crs(src_key)
+    dst_crs = _pyproj_crs(src_key).geodetic_crs if dst_key is None else _pyproj_crs(dst_key)
+
+    return pyproj.Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+
+
+@lru_cache(maxsize=256)
+def _crs_keys_equal(key1, key2):
+
+    crs1 = _pyproj_crs(key1)
+    crs2 = _pyproj_crs(key2)
+
+    try:
+        return crs1.equals(crs2, ignore_axis_order=True)
+    except:
+        return crs1 == crs2
+
+
+def crs_equal(crs1, crs2):
+
+    """
+    Checks whether two CRSs are equal
+
+    Comparisons are cached, so repeated checks do not rebuild CRS objects.
+
+    Args:
+        crs1 (``CRS`` | int | dict | str | DataArray): The first CRS. See ``crs_key``.
+        crs2 (``CRS`` | int | dict | str | DataArray): The second CRS. See ``crs_key``.
+
+    Returns:
+        ``bool``
+    """
+
+    key1 = crs_key(crs1)
+    key2 = crs_key(crs2)
+
+    if key1 == key2:
+        return True
+
+    return _crs_keys_equal(key1, key2)
+
+
+def get_transformer(src_crs, dst_crs):
+
+    """
+    Gets a cached ``pyproj.Transformer`` with (x, y) axis order
+
+    Args:
+        src_crs (``CRS`` | int | dict | str | DataArray): The source CRS. If ``None``, the geographic CRS of ``dst_crs``
+            is used. See ``crs_key``.
+        dst_crs (``CRS`` | int | dict | str | DataArray): The destination CRS. If ``None``, the geographic CRS of
+            ``src_crs`` is used.
+
+    Returns:
+        ``pyproj.Transformer``
+
+    Example:
+        >>> from geowombat.backends.rasterio_ import get_transformer
+        >>>
+        >>> transformer = get_transformer('epsg:4326', 'epsg:32618')
+        >>> x, y = transformer.transform(lons, lats)
+    """
+
+    return _transformer(crs_key(src_crs) if src_crs is not None else None,
+                        crs_key(dst_crs) if dst_crs is not None else None)
+
+
+def transform_coords(x, y, src_crs, dst_crs):
+
+    """
+    Transforms arrays of coordinates between CRSs
+
+    Args:
+        x (float or 1d array-like): The x coordinates.
+        y (float or 1d array-like): The y coordinates.
+        src_crs (``CRS`` | int | dict | str | DataArray): The source CRS. See ``get_transformer``.
+        dst_crs (``CRS`` | int | dict | str | DataArray): The destination CRS.
+
+    Returns:
+        ``tuple`` of (x, y), as ``numpy.ndarray`` when arrays are given
+    """
+
+    if not np.isscalar(x):
+
+        x = np.asarray(x, dtype='float64')
+        y = np.asarray(y, dtype='float64')
+
+    return get_transformer(src_crs, dst_crs).transform(x, y)
+
+
 def unpack_bounding_box(bounds):
 
     """
@@ -703,7 +1029,8 @@ def warp(filename,
         tac (Optional[tuple]): Target aligned raster coordinates (x, y).
 
     Returns:
-        ``rasterio.vrt.WarpedVRT``
+        ``rasterio.vrt.WarpedVRT``, or the file name of the cached warp if the 'warp_cache' configuration
+        setting is a directory
     """
 
     with rio.open(filename) as src:
@@ -783,10 +1110,24 @@ def warp(filename,
                            'nodata': nodata,
                            'warp_mem_limit': warp_mem_limit,
                            'warp_extras': {'multi': True,
-                                           'warp_option': 'NUM_THREADS={:d}'.format(num_threads)}}
+                                           'warp_option': 'NUM_THREADS={:d}'.format(min(num_threads, thread_budget()))}}
+
+            output = None
+
+            if config['warp_cache'] and os.path.isfile(filename):
+
+                # Read the warped image from (or add it to) the on-disk cache.
+                #   Images that are larger than the cache are warped on the fly.
+                output = cached_warp(filename,
+                                     src,
+                                     vrt_options,
+                                     config['warp_cache'],
+                                     config['warp_cache_mb'])
+
+            if output is None:
 
-            with WarpedVRT(src, **vrt_options) as vrt:
-                output = vrt
+                with WarpedVRT(src, **vrt_options) as vrt:
+                    output = vrt
 
     return output
 
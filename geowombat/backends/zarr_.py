@@ -1,5 +1,8 @@
 from pathlib import Path
 
+import numpy as np
+import dask.array as da
+import xarray as xr
 import zarr
 import numcodecs
 
@@ -64,3 +67,135 @@ def to_zarr(filename, data, window, chunks, root=None):
     group.attrs['width'] = window.width
 
     return zarr_file
+
+
+def create_zarr(filename,
+                shape,
+                dtype,
+                chunks,
+                crs,
+                transform,
+                res,
+                nodata=None,
+                band_names=None,
+                tags=None):
+
+    """
+    Creates a single-array zarr store with a chunk grid aligned to the write windows
+
+    Args:
+        filename (str): The output zarr store.
+        shape (tuple): The array shape, given as (bands, rows, columns).
+        dtype (str): The array data type.
+        chunks (tuple): The array chunks, given as (bands, rows, columns). Each write window
+            should cover whole chunks so that concurrent writers never touch the same chunk.
+        crs (str): The coordinate reference system.
+        transform (tuple): The affine transform.
+        res (tuple): The cell resolution, given as (x, y).
+        nodata (Optional[int or float]): The 'no data' value, which is also used as the fill value.
+        band_names (Optional[list]): The band names.
+        tags (Optional[dict]): Tags to store with the array attributes.
+
+    Returns:
+        ``str``
+    """
+
+    root = zarr.open_group(filename, mode='w')
+
+    z = root.create_dataset('data',
+                            shape=shape,
+                            chunks=chunks,
+                            dtype=dtype,
+                            compressor=compressor,
+                            fill_value=nodata)
+
+    z.attrs['_ARRAY_DIMENSIONS'] = ['band', 'y', 'x']
+    z.attrs['crs'] = str(crs)
+    z.attrs['transform'] = [float(t) for t in tuple(transform)[:6]]
+    z.attrs['res'] = [float(r) for r in res]
+    z.attrs['nodata'] = nodata if nodata is None else float(nodata)
+
+    if band_names is not None:
+        z.attrs['band_names'] = np.asarray(band_names).tolist()
+
+    if tags:
+        z.attrs['tags'] = {str(k): str(v) for k, v in tags.items()}
+
+    return filename
+
+
+def write_zarr_window(filename, data, window):
+
+    """
+    Writes a window of data to a zarr store created with ``create_zarr``
+
+    Args:
+        filename (str): The zarr store.
+        data (ndarray): The data to write, shaped (rows, columns) or (bands, rows, columns).
+        window (namedtuple): A ``rasterio.window.Window`` object.
+
+    Returns:
+        ``str``
+    """
+
+    z = zarr.open_array(filename, mode='r+', path='data')
+
+    if len(data.shape) == 2:
+        data = data[np.newaxis]
+
+    z[:,
+      window.row_off:window.row_off+window.height,
+      window.col_off:window.col_off+window.width] = data
+
+    return filename
+
+
+def open_zarr(filename, band_names=None, chunks=None):
+
+    """
+    Opens a zarr store created with ``create_zarr`` as a ``xarray.DataArray``
+
+    Args:
+        filename (str): The zarr store.
+        band_names (Optional[list]): A list of band names. If not given, the stored band names are used.
+        chunks (Optional[int or tuple]): The ``dask`` chunks. If not given, the zarr chunks are used.
+
+    Returns:
+        ``xarray.DataArray``
+    """
+
+    z = zarr.open_array(filename, mode='r', path='data')
+
+    if isinstance(chunks, int):
+        chunks = (1, chunks, chunks)
+    elif isinstance(chunks, tuple) and (len(chunks) == 2):
+        chunks = (1,) + chunks
+
+    data = da.from_zarr(z, chunks=chunks if chunks else z.chunks)
+
+    cellx, __, left, __, celly, top = z.attrs['transform']
+
+    xcoords = left + (np.arange(0, z.shape[-1]) + 0.5) * cellx
+    ycoords = top - (np.arange(0, z.shape[-2]) + 0.5) * abs(celly)
+
+    if not band_names:
+        band_names = z.attrs['band_names'] if 'band_names' in z.attrs else list(range(1, z.shape[0]+1))
+
+    nodata = z.attrs['nodata']
+
+    attrs = dict(transform=tuple(z.attrs['transform']),
+                 crs=z.attrs['crs'],
+                 res=tuple(z.attrs['res']),
+                 is_tiled=np.uint8(1),
+                 nodatavals=tuple([np.nan if nodata is None else nodata] * z.shape[0]),
+                 filename=filename)
+
+    if 'tags' in z.attrs:
+        attrs.update(z.attrs['tags'])
+
+    return xr.DataArray(data,
+                        dims=('band', 'y', 'x'),
+                        coords={'band': band_names,
+                                'y': ycoords,
+                                'x': xcoords},
+                        attrs=attrs)
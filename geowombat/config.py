@@ -1,6 +1,7 @@
 import os
 import ast
 import configparser
+import threading
 
 
 config = {}
@@ -40,6 +41,82 @@ def _update_config(config_parser, config_dict):
 config = _update_config(config_parser, config)
 
 
+# A lock for operations that must be serialized between threads, such as
+#   concurrent writes to the same file. The lock is not shared between
+#   processes, so process pools must not write to the same file at once.
+lock = threading.RLock()
+
+
+def thread_budget(max_threads=None):
+
+    """
+    Gets the total number of threads that geowombat may use
+
+    Args:
+        max_threads (Optional[int]): The thread budget. If not given, the budget is taken from
+            the 'max_threads' configuration setting and then from the number of CPUs.
+
+    Returns:
+        ``int``
+
+    Example:
+        >>> import geowombat as gw
+        >>>
+        >>> with gw.config.update(max_threads=16):
+        >>>     print(gw.config.thread_budget())
+    """
+
+    if not isinstance(max_threads, int):
+        max_threads = config['max_threads'] if 'max_threads' in config else None
+
+    if isinstance(max_threads, int) and (max_threads > 0):
+        return max_threads
+
+    return os.cpu_count() or 1
+
+
+def allocate_threads(n_workers=1, n_threads=1, max_threads=None):
+
+    """
+    Allocates the thread budget among the worker pool, the ``dask`` threads of each worker
+    and the GDAL and BLAS threads of each ``dask`` thread
+
+    The threads left over for each ``dask`` thread are split between GDAL and BLAS (with at least
+    one thread each), rather than given to both.
+
+    Args:
+        n_workers (Optional[int]): The requested number of workers.
+        n_threads (Optional[int]): The requested number of ``dask`` threads per worker.
+        max_threads (Optional[int]): The thread budget. See ``thread_budget``.
+
+    Returns:
+        ``dict`` of 'n_workers', 'n_threads', 'gdal_threads' and 'blas_threads'
+
+    Example:
+        >>> import geowombat as gw
+        >>>
+        >>> gw.config.allocate_threads(n_workers=8, n_threads=4, max_threads=16)
+        {'n_workers': 8, 'n_threads': 2, 'gdal_threads': 1, 'blas_threads': 1}
+    """
+
+    budget = thread_budget(max_threads=max_threads)
+
+    n_workers = min(max(n_workers if isinstance(n_workers, int) else 1, 1), budget)
+    n_threads = min(max(n_threads if isinstance(n_threads, int) else 1, 1), max(budget // n_workers, 1))
+
+    # Threads left over for each dask thread
+    n_inner = max(budget // (n_workers * n_threads), 1)
+
+    # GDAL and BLAS share the inner threads
+    gdal_threads = max(n_inner // 2, 1)
+    blas_threads = max(n_inner - gdal_threads, 1)
+
+    return dict(n_workers=n_workers,
+                n_threads=n_threads,
+                gdal_threads=gdal_threads,
+                blas_threads=blas_threads)
+
+
 def _set_defaults(d):
 
     config_parser.read(config_file)
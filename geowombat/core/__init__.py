@@ -1,56 +1,66 @@
-from ..backends import to_crs
-from ..backends import transform_crs
-from .io import apply
-from .io import to_raster
-from .io import to_vrt
-from .sops import SpatialOperations
-from .conversion import Converters
-from .util import MapProcesses
-from .vi import VegetationIndices
-from .vi import TasseledCap
+from ..lazy import lazy_attributes
 
-# Imports intended for module level
-from .util import sort_images_by_date
+# Modules are imported on first use of an attribute, so that importing the
+# package does not import every dependency
+_LAZY_ATTRIBUTES = {'to_crs': ('..backends', 'to_crs'),
+                    'transform_crs': ('..backends', 'transform_crs'),
+                    'apply': ('.io', 'apply'),
+                    'to_raster': ('.io', 'to_raster'),
+                    'to_vrt': ('.io', 'to_vrt'),
+                    'composite': ('.compositing', 'composite'),
+                    'predict': ('.prediction', 'predict'),
+                    'SpatialOperations': ('.sops', 'SpatialOperations'),
+                    'Converters': ('.conversion', 'Converters'),
+                    'MapProcesses': ('.util', 'MapProcesses'),
+                    'VegetationIndices': ('.vi', 'VegetationIndices'),
+                    'TasseledCap': ('.vi', 'TasseledCap'),
+                    # Imports intended for module level
+                    'sort_images_by_date': ('.util', 'sort_images_by_date'),
+                    # Imports intended for package level
+                    'extract': ('.sops', 'SpatialOperations', 'extract'),
+                    'extract_timeseries': ('.sops', 'SpatialOperations', 'extract_timeseries'),
+                    'sample': ('.sops', 'SpatialOperations', 'sample'),
+                    'calc_area': ('.sops', 'SpatialOperations', 'calc_area'),
+                    'subset': ('.sops', 'SpatialOperations', 'subset'),
+                    'clip': ('.sops', 'SpatialOperations', 'clip'),
+                    'mask': ('.sops', 'SpatialOperations', 'mask'),
+                    'replace': ('.sops', 'SpatialOperations', 'replace'),
+                    'recode': ('.sops', 'SpatialOperations', 'recode'),
+                    'coregister': ('.sops', 'SpatialOperations', 'coregister'),
+                    'lonlat_to_xy': ('.conversion', 'Converters', 'lonlat_to_xy'),
+                    'xy_to_lonlat': ('.conversion', 'Converters', 'xy_to_lonlat'),
+                    'polygons_to_points': ('.conversion', 'Converters', 'polygons_to_points'),
+                    'indices_to_coords': ('.conversion', 'Converters', 'indices_to_coords'),
+                    'coords_to_indices': ('.conversion', 'Converters', 'coords_to_indices'),
+                    'dask_to_xarray': ('.conversion', 'Converters', 'dask_to_xarray'),
+                    'ndarray_to_xarray': ('.conversion', 'Converters', 'ndarray_to_xarray'),
+                    'array_to_polygon': ('.conversion', 'Converters', 'array_to_polygon'),
+                    'polygon_to_array': ('.conversion', 'Converters', 'polygon_to_array'),
+                    'geodataframe_to_array': ('.conversion', 'Converters', 'geodataframe_to_array'),
+                    'to_geodataframe': ('.conversion', 'Converters', 'to_geodataframe'),
+                    'moving': ('.util', 'MapProcesses', 'moving'),
+                    'norm_diff': ('.vi', 'VegetationIndices', 'norm_diff'),
+                    'avi': ('.vi', 'VegetationIndices', 'avi'),
+                    'evi': ('.vi', 'VegetationIndices', 'evi'),
+                    'evi2': ('.vi', 'VegetationIndices', 'evi2'),
+                    'nbr': ('.vi', 'VegetationIndices', 'nbr'),
+                    'ndvi': ('.vi', 'VegetationIndices', 'ndvi'),
+                    'wi': ('.vi', 'VegetationIndices', 'wi'),
+                    'tasseled_cap': ('.vi', 'TasseledCap', 'tasseled_cap')}
 
-# Imports intended for package level
-extract = SpatialOperations().extract
-sample = SpatialOperations().sample
-calc_area = SpatialOperations().calc_area
-subset = SpatialOperations().subset
-clip = SpatialOperations().clip
-mask = SpatialOperations().mask
-replace = SpatialOperations().replace
-recode = SpatialOperations().recode
-coregister = SpatialOperations().coregister
-lonlat_to_xy = Converters().lonlat_to_xy
-xy_to_lonlat = Converters().xy_to_lonlat
-polygons_to_points = Converters().polygons_to_points
-indices_to_coords = Converters().indices_to_coords
-coords_to_indices = Converters().coords_to_indices
-dask_to_xarray = Converters().dask_to_xarray
-ndarray_to_xarray = Converters().ndarray_to_xarray
-array_to_polygon = Converters().array_to_polygon
-polygon_to_array = Converters().polygon_to_array
-geodataframe_to_array = Converters().geodataframe_to_array
-to_geodataframe = Converters().to_geodataframe
-moving = MapProcesses().moving
-norm_diff = VegetationIndices().norm_diff
-avi = VegetationIndices().avi
-evi = VegetationIndices().evi
-evi2 = VegetationIndices().evi2
-nbr = VegetationIndices().nbr
-ndvi = VegetationIndices().ndvi
-wi = VegetationIndices().wi
-tasseled_cap = TasseledCap().tasseled_cap
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
 
 __all__ = ['apply',
            'to_crs',
            'transform_crs',
            'to_raster',
            'to_vrt',
+           'composite',
+           'predict',
            'to_geodataframe',
            'geodataframe_to_array',
            'extract',
+           'extract_timeseries',
            'sample',
            'calc_area',
            'subset',
@@ -4,9 +4,11 @@ import h5netcdf
 
 import warnings
 from pathlib import Path
+import threading
+import concurrent.futures
 
 from . import geoxarray
-from ..config import config, _set_defaults
+from ..config import config, _set_defaults, thread_budget
 from ..backends import concat as gw_concat
 from ..backends import mosaic as gw_mosaic
 from ..backends import warp_open
@@ -20,6 +22,12 @@ from rasterio.windows import from_bounds, Window
 import dask
 import dask.array as da
 
+try:
+    from ..backends.zarr_ import open_zarr
+    ZARR_INSTALLED = True
+except:
+    ZARR_INSTALLED = False
+
 import logging
 logger = logging.getLogger(__name__)
 warnings.filterwarnings('ignore')
@@ -42,7 +50,8 @@ IO_DICT = dict(rasterio=['.tif',
                          '.HDF',
                          '.h5',
                          '.H5'],
-               xarray=['.nc'])
+               xarray=['.nc'],
+               zarr=['.zarr'])
 
 
 def get_attrs(src, **kwargs):
@@ -93,6 +102,122 @@ def get_attrs(src, **kwargs):
     return ycoords, xcoords, attrs
 
 
+def _get_read_chunks(chunks, n_bands):
+
+    if isinstance(chunks, int):
+        return (1, chunks, chunks)
+    elif isinstance(chunks, tuple) and (len(chunks) < 3):
+        return (1,) + chunks
+    elif chunks is None:
+        return (n_bands, 256, 256)
+
+    return chunks
+
+
+def _block_aligned_windows(window, block_height, block_width):
+
+    """
+    Splits a window into sub-windows that are aligned to the file blocks
+
+    Args:
+        window (Window): The window to split.
+        block_height (int): The file block height.
+        block_width (int): The file block width.
+
+    Returns:
+        ``list`` of ``rasterio.windows.Window`` objects
+    """
+
+    def _edges(off, length, block_size):
+
+        # Offsets of the block boundaries inside the window
+        edges = [off] + list(range((off // block_size + 1) * block_size, off + length, block_size)) + [off + length]
+
+        return list(zip(edges[:-1], edges[1:]))
+
+    return [Window(col_off=c0, row_off=r0, width=c1-c0, height=r1-r0)
+            for r0, r1 in _edges(window.row_off, window.height, block_height)
+            for c0, c1 in _edges(window.col_off, window.width, block_width)]
+
+
+def read_blocks(fname, num_workers=1, **kwargs):
+
+    """
+    Reads a window into memory with concurrent block-aligned reads
+
+    Each thread opens its own dataset handle and writes its sub-windows
+    directly into a preallocated output array.
+
+    Args:
+        fname (str): The file to read.
+        num_workers (Optional[int]): The number of concurrent reader threads, capped by the thread budget.
+        kwargs (Optional[dict]): Keyword arguments passed to ``rasterio.read``. Only ``window``,
+            ``indexes`` and ``out_dtype`` are supported with concurrent reads. Other keywords
+            fall back to a single ``rasterio.read``.
+
+    Returns:
+        3d ``numpy.ndarray``
+    """
+
+    num_workers = min(num_workers, thread_budget())
+
+    with rio.open(fname) as src:
+
+        window = kwargs['window'] if 'window' in kwargs else Window(col_off=0, row_off=0, width=src.width, height=src.height)
+        indexes = kwargs['indexes'] if 'indexes' in kwargs else list(range(1, src.count+1))
+        out_dtype = kwargs['out_dtype'] if 'out_dtype' in kwargs else src.dtypes[0]
+        block_height, block_width = src.block_shapes[0]
+
+        in_bounds = (window.col_off >= 0) and (window.row_off >= 0) and \
+                    (window.col_off + window.width <= src.width) and \
+                    (window.row_off + window.height <= src.height)
+
+        if (num_workers == 1) or not in_bounds or set(kwargs.keys()).difference(['window', 'indexes', 'out_dtype']):
+
+            data = src.read(**kwargs)
+
+            return data[np.newaxis] if len(data.shape) == 2 else data
+
+    if isinstance(indexes, int):
+        indexes = [indexes]
+
+    out = np.empty((len(indexes), window.height, window.width), dtype=out_dtype)
+
+    thread_local = threading.local()
+    handles = []
+    handle_lock = threading.Lock()
+
+    def _read_sub_window(w):
+
+        if not hasattr(thread_local, 'src'):
+
+            thread_local.src = rio.open(fname)
+
+            with handle_lock:
+                handles.append(thread_local.src)
+
+        r0 = w.row_off - window.row_off
+        c0 = w.col_off - window.col_off
+
+        out[:, r0:r0+w.height, c0:c0+w.width] = thread_local.src.read(indexes=indexes,
+                                                                        window=w,
+                                                                        out_dtype=out_dtype)
+
+    try:
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+
+            for __ in executor.map(_read_sub_window, _block_aligned_windows(window, block_height, block_width)):
+                pass
+
+    finally:
+
+        for handle in handles:
+            handle.close()
+
+    return out
+
+
 @dask.delayed
 def read_delayed(fname, chunks, **kwargs):
 
@@ -143,8 +268,10 @@ def read(filename,
         bounds (Optional[1d array-like]): A bounding box to subset to, given as
             [minx, miny, maxx, maxy] or [left, bottom, right, top].
         chunks (Optional[tuple]): The data chunk size.
-        num_workers (Optional[int]): The number of parallel ``dask`` workers.
-        kwargs (Optional[dict]): Keyword arguments to pass to ``rasterio.write``.
+        num_workers (Optional[int]): The number of parallel workers. If ``filename`` is a ``str``, the window is
+            split into sub-windows aligned to the file blocks and read concurrently by ``num_workers`` threads.
+            If ``filename`` is a ``list``, the files are read by ``num_workers`` ``dask`` workers.
+        kwargs (Optional[dict]): Keyword arguments to pass to ``rasterio.read``.
 
     Returns:
         ``xarray.DataArray``
@@ -161,12 +288,20 @@ def read(filename,
             if bounds and ('window' not in kwargs):
                 kwargs['window'] = from_bounds(*bounds, transform=src.gw.transform)
 
+            if 'window' not in kwargs:
+                kwargs['window'] = Window(col_off=0, row_off=0, width=src.width, height=src.height)
+
+            # Integer offsets and lengths are needed for the preallocated output
+            kwargs['window'] = kwargs['window'].round_offsets(op='floor').round_lengths(op='ceil')
+
             ycoords, xcoords, attrs = get_attrs(src, **kwargs)
 
-        data = dask.compute(read_delayed(filename,
-                                         chunks,
-                                         **kwargs),
-                            num_workers=num_workers)[0]
+        data = read_blocks(filename,
+                           num_workers=num_workers,
+                           **kwargs)
+
+        data = da.from_array(data,
+                             chunks=_get_read_chunks(chunks, data.shape[0]))
 
         if not band_names:
             band_names = np.arange(1, data.shape[0]+1)
@@ -258,7 +393,10 @@ class open(object):
             from the file.
         num_workers (Optional[int]): The number of parallel workers for Dask if ``bounds``
             is given or ``window`` is given. Default is 1.
-        kwargs (Optional[dict]): Keyword arguments passed to the file opener.
+        kwargs (Optional[dict]): Keyword arguments passed to the file opener. If ``chunks`` = 'auto', the
+            chunk sizes are whole multiples of the file block size, sized so that one chunk across all bands
+            (and all files if ``filename`` is a ``list`` that is stacked) fits the 'chunk_mem' configuration
+            memory budget (in MB). The chosen chunks are stored in the 'auto_chunks' attribute.
 
     Returns:
         ``xarray.DataArray`` or ``xarray.Dataset``
@@ -303,6 +441,15 @@ class open(object):
         >>>     with gw.open(['image1.tif', 'image2.tif'], bounds_by='union') as ds:
         >>>         print(ds)
         >>>
+        >>> # Size chunks to a 256 MB memory budget
+        >>> with gw.config.update(chunk_mem=256):
+        >>>     with gw.open('image.tif', chunks='auto') as ds:
+        >>>         print(ds.attrs['auto_chunks'])
+        >>>
+        >>> # Open a zarr store written by ``geowombat.to_raster``
+        >>> with gw.open('image.zarr') as ds:
+        >>>     print(ds)
+        >>>
         >>> # Resample an image to 10m x 10m cell size
         >>> with gw.config.update(ref_crs=(10, 10)):
         >>>
@@ -350,8 +497,31 @@ class open(object):
         if return_as not in ['array', 'dataset']:
             logger.exception("  The `Xarray` object must be one of ['array', 'dataset']")
 
+        auto_chunks = False
+
         if 'chunks' in kwargs:
-            ch.check_chunktype(kwargs['chunks'], output='3d')
+
+            if isinstance(kwargs['chunks'], str) and (kwargs['chunks'] == 'auto'):
+
+                auto_chunks = True
+
+                # Chunks are sized to a memory budget in multiples of the file blocks
+                if isinstance(filename, str) and ('*' in filename):
+                    filename = parse_wildcard(filename)
+
+                if isinstance(filename, list):
+
+                    kwargs['chunks'] = ch.auto_chunks(filename[0],
+                                                      n_layers=1 if mosaic else len(filename))
+
+                elif get_file_extension(filename).f_ext.lower() in IO_DICT['rasterio']:
+                    kwargs['chunks'] = ch.auto_chunks(filename)
+
+                else:
+                    del kwargs['chunks']
+
+            else:
+                ch.check_chunktype(kwargs['chunks'], output='3d')
 
         if bounds or ('window' in kwargs and isinstance(kwargs['window'], Window)):
 
@@ -435,10 +605,21 @@ class open(object):
 
                 file_names = get_file_extension(filename)
 
-                if file_names.f_ext.lower() not in IO_DICT['rasterio'] + IO_DICT['xarray']:
+                if file_names.f_ext.lower() not in IO_DICT['rasterio'] + IO_DICT['xarray'] + IO_DICT['zarr']:
                     logger.exception('  The file format is not recognized.')
 
-                if file_names.f_ext.lower() in IO_DICT['rasterio']:
+                if file_names.f_ext.lower() in IO_DICT['zarr']:
+
+                    if not ZARR_INSTALLED:
+                        logger.exception('  zarr must be installed to open a zarr store.')
+                        raise ImportError
+
+                    # Open a zarr store written by ``to_raster``
+                    self.data = open_zarr(filename,
+                                          band_names=band_names,
+                                          chunks=kwargs['chunks'] if 'chunks' in kwargs else None)
+
+                elif file_names.f_ext.lower() in IO_DICT['rasterio']:
 
                     if 'chunks' not in kwargs:
 
@@ -461,6 +642,12 @@ class open(object):
                     with xr.open_dataset(filename, **kwargs) as src:
                         self.data = src
 
+        if auto_chunks and isinstance(self.data, xr.DataArray) and isinstance(self.data.data, da.Array):
+
+            # Record the chunk decision
+            self.data.attrs['auto_chunks'] = self.data.data.chunksize[-3:]
+            self.data.attrs['chunk_mem'] = config['chunk_mem']
+
     def __enter__(self):
         self.__is_context_manager = True
         self.data.gw.filenames = self.__filenames
@@ -0,0 +1,269 @@
+from .io import to_raster
+
+import numpy as np
+import xarray as xr
+import dask.array as da
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+COMPOSITE_METHODS = ['median', 'percentile', 'medoid', 'max_ndvi']
+
+
+def _medoid_index(block):
+
+    """
+    Gets the time index of the medoid of each pixel
+
+    The medoid is the observation with the smallest sum of Euclidean (band) distances to the
+    other valid observations.
+
+    Args:
+        block (4d array): The data, shaped (time, band, rows, columns), with missing values as NaNs.
+
+    Returns:
+        2d ``numpy.ndarray`` of time indices, shaped (rows, columns)
+    """
+
+    n_times = block.shape[0]
+
+    valid = ~np.isnan(block).any(axis=1)
+    dist_sums = np.full((n_times,) + block.shape[2:], np.inf, dtype='float64')
+
+    # Loop over dates so that memory stays at the size of the block
+    for i in range(0, n_times):
+
+        dist = np.sqrt(np.nansum((block - block[i][np.newaxis]) ** 2, axis=1))
+        dist_sums[i] = np.where(valid[i], np.where(valid, dist, 0).sum(axis=0), np.inf)
+
+    return dist_sums.argmin(axis=0)
+
+
+def _composite_block(block, mask_block=None, method='median', perc=50, nodata=None, red_idx=None, nir_idx=None, out_dtype='float32'):
+
+    """
+    Composites a spatial block across all dates
+
+    Args:
+        block (4d array): The data, shaped (time, band, rows, columns).
+        mask_block (Optional[4d array]): The mask, shaped (time, 1, rows, columns), where non-zero values are masked.
+        method (Optional[str]): The composite method.
+        perc (Optional[float]): The percentile when ``method`` = 'percentile'.
+        nodata (Optional[int or float]): The input and output 'no data' value.
+        red_idx (Optional[int]): The red band index when ``method`` = 'max_ndvi'.
+        nir_idx (Optional[int]): The NIR band index when ``method`` = 'max_ndvi'.
+        out_dtype (Optional[str]): The output data type.
+
+    Returns:
+        3d ``numpy.ndarray``, shaped (band, rows, columns)
+    """
+
+    data = block.astype('float32')
+
+    if nodata is not None:
+        data[block == nodata] = np.nan
+
+    if mask_block is not None:
+        data[np.broadcast_to(mask_block != 0, data.shape)] = np.nan
+
+    all_missing = np.isnan(data).all(axis=0)
+
+    if method == 'median':
+        out = np.nanmedian(data, axis=0)
+    elif method == 'percentile':
+        out = np.nanpercentile(data, perc, axis=0)
+    else:
+
+        if method == 'max_ndvi':
+
+            red = data[:, red_idx]
+            nir = data[:, nir_idx]
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ndvi = (nir - red) / (nir + red)
+
+            tidx = np.where(np.isnan(ndvi), -np.inf, ndvi).argmax(axis=0)
+
+        else:
+            tidx = _medoid_index(data)
+
+        out = np.take_along_axis(data, tidx[np.newaxis, np.newaxis], axis=0)[0]
+
+    out = np.where(all_missing, np.nan, out)
+
+    if nodata is not None:
+        out = np.where(np.isnan(out), nodata, out)
+
+    return out.astype(out_dtype)
+
+
+def composite(data,
+              filename=None,
+              method='median',
+              mask=None,
+              perc=50,
+              nodata=None,
+              red='red',
+              nir='nir',
+              chunks=512,
+              **kwargs):
+
+    """
+    Creates a temporal composite from a time stack, one spatial chunk at a time
+
+    Each spatial chunk is read across all dates, masked and reduced by a block kernel, so memory is bounded
+    by the chunk size x the number of dates rather than by the image size x the number of dates.
+
+    Args:
+        data (list or DataArray): A list of files to stack over time, or a DataArray shaped (time, band, y, x).
+        filename (Optional[str]): A file to write the composite to with ``geowombat.to_raster``. Required if
+            ``data`` is a list of files. If not given, the lazy composite is returned.
+        method (Optional[str]): The composite method. Choices are ['median', 'percentile', 'medoid', 'max_ndvi'].
+
+            median: The per-band median of valid observations
+            percentile: The per-band ``perc`` percentile of valid observations
+            medoid: The observation with the smallest sum of spectral distances to the other observations
+            max_ndvi: The observation with the maximum NDVI
+
+        mask (Optional[list or DataArray]): Masks for each date, given as a list of files or a DataArray shaped
+            (time, y, x) or (time, 1, y, x), where non-zero values are masked (e.g., from
+            ``geowombat.radiometry.QAMasker``).
+        perc (Optional[float]): The percentile when ``method`` = 'percentile'.
+        nodata (Optional[int or float]): The 'no data' value of the inputs and output.
+        red (Optional[str]): The red band name when ``method`` = 'max_ndvi'.
+        nir (Optional[str]): The NIR band name when ``method`` = 'max_ndvi'.
+        chunks (Optional[int]): The spatial chunk size when ``data`` is a list of files.
+        kwargs (Optional[dict]): Keyword arguments passed to ``geowombat.to_raster``.
+
+    Returns:
+        ``xarray.DataArray`` if ``filename`` is not given, otherwise ``None``
+
+    Examples:
+        >>> import geowombat as gw
+        >>>
+        >>> # Write a median composite of a list of images
+        >>> gw.composite(['image1.tif', 'image2.tif', 'image3.tif'], 'median.tif', n_workers=4)
+        >>>
+        >>> # Write a cloud-masked maximum NDVI composite
+        >>> with gw.config.update(sensor='l8'):
+        >>>     gw.composite(image_list, 'max_ndvi.tif', method='max_ndvi', mask=qa_mask_list, nodata=0)
+        >>>
+        >>> # Get a lazy medoid composite of an open stack
+        >>> with gw.open(image_list, stack_dim='time') as src:
+        >>>     result = gw.composite(src, method='medoid')
+    """
+
+    if method not in COMPOSITE_METHODS:
+        logger.exception('  The method must be one of {}.'.format(', '.join(COMPOSITE_METHODS)))
+        raise NameError
+
+    if isinstance(data, xr.DataArray):
+        return _composite_array(data, filename, method, mask, perc, nodata, red, nir, **kwargs)
+
+    if not filename:
+        logger.exception('  An output file must be given to composite a list of files.')
+        raise ValueError
+
+    # Imported here to avoid a circular import with the accessors
+    from .api import open as gw_open
+
+    with gw_open(data, stack_dim='time', chunks=chunks) as src:
+
+        if isinstance(mask, list):
+
+            with gw_open(mask, stack_dim='time', chunks=chunks) as mask_src:
+                _composite_array(src, filename, method, mask_src, perc, nodata, red, nir, **kwargs)
+
+        else:
+            _composite_array(src, filename, method, mask, perc, nodata, red, nir, **kwargs)
+
+
+def _composite_array(data, filename, method, mask, perc, nodata, red, nir, **kwargs):
+
+    if data.gw.ndims != 4:
+        logger.exception('  The data must be shaped (time, band, y, x).')
+        raise ValueError
+
+    band_names = data.band.values.tolist()
+
+    red_idx = None
+    nir_idx = None
+
+    if method == 'max_ndvi':
+
+        if (red not in band_names) or (nir not in band_names):
+            logger.exception('  The {} and {} bands are needed for a maximum NDVI composite.'.format(red, nir))
+            raise NameError
+
+        red_idx = band_names.index(red)
+        nir_idx = band_names.index(nir)
+
+    row_chunks = data.gw.row_chunks
+    col_chunks = data.gw.col_chunks
+
+    # Each task holds one spatial chunk across all dates
+    stack = data.data.rechunk((-1, -1, row_chunks, col_chunks))
+
+    if method in ['median', 'percentile']:
+        out_dtype = 'float32' if nodata is None else np.result_type('float32', np.min_scalar_type(nodata)).name
+    else:
+        out_dtype = data.dtype.name if nodata is not None else np.result_type(data.dtype, 'float32').name
+
+    if mask is not None:
+
+        mask_data = mask.data if isinstance(mask, xr.DataArray) else mask
+
+        if mask_data.ndim == 3:
+            mask_data = mask_data[:, np.newaxis]
+
+        mask_data = mask_data[:, :1].rechunk((-1, 1, row_chunks, col_chunks))
+
+        result = da.map_blocks(_composite_block,
+                               stack,
+                               mask_data,
+                               method=method,
+                               perc=perc,
+                               nodata=nodata,
+                               red_idx=red_idx,
+                               nir_idx=nir_idx,
+                               out_dtype=out_dtype,
+                               drop_axis=0,
+                               dtype=out_dtype)
+
+    else:
+
+        result = da.map_blocks(_composite_block,
+                               stack,
+                               method=method,
+                               perc=perc,
+                               nodata=nodata,
+                               red_idx=red_idx,
+                               nir_idx=nir_idx,
+                               out_dtype=out_dtype,
+                               drop_axis=0,
+                               dtype=out_dtype)
+
+    attrs = data.attrs.copy()
+
+    if nodata is not None:
+        attrs['nodatavals'] = (nodata,) * len(band_names)
+
+    result = xr.DataArray(data=result,
+                          dims=('band', 'y', 'x'),
+                          coords={'band': band_names,
+                                  'y': data.y,
+                                  'x': data.x},
+                          attrs=attrs)
+
+    if filename:
+
+        if nodata is not None:
+            kwargs['nodata'] = nodata
+
+        kwargs.setdefault('dtype', out_dtype)
+
+        to_raster(result, filename, **kwargs)
+
+    else:
+        return result
@@ -1,9 +1,12 @@
 import os
 import multiprocessing as multi
+import concurrent.futures
+from collections import defaultdict
 
-from ..backends.rasterio_ import check_crs
+from ..backends.rasterio_ import crs_equal, transform_coords
 from .util import sample_feature
 from .util import lazy_wombat
+from .windows import get_window_offsets
 
 import numpy as np
 import dask.array as da
@@ -13,10 +16,11 @@ import geopandas as gpd
 from rasterio.features import rasterize, shapes
 from rasterio.warp import aligned_target
 from rasterio.crs import CRS
+import fiona
 import shapely
-from shapely.geometry import Polygon
+from shapely.geometry import MultiPolygon, Polygon, mapping, shape
+from shapely.ops import unary_union
 from affine import Affine
-import pyproj
 from tqdm import tqdm
 from deprecated import deprecated
 
@@ -26,10 +30,262 @@ logger = logging.getLogger(__name__)
 shapely.speedups.enable()
 
 
+VECTOR_DRIVERS = {'.gpkg': 'GPKG',
+                  '.fgb': 'FlatGeobuf',
+                  '.shp': 'ESRI Shapefile',
+                  '.geojson': 'GeoJSON'}
+
+
 def _iter_func(a):
     return a
 
 
+def _polygonize_block(block, mask, transform, connectivity, edges):
+
+    """
+    Polygonizes one block of an array
+
+    Args:
+        block (2d array): The block to polygonize.
+        mask (2d array): The block mask, or None.
+        transform (tuple): The block affine transform.
+        connectivity (int): The pixel connectivity.
+        edges (tuple): The block (left, bottom, right, top) edges that are shared with a neighboring block,
+            given as coordinates, or None where the edge is the array edge.
+
+    Returns:
+        ``list`` of (geometry, value, touches seam) ``tuples``
+    """
+
+    results = []
+
+    for geom, value in shapes(block,
+                              mask=mask,
+                              connectivity=connectivity,
+                              transform=Affine(*transform[:6])):
+
+        # The exterior ring holds the polygon bounds
+        coords = np.array(geom['coordinates'][0])
+
+        xmin, ymin = coords.min(axis=0)
+        xmax, ymax = coords.max(axis=0)
+
+        on_seam = ((edges[0] is not None) and (xmin <= edges[0])) or \
+                  ((edges[1] is not None) and (ymin <= edges[1])) or \
+                  ((edges[2] is not None) and (xmax >= edges[2])) or \
+                  ((edges[3] is not None) and (ymax >= edges[3]))
+
+        results.append((geom, value, on_seam))
+
+    return results
+
+
+def _dissolve_seams(geoms, connectivity, affine):
+
+    """
+    Dissolves polygons of one value that were split by block seams
+
+    Args:
+        geoms (list): The seam polygons.
+        connectivity (int): The pixel connectivity.
+        affine (Affine): The array affine transform.
+
+    Returns:
+        ``list`` of geometries, one per feature
+    """
+
+    dissolved = unary_union(geoms)
+
+    parts = list(getattr(dissolved, 'geoms', [dissolved]))
+
+    if (connectivity != 8) or (len(parts) < 2):
+        return parts
+
+    # With 8-connectivity, parts that only touch diagonally at a pixel corner
+    #   belong to the same feature, so group parts that share a corner.
+    inverse = ~affine
+    parents = list(range(0, len(parts)))
+
+    def _find(pidx):
+
+        while parents[pidx] != pidx:
+
+            parents[pidx] = parents[parents[pidx]]
+            pidx = parents[pidx]
+
+        return pidx
+
+    corners = dict()
+
+    for pidx, part in enumerate(parts):
+
+        for ring in [part.exterior] + list(part.interiors):
+
+            for x, y in ring.coords:
+
+                col, row = inverse * (x, y)
+                corner = (int(round(col)), int(round(row)))
+
+                if corner in corners:
+                    parents[_find(pidx)] = _find(corners[corner])
+                else:
+                    corners[corner] = pidx
+
+    groups = defaultdict(list)
+
+    for pidx, part in enumerate(parts):
+        groups[_find(pidx)].append(part)
+
+    return [group[0] if len(group) == 1 else MultiPolygon(group) for group in groups.values()]
+
+
+class _SeamDissolver(object):
+
+    """
+    Dissolves polygons that were split by block seams as the blocks finish
+
+    Seam polygons of one value that touch are grouped into clusters. A cluster is dissolved and released
+    once every block within one pixel of its bounds is polygonized, because no later polygon can touch it.
+    Only the open clusters, which are usually near the blocks in progress, are held in memory. A feature
+    that spans many blocks (e.g., an ocean on a continental map) stays open until all of its blocks are
+    done, so memory grows with the number of seam polygons in the largest features.
+
+    Args:
+        affine (Affine): The array affine transform.
+        connectivity (int): The pixel connectivity.
+        shape (tuple): The array (rows, columns).
+        chunks (tuple): The block (rows, columns).
+    """
+
+    def __init__(self, affine, connectivity, shape, chunks):
+
+        self.affine = affine
+        self.inverse = ~affine
+        self.connectivity = connectivity
+        self.nrows, self.ncols = shape
+        self.row_chunks, self.col_chunks = chunks
+
+        self.done = set()
+
+        # {value: {cluster id: ([geometries], [geometry pixel bounds], cluster pixel bounds)}}
+        self.clusters = defaultdict(dict)
+        self.cluster_id = 0
+
+    def _pixel_bounds(self, geom):
+
+        left, bottom, right, top = geom.bounds
+
+        col1, row1 = self.inverse * (left, top)
+        col2, row2 = self.inverse * (right, bottom)
+
+        # The first and last pixel edges, as (row, row, column, column)
+        return (int(round(min(row1, row2))),
+                int(round(max(row1, row2))),
+                int(round(min(col1, col2))),
+                int(round(max(col1, col2))))
+
+    @staticmethod
+    def _touch(bounds1, bounds2):
+
+        return (bounds1[0] <= bounds2[1]) and (bounds2[0] <= bounds1[1]) and \
+               (bounds1[2] <= bounds2[3]) and (bounds2[2] <= bounds1[3])
+
+    def _is_closed(self, bounds):
+
+        # The blocks of the pixels within one pixel of the bounds
+        row_min = max(bounds[0] - 1, 0) // self.row_chunks
+        row_max = min(bounds[1], self.nrows - 1) // self.row_chunks
+        col_min = max(bounds[2] - 1, 0) // self.col_chunks
+        col_max = min(bounds[3], self.ncols - 1) // self.col_chunks
+
+        return all((i, j) in self.done for i in range(row_min, row_max + 1) for j in range(col_min, col_max + 1))
+
+    def add(self, geom, value):
+
+        """
+        Adds a seam polygon
+
+        Args:
+            geom (Polygon): The seam polygon.
+            value (float): The polygon value.
+        """
+
+        pixel_bounds = self._pixel_bounds(geom)
+
+        geoms = [geom]
+        geom_bounds = [pixel_bounds]
+        bounds = pixel_bounds
+
+        for cluster_id, (cluster_geoms, cluster_geom_bounds, cluster_bounds) in list(self.clusters[value].items()):
+
+            if not self._touch(pixel_bounds, cluster_bounds):
+                continue
+
+            if any(self._touch(pixel_bounds, gbounds) and geom.intersects(g)
+                   for g, gbounds in zip(cluster_geoms, cluster_geom_bounds)):
+
+                geoms += cluster_geoms
+                geom_bounds += cluster_geom_bounds
+
+                bounds = (min(bounds[0], cluster_bounds[0]),
+                          max(bounds[1], cluster_bounds[1]),
+                          min(bounds[2], cluster_bounds[2]),
+                          max(bounds[3], cluster_bounds[3]))
+
+                del self.clusters[value][cluster_id]
+
+        self.clusters[value][self.cluster_id] = (geoms, geom_bounds, bounds)
+        self.cluster_id += 1
+
+    def finish_block(self, w):
+
+        """
+        Marks a block as polygonized and dissolves the clusters that are closed
+
+        Args:
+            w (Window): The block window.
+
+        Returns:
+            ``list`` of (geometry, value) ``tuples``
+        """
+
+        self.done.add((w.row_off // self.row_chunks, w.col_off // self.col_chunks))
+
+        results = []
+
+        for value, clusters in self.clusters.items():
+
+            closed = [cluster_id for cluster_id, (__, __, bounds) in clusters.items() if self._is_closed(bounds)]
+
+            for cluster_id in closed:
+
+                geoms = clusters.pop(cluster_id)[0]
+
+                results += [(geom, value) for geom in _dissolve_seams(geoms, self.connectivity, self.affine)]
+
+        return results
+
+    def finish(self):
+
+        """
+        Dissolves the remaining clusters
+
+        Returns:
+            ``list`` of (geometry, value) ``tuples``
+        """
+
+        results = []
+
+        for value, clusters in self.clusters.items():
+
+            for geoms, __, __ in clusters.values():
+                results += [(geom, value) for geom in _dissolve_seams(geoms, self.connectivity, self.affine)]
+
+        self.clusters.clear()
+
+        return results
+
+
 class Converters(object):
 
     @staticmethod
@@ -39,8 +295,8 @@ class Converters(object):
         Converts from longitude and latitude to native map coordinates
 
         Args:
-            lon (float): The longitude to convert.
-            lat (float): The latitude to convert.
+            lon (float or 1d array-like): The longitude(s) to convert.
+            lat (float or 1d array-like): The latitude(s) to convert.
             dst_crs (str, object, or DataArray): The CRS to transform to. It can be provided as a string, a
                 CRS instance (e.g., ``pyproj.crs.CRS``), or a ``geowombat.DataArray``.
 
@@ -63,7 +319,8 @@ class Converters(object):
         if isinstance(dst_crs, xr.DataArray):
             dst_crs = dst_crs.crs
 
-        return pyproj.Proj(dst_crs)(lon, lat)
+        # Transformers are cached by CRS
+        return transform_coords(lon, lat, None, dst_crs)
 
     @staticmethod
     def xy_to_lonlat(x, y, dst_crs):
@@ -72,8 +329,8 @@ class Converters(object):
         Converts from native map coordinates to longitude and latitude
 
         Args:
-            x (float): The x coordinate to convert.
-            y (float): The y coordinate to convert.
+            x (float or 1d array-like): The x coordinate(s) to convert.
+            y (float or 1d array-like): The y coordinate(s) to convert.
             dst_crs (str, object, or DataArray): The CRS to transform to. It can be provided as a string, a
                 CRS instance (e.g., ``pyproj.crs.CRS``), or a ``geowombat.DataArray``.
 
@@ -96,7 +353,7 @@ class Converters(object):
         if isinstance(dst_crs, xr.DataArray):
             dst_crs = dst_crs.crs
 
-        return pyproj.Proj(dst_crs)(x, y, inverse=True)
+        return transform_coords(x, y, dst_crs, None)
 
     @staticmethod
     def indices_to_coords(col_index, row_index, transform):
@@ -361,12 +618,11 @@ class Converters(object):
             df[id_column] = df.index.values
 
 
-        df_crs = check_crs(df.crs).to_proj4()
-        data_crs = check_crs(data.crs).to_proj4()
-
         # Re-project the data to match the image CRS
-        if data_crs != df_crs:
-            df = df.to_crs(data_crs)
+        if not crs_equal(data.crs, df.crs):
+            df = df.to_crs(data.crs)
+
+        df_crs = df.crs
 
         if verbose > 0:
             logger.info('  Checking geometry validity ...')
@@ -395,7 +651,7 @@ class Converters(object):
 
             if isinstance(mask, gpd.GeoDataFrame):
 
-                if CRS.from_dict(mask.crs).to_proj4() != df_crs:
+                if not crs_equal(mask.crs, df_crs):
                     mask = mask.to_crs(df_crs)
 
             if verbose > 0:
@@ -486,23 +742,39 @@ class Converters(object):
         return dataframes
 
     @staticmethod
-    def array_to_polygon(data, mask=None, connectivity=4, num_workers=1):
+    def array_to_polygon(data,
+                         mask=None,
+                         connectivity=4,
+                         num_workers=1,
+                         filename=None,
+                         row_chunks=None,
+                         col_chunks=None):
 
         """
         Converts an ``xarray.DataArray` to a ``geopandas.GeoDataFrame``
 
+        The array is polygonized block by block, so only ``num_workers`` blocks are held in memory at once.
+        Polygons that touch a block seam are dissolved with their neighbors of the same value once the blocks
+        around them are processed, so only the seam polygons near the blocks in progress are held in memory.
+        Seam polygons of a feature that spans many blocks are held until all of its blocks are processed.
+        Interior rings (holes) are kept. With 8-connectivity, seam polygons that only
+        touch diagonally are returned as one ``MultiPolygon`` feature.
+
         Args:
             data (DataArray): The ``xarray.DataArray`` to convert.
-            mask (Optional[str, numpy ndarray, or rasterio Band object]): Must evaluate to bool (rasterio.bool_ or rasterio.uint8).
+            mask (Optional[str, numpy ndarray, or DataArray]): Must evaluate to bool (rasterio.bool_ or rasterio.uint8).
                 Values of False or 0 will be excluded from feature generation. Note well that this is the inverse sense from
-                Numpy's, where a mask value of True indicates invalid data in an array. If source is a Numpy masked array
-                and mask is None, the source's mask will be inverted and used in place of mask. if ``mask`` is equal to
+                Numpy's, where a mask value of True indicates invalid data in an array. If ``mask`` is equal to
                 'source', then ``data`` is used as the mask.
             connectivity (Optional[int]): Use 4 or 8 pixel connectivity for grouping pixels into features.
-            num_workers (Optional[int]): The number of parallel workers to send to ``dask.compute``.
+            num_workers (Optional[int]): The number of parallel processes used to polygonize blocks.
+            filename (Optional[str]): A vector file to stream the polygons to. The driver is taken from the
+                file extension. Choices are ['.gpkg', '.fgb', '.shp', '.geojson']. If given, nothing is returned.
+            row_chunks (Optional[int]): The block row size. Default is the ``data`` row chunk size.
+            col_chunks (Optional[int]): The block column size. Default is the ``data`` column chunk size.
 
         Returns:
-            ``geopandas.GeoDataFrame``
+            ``geopandas.GeoDataFrame`` with a 'value' column, or ``None`` if ``filename`` is given
 
         Example:
             >>> import geowombat as gw
@@ -513,6 +785,12 @@ class Converters(object):
             >>>     df = gw.array_to_polygon(src,
             >>>                              mask='source',
             >>>                              num_workers=8)
+            >>>
+            >>>     # Stream the polygons to a GeoPackage
+            >>>     gw.array_to_polygon(src,
+            >>>                         mask='source',
+            >>>                         num_workers=8,
+            >>>                         filename='polygons.gpkg')
         """
 
         if not hasattr(data.gw, 'transform'):
@@ -523,21 +801,145 @@ class Converters(object):
             logger.exception("  The data should have a 'crs' object.")
             raise AttributeError
 
-        if isinstance(mask, str):
+        if data.gw.ndims > 2:
 
-            if mask == 'source':
-                mask = data.astype('uint8').data.compute(num_workers=num_workers)
+            if data.gw.ndims == 3 and data.gw.nbands == 1:
+                data = data.squeeze(dim='band')
+            else:
+                logger.exception('  Only single-band arrays can be converted to polygons.')
+                raise ValueError
 
-        poly_objects = shapes(data.data.compute(num_workers=num_workers),
-                              mask=mask,
-                              connectivity=connectivity,
-                              transform=data.gw.transform)
+        if filename:
 
-        poly_geom = [Polygon(p[0]['coordinates'][0]) for p in poly_objects]
+            driver = VECTOR_DRIVERS.get(os.path.splitext(filename)[1].lower())
 
-        return gpd.GeoDataFrame(data=np.ones(len(poly_geom), dtype='uint8'),
-                                geometry=poly_geom,
-                                crs=data.crs)
+            if not driver:
+                logger.exception('  The vector file extension must be one of {}.'.format(', '.join(VECTOR_DRIVERS.keys())))
+                raise NameError
+
+        if not row_chunks:
+            row_chunks = data.gw.row_chunks
+
+        if not col_chunks:
+            col_chunks = data.gw.col_chunks
+
+        nrows = data.gw.nrows
+        ncols = data.gw.ncols
+        affine = Affine(*data.gw.transform)
+
+        windows = get_window_offsets(nrows,
+                                     ncols,
+                                     row_chunks,
+                                     col_chunks,
+                                     return_as='grid')
+
+        def _block_args(w):
+
+            row_slice = slice(w.row_off, w.row_off + w.height)
+            col_slice = slice(w.col_off, w.col_off + w.width)
+
+            block = data[row_slice, col_slice].data.compute(scheduler='threads')
+
+            if isinstance(mask, str):
+                mask_block = (block != 0).astype('uint8') if mask == 'source' else None
+            elif isinstance(mask, xr.DataArray):
+                mask_block = mask.squeeze().data[row_slice, col_slice]
+                mask_block = mask_block.compute() if isinstance(mask_block, da.Array) else mask_block
+            elif mask is not None:
+                mask_block = np.asarray(mask[row_slice, col_slice])
+            else:
+                mask_block = None
+
+            if mask_block is not None:
+                mask_block = mask_block.astype('uint8')
+
+            block_affine = affine * Affine.translation(w.col_off, w.row_off)
+
+            # Seam coordinates shared with neighboring blocks
+            edges = (block_affine.c if w.col_off > 0 else None,
+                     block_affine.f - w.height * data.gw.celly if w.row_off + w.height < nrows else None,
+                     block_affine.c + w.width * data.gw.cellx if w.col_off + w.width < ncols else None,
+                     block_affine.f if w.row_off > 0 else None)
+
+            return block, mask_block, tuple(block_affine)[:6], connectivity, edges
+
+        values = []
+        geometries = []
+        seams = _SeamDissolver(affine, connectivity, (nrows, ncols), (row_chunks, col_chunks))
+
+        if filename:
+
+            dst = fiona.open(filename,
+                             mode='w',
+                             driver=driver,
+                             crs_wkt=CRS.from_user_input(data.crs).to_wkt(),
+                             schema={'geometry': 'Polygon' if connectivity == 4 else 'Unknown',
+                                     'properties': {'value': 'float'}})
+
+        def _collect(geom, value):
+
+            if filename:
+                dst.write({'geometry': geom if isinstance(geom, dict) else mapping(geom),
+                           'properties': {'value': float(value)}})
+            else:
+                geometries.append(shape(geom) if isinstance(geom, dict) else geom)
+                values.append(value)
+
+        def _collect_block(w, results):
+
+            for geom, value, on_seam in results:
+
+                if on_seam:
+                    seams.add(shape(geom), value)
+                else:
+                    _collect(geom, value)
+
+            # Dissolve polygons that were split by block seams, once no other block can touch them
+            for geom, value in seams.finish_block(w):
+                _collect(geom, value)
+
+        try:
+
+            if num_workers > 1:
+
+                with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+
+                    futures = {}
+
+                    for w in tqdm(windows, total=len(windows)):
+
+                        # Bound the number of blocks held in memory
+                        if len(futures) >= num_workers * 2:
+
+                            done, __ = concurrent.futures.wait(list(futures.keys()),
+                                                               return_when=concurrent.futures.FIRST_COMPLETED)
+
+                            for future in done:
+                                _collect_block(futures.pop(future), future.result())
+
+                        futures[executor.submit(_polygonize_block, *_block_args(w))] = w
+
+                    for future in concurrent.futures.as_completed(futures):
+                        _collect_block(futures[future], future.result())
+
+            else:
+
+                for w in tqdm(windows, total=len(windows)):
+                    _collect_block(w, _polygonize_block(*_block_args(w)))
+
+            for geom, value in seams.finish():
+                _collect(geom, value)
+
+        finally:
+
+            if filename:
+                dst.close()
+
+        if not filename:
+
+            return gpd.GeoDataFrame(data={'value': values},
+                                    geometry=geometries,
+                                    crs=data.crs)
 
     @staticmethod
     @deprecated('Deprecated since 1.2.0. Use array_to_polygon() instead.')
@@ -0,0 +1,325 @@
+import math
+import concurrent.futures
+
+from ..config import thread_budget
+
+import numpy as np
+import xarray as xr
+from scipy.ndimage import distance_transform_edt, median_filter, map_coordinates
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+def phase_correlation(reference, target):
+
+    """
+    Estimates the sub-pixel translation between two windows with FFT phase correlation
+
+    Args:
+        reference (2d array): The reference window.
+        target (2d array): The target window, with the same shape as ``reference``.
+
+    Returns:
+        ``tuple`` of (row shift, column shift, peak quality), where ``target[y + row shift, x + column shift]``
+            matches ``reference[y, x]`` and the quality is the normalized correlation peak (0-1)
+    """
+
+    nrows, ncols = reference.shape
+
+    # Taper the edges to reduce wrap-around artifacts
+    taper = np.outer(np.hanning(nrows), np.hanning(ncols))
+
+    ref_fft = np.fft.fft2((reference - reference.mean()) * taper)
+    tar_fft = np.fft.fft2((target - target.mean()) * taper)
+
+    cross_power = np.conj(ref_fft) * tar_fft
+    cross_power /= np.maximum(np.abs(cross_power), 1e-12)
+
+    corr = np.fft.ifft2(cross_power).real
+
+    peak_row, peak_col = np.unravel_index(np.argmax(corr), corr.shape)
+
+    def _subpixel(c_minus, c_zero, c_plus):
+
+        # Parabolic peak interpolation
+        denom = c_minus - 2.0*c_zero + c_plus
+
+        return 0.0 if denom == 0 else 0.5 * (c_minus - c_plus) / denom
+
+    row_offset = _subpixel(corr[(peak_row-1) % nrows, peak_col], corr[peak_row, peak_col], corr[(peak_row+1) % nrows, peak_col])
+    col_offset = _subpixel(corr[peak_row, (peak_col-1) % ncols], corr[peak_row, peak_col], corr[peak_row, (peak_col+1) % ncols])
+
+    # Wrap to signed shifts
+    row_shift = peak_row - nrows if peak_row > nrows // 2 else peak_row
+    col_shift = peak_col - ncols if peak_col > ncols // 2 else peak_col
+
+    return row_shift + row_offset, col_shift + col_offset, float(corr[peak_row, peak_col])
+
+
+def _window_shift(reference, target, window, nodata, max_shift, min_quality):
+
+    """
+    Estimates the shift of one tie-point window
+
+    Returns:
+        ``tuple`` of (row shift, column shift), NaN if the window is not usable
+    """
+
+    row_off, col_off, height, width = window
+
+    ref_win = reference[row_off:row_off+height, col_off:col_off+width].compute(scheduler='synchronous').astype('float64')
+    tar_win = target[row_off:row_off+height, col_off:col_off+width].compute(scheduler='synchronous').astype('float64')
+
+    valid = np.isfinite(ref_win) & np.isfinite(tar_win)
+
+    if nodata is not None:
+        valid &= (ref_win != nodata) & (tar_win != nodata)
+
+    # Skip mostly empty or flat windows
+    if (valid.mean() < 0.9) or (ref_win[valid].std() == 0) or (tar_win[valid].std() == 0):
+        return np.nan, np.nan
+
+    ref_win[~valid] = ref_win[valid].mean()
+    tar_win[~valid] = tar_win[valid].mean()
+
+    row_shift, col_shift, quality = phase_correlation(ref_win, tar_win)
+
+    if (quality < min_quality) or (abs(row_shift) > max_shift) or (abs(col_shift) > max_shift):
+        return np.nan, np.nan
+
+    return row_shift, col_shift
+
+
+def _fill_field(field):
+
+    """
+    Fills missing tie points with the nearest valid tie point
+    """
+
+    missing = np.isnan(field)
+
+    if missing.any():
+
+        indices = distance_transform_edt(missing, return_distances=False, return_indices=True)
+        field = field[tuple(indices)]
+
+    return field
+
+
+def estimate_shift_field(target,
+                         reference,
+                         wsize=256,
+                         spacing=None,
+                         nodata=None,
+                         max_shift=5,
+                         min_quality=0.1,
+                         smooth=3,
+                         n_workers=1):
+
+    """
+    Estimates a smooth field of local shifts on a grid of tie-point windows
+
+    Args:
+        target (DataArray): The 2d target band.
+        reference (DataArray): The 2d reference band, on the same grid as ``target``.
+        wsize (Optional[int]): The tie-point window size (in pixels).
+        spacing (Optional[int]): The tie-point spacing (in pixels). Default is ``wsize``.
+        nodata (Optional[int or float]): The 'no data' value.
+        max_shift (Optional[float]): The maximum accepted shift (in pixels).
+        min_quality (Optional[float]): The minimum accepted correlation peak.
+        smooth (Optional[int]): The size of the median filter applied to the shift field, or 0 to not smooth.
+        n_workers (Optional[int]): The number of windows to correlate in parallel.
+
+    Returns:
+        ``tuple`` of (tie-point row centers, tie-point column centers, row shift grid, column shift grid),
+            or ``None`` if no tie points are usable
+    """
+
+    spacing = spacing if spacing else wsize
+
+    nrows, ncols = target.shape[-2:]
+
+    wsize = min(wsize, nrows, ncols)
+
+    row_offs = np.arange(0, max(nrows - wsize, 0) + 1, spacing)
+    col_offs = np.arange(0, max(ncols - wsize, 0) + 1, spacing)
+
+    windows = [(int(r), int(c), wsize, wsize) for r in row_offs for c in col_offs]
+
+    n_workers = min(n_workers, thread_budget())
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=n_workers) as executor:
+
+        shifts = list(executor.map(lambda w: _window_shift(reference.data, target.data, w, nodata, max_shift, min_quality),
+                                   windows))
+
+    row_shifts = np.array([s[0] for s in shifts], dtype='float64').reshape(row_offs.shape[0], col_offs.shape[0])
+    col_shifts = np.array([s[1] for s in shifts], dtype='float64').reshape(row_offs.shape[0], col_offs.shape[0])
+
+    n_valid = int(np.isfinite(row_shifts).sum())
+
+    logger.info('  {:,d} of {:,d} tie points were usable.'.format(n_valid, len(windows)))
+
+    if n_valid == 0:
+        return None
+
+    row_shifts = _fill_field(row_shifts)
+    col_shifts = _fill_field(col_shifts)
+
+    if smooth and (min(row_shifts.shape) >= smooth):
+
+        # Reject local outliers
+        row_shifts = median_filter(row_shifts, size=smooth, mode='nearest')
+        col_shifts = median_filter(col_shifts, size=smooth, mode='nearest')
+
+    return row_offs + wsize / 2.0, col_offs + wsize / 2.0, row_shifts, col_shifts
+
+
+def _apply_shift_block(block, row_starts, col_starts, halo, field_rows, field_cols, row_shifts, col_shifts, order, block_id=None):
+
+    """
+    Resamples one chunk with the interpolated shift field
+
+    Args:
+        block (3d array): The target chunk with ``halo`` overlapping pixels on each side.
+        row_starts (list): The first row of each row chunk.
+        col_starts (list): The first column of each column chunk.
+        halo (int): The overlap depth.
+        field_rows (1d array): The tie-point row centers.
+        field_cols (1d array): The tie-point column centers.
+        row_shifts (2d array): The tie-point row shifts.
+        col_shifts (2d array): The tie-point column shifts.
+        order (int): The spline order (0=nearest, 1=bilinear).
+        block_id (tuple): The chunk index.
+
+    Returns:
+        3d ``numpy.ndarray`` without the overlap
+    """
+
+    height = block.shape[1] - 2*halo
+    width = block.shape[2] - 2*halo
+
+    rows, cols = np.meshgrid(np.arange(row_starts[block_id[1]], row_starts[block_id[1]] + height, dtype='float64'),
+                             np.arange(col_starts[block_id[2]], col_starts[block_id[2]] + width, dtype='float64'),
+                             indexing='ij')
+
+    # Fractional tie-point indices of each pixel
+    field_coords = [np.interp(rows, field_rows, np.arange(0, field_rows.shape[0])),
+                    np.interp(cols, field_cols, np.arange(0, field_cols.shape[0]))]
+
+    dy = np.clip(map_coordinates(row_shifts, field_coords, order=1, mode='nearest'), -halo, halo)
+    dx = np.clip(map_coordinates(col_shifts, field_coords, order=1, mode='nearest'), -halo, halo)
+
+    local_rows, local_cols = np.meshgrid(np.arange(0, height, dtype='float64') + halo,
+                                         np.arange(0, width, dtype='float64') + halo,
+                                         indexing='ij')
+
+    sample_coords = [local_rows + dy, local_cols + dx]
+
+    out = np.empty((block.shape[0], height, width), dtype=block.dtype)
+
+    for bidx in range(0, block.shape[0]):
+
+        shifted = map_coordinates(block[bidx].astype('float64'), sample_coords, order=order, mode='nearest')
+
+        out[bidx] = np.round(shifted) if np.issubdtype(block.dtype, np.integer) else shifted
+
+    return out
+
+
+def tiled_coregister(target,
+                     reference,
+                     band=None,
+                     wsize=256,
+                     spacing=None,
+                     max_shift=5,
+                     min_quality=0.1,
+                     smooth=3,
+                     resampling='bilinear',
+                     nodata=None,
+                     n_workers=1):
+
+    """
+    Co-registers an image to a reference image with local shifts estimated on a grid of windows
+
+    Shifts are estimated by FFT phase correlation on tie-point windows in parallel, interpolated to a
+    smooth shift field and applied lazily to each chunk, so memory is bounded by the window and chunk sizes.
+
+    Args:
+        target (DataArray): The target ``xarray.DataArray``, shaped (band, y, x).
+        reference (DataArray): The reference ``xarray.DataArray``, on the same grid as ``target``.
+        band (Optional[int or str]): The band to match in both images. Default is the first band.
+        wsize (Optional[int]): The tie-point window size (in pixels).
+        spacing (Optional[int]): The tie-point spacing (in pixels). Default is ``wsize``.
+        max_shift (Optional[int]): The maximum shift (in pixels).
+        min_quality (Optional[float]): The minimum accepted correlation peak (0-1).
+        smooth (Optional[int]): The size of the median filter applied to the shift field, or 0 to not smooth.
+        resampling (Optional[str]): The resampling method. Choices are ['nearest', 'bilinear'].
+        nodata (Optional[int or float]): The 'no data' value, which is excluded from tie-point windows. Default is
+            the first value of the ``nodatavals`` attribute.
+        n_workers (Optional[int]): The number of tie-point windows to correlate in parallel.
+
+    Returns:
+        ``xarray.DataArray``
+    """
+
+    if (target.shape[-2:] != reference.shape[-2:]) or (tuple(target.gw.transform) != tuple(reference.gw.transform)):
+
+        logger.exception('  The target and reference must be on the same grid. Open them with the same reference (e.g., gw.config.update(ref_image=...)).')
+        raise ValueError
+
+    if nodata is None:
+        nodata = target.attrs.get('nodatavals', (None,))[0]
+
+    if band is None:
+        tar_band = target.isel(band=0)
+        ref_band = reference.isel(band=0)
+    else:
+        tar_band = target.sel(band=band)
+        ref_band = reference.sel(band=band)
+
+    field = estimate_shift_field(tar_band,
+                                 ref_band,
+                                 wsize=wsize,
+                                 spacing=spacing,
+                                 nodata=nodata,
+                                 max_shift=max_shift,
+                                 min_quality=min_quality,
+                                 smooth=smooth,
+                                 n_workers=n_workers)
+
+    if field is None:
+
+        logger.warning('  Could not co-register the data.')
+        return target
+
+    field_rows, field_cols, row_shifts, col_shifts = field
+
+    depth = int(math.ceil(max_shift)) + 1
+
+    row_starts = np.concatenate(([0], np.cumsum(target.data.chunks[1])[:-1])).tolist()
+    col_starts = np.concatenate(([0], np.cumsum(target.data.chunks[2])[:-1])).tolist()
+
+    shifted = target.data.map_overlap(_apply_shift_block,
+                                      depth={0: 0, 1: depth, 2: depth},
+                                      boundary='nearest',
+                                      trim=False,
+                                      dtype=target.dtype,
+                                      row_starts=row_starts,
+                                      col_starts=col_starts,
+                                      halo=depth,
+                                      field_rows=field_rows,
+                                      field_cols=field_cols,
+                                      row_shifts=row_shifts,
+                                      col_shifts=col_shifts,
+                                      order=0 if resampling == 'nearest' else 1)
+
+    attrs = target.attrs.copy()
+    attrs['coreg_shift_rows'] = float(np.median(row_shifts))
+    attrs['coreg_shift_cols'] = float(np.median(col_shifts))
+
+    return xr.DataArray(data=shifted,
+                        dims=target.dims,
+                        coords=target.coords,
+                        attrs=attrs)
@@ -1,7 +1,7 @@
 from ..config import config
 
 from . import to_raster, to_vrt, array_to_polygon, moving, extract, sample, calc_area, subset, clip, mask, replace, recode
-from . import dask_to_xarray, ndarray_to_xarray
+from . import dask_to_xarray, ndarray_to_xarray, predict
 from . import norm_diff as gw_norm_diff
 from . import avi as gw_avi
 from . import evi as gw_evi
@@ -54,8 +54,8 @@ class _UpdateConfig(object):
         return kwargs
 
 
-@xr.register_dataset_accessor('gw')
-class GeoWombatAccessor(_UpdateConfig, _DataProperties):
+# The accessors are registered as ``.gw`` by ``import geowombat``
+class GeoWombatDatasetAccessor(_UpdateConfig, _DataProperties):
 
     def __init__(self, xarray_obj):
 
@@ -232,7 +232,6 @@ class GeoWombatAccessor(_UpdateConfig, _DataProperties):
         return gw_tasseled_cap(self._obj[variable], nodata=nodata, sensor=sensor, scale_factor=scale_factor)
 
 
-@xr.register_dataarray_accessor('gw')
 class GeoWombatAccessor(_UpdateConfig, _DataProperties):
 
     """
@@ -493,17 +492,18 @@ class GeoWombatAccessor(_UpdateConfig, _DataProperties):
                   rot=rot,
                   **kwargs)
 
-    def to_polygon(self, mask=None, connectivity=4):
+    def to_polygon(self, mask=None, connectivity=4, num_workers=1):
 
         """
         Converts a ``dask`` array to a ``GeoDataFrame``
 
         Args:
-            mask (Optional[numpy ndarray or rasterio Band object]): Must evaluate to bool (rasterio.bool_ or rasterio.uint8).
+            mask (Optional[str, numpy ndarray, or DataArray]): Must evaluate to bool (rasterio.bool_ or rasterio.uint8).
                 Values of False or 0 will be excluded from feature generation. Note well that this is the inverse sense from
-                Numpy's, where a mask value of True indicates invalid data in an array. If source is a Numpy masked array
-                and mask is None, the source's mask will be inverted and used in place of mask.
+                Numpy's, where a mask value of True indicates invalid data in an array. If ``mask`` is equal to
+                'source', then the array is used as the mask.
             connectivity (Optional[int]): Use 4 or 8 pixel connectivity for grouping pixels into features.
+            num_workers (Optional[int]): The number of parallel processes used to polygonize blocks.
 
         Returns:
             ``GeoDataFrame``
@@ -514,36 +514,47 @@ class GeoWombatAccessor(_UpdateConfig, _DataProperties):
             >>> with gw.open('image.tif') as src:
             >>>
             >>>     # Convert the input image to a GeoDataFrame
-            >>>     df = src.gw.to_geodataframe(mask='source',
-            >>>                                 num_workers=8)
+            >>>     df = src.gw.to_polygon(mask='source',
+            >>>                            num_workers=8)
         """
 
         return array_to_polygon(self._obj,
                                 mask=mask,
-                                connectivity=connectivity)
+                                connectivity=connectivity,
+                                num_workers=num_workers)
 
-    def to_vector(self, filename, mask=None, connectivity=4):
+    def to_vector(self, filename, mask=None, connectivity=4, num_workers=1):
 
         """
         Writes an Xarray DataArray to a vector file
 
+        Polygons are streamed to ``filename`` block by block, so the array is never held in memory.
+
         Args:
-            filename (str): The output file name to write to.
-            mask (numpy ndarray or rasterio Band object, optional): Must evaluate to bool (rasterio.bool_ or rasterio.uint8).
+            filename (str): The output file name to write to. The driver is taken from the file extension.
+                Choices are ['.gpkg', '.fgb', '.shp', '.geojson'].
+            mask (Optional[str, numpy ndarray, or DataArray]): Must evaluate to bool (rasterio.bool_ or rasterio.uint8).
                 Values of False or 0 will be excluded from feature generation. Note well that this is the inverse sense from
-                Numpy's, where a mask value of True indicates invalid data in an array. If source is a Numpy masked array
-                and mask is None, the source's mask will be inverted and used in place of mask.
+                Numpy's, where a mask value of True indicates invalid data in an array. If ``mask`` is equal to
+                'source', then the array is used as the mask.
             connectivity (Optional[int]): Use 4 or 8 pixel connectivity for grouping pixels into features.
+            num_workers (Optional[int]): The number of parallel processes used to polygonize blocks.
 
         Returns:
             None
-        """
 
-        df_ = self.to_geodataframe(self._obj,
-                                   mask=mask,
-                                   connectivity=connectivity)
+        Example:
+            >>> import geowombat as gw
+            >>>
+            >>> with gw.open('image.tif') as src:
+            >>>     src.gw.to_vector('polygons.gpkg', mask='source', num_workers=8)
+        """
 
-        df_.to_file(filename)
+        array_to_polygon(self._obj,
+                         mask=mask,
+                         connectivity=connectivity,
+                         num_workers=num_workers,
+                         filename=filename)
 
     def transform_crs(self,
                       dst_crs=None,
@@ -831,21 +842,23 @@ class GeoWombatAccessor(_UpdateConfig, _DataProperties):
         Predicts an image using a pre-fit model
 
         Args:
-            clf (object): A fitted classifier ``geowombat.model.Model`` instance with a ``predict`` method.
-            outname (Optional[str]): An file name for the predictions.
+            clf (object or str): A fitted model with a ``predict`` method, or a ``joblib`` model file.
+            outname (Optional[str]): An file name for the predictions. Predictions are streamed to file chunk by chunk.
             chunksize (Optional[str or tuple]): The chunk size for I/O. Default is 'same', or use the input chunk size.
-            x_chunks (Optional[tuple]): The chunk size for the X predictors (or ``data``).
+            x_chunks (Optional[tuple]): The chunk size for the X predictors (or ``data``). The first item is the
+                number of pixels passed to the model at once.
             overwrite (Optional[bool]): Whether to overwrite an existing file.
             return_as (Optional[str]): Whether to return the predictions as a ``xarray.DataArray`` or ``xarray.Dataset``.
                 Only relevant if ``outname`` is not given.
-            nodata (Optional[int or float]): The 'no data' value in the predictors.
+            nodata (Optional[int or float]): The 'no data' value in the predictors. Default is the configured 'nodata'.
             n_jobs (Optional[int]): The number of parallel jobs (chunks) for writing.
             backend (Optional[str]): The ``joblib`` backend scheduler.
             verbose (Optional[int]): The verbosity level.
             dtype (Optional[str]): The output data type passed to ``rasterio.write``.
             gdal_cache (Optional[int]): The GDAL cache (in MB) passed to ``rasterio.write``.
-            kwargs (Optional[dict]): Additional keyword arguments passed to ``rasterio.write``.
-                The ``blockxsize`` and ``blockysize`` should be excluded because they are taken from ``chunksize``.
+            kwargs (Optional[dict]): Additional keyword arguments passed to ``geowombat.predict`` (e.g., ``proba``
+                and ``scale``) and ``rasterio.write``. The ``blockxsize`` and ``blockysize`` should be excluded
+                because they are taken from ``chunksize``.
 
         Returns:
             ``xarray.DataArray``
@@ -863,6 +876,12 @@ class GeoWombatAccessor(_UpdateConfig, _DataProperties):
 
         kwargs = self._update_kwargs(**kwargs)
 
+        # The configured 'no data' value applies to the predictors
+        config_nodata = kwargs.pop('nodata', None)
+
+        if nodata is None:
+            nodata = config_nodata
+
         return predict(self._obj,
                        clf,
                        outname=outname,
@@ -9,12 +9,17 @@ import multiprocessing as multi
 import threading
 import random
 import string
+import queue
+import time
 
+from ..config import allocate_threads
 from ..backends.rasterio_ import to_gtiff, WriteDaskArray
+from ..backends.rasterio_ import BLOCK_OVERVIEW_METHODS, create_overviews, copy_overviews, downsample_block, write_gdal_blocks
 from .windows import get_window_offsets
+from .profiling import WindowProfiler, window_record
 
 try:
-    from ..backends.zarr_ import to_zarr
+    from ..backends.zarr_ import to_zarr, create_zarr, write_zarr_window
     import zarr
     ZARR_INSTALLED = True
 except:
@@ -37,6 +42,12 @@ from rasterio import shutil as rio_shutil
 from affine import Affine
 from tqdm import tqdm
 
+try:
+    from threadpoolctl import threadpool_limits
+    THREADPOOLCTL_INSTALLED = True
+except:
+    THREADPOOLCTL_INSTALLED = False
+
 try:
     MKL_LIB = ctypes.CDLL('libmkl_rt.so')
 except:
@@ -225,10 +236,76 @@ def _check_offsets(block, out_data_, window_, oleft, otop, ocols, orows, left_,
     return out_data_, window_
 
 
-def _compute_block(block, wid, window_, padded_window_, n_workers, num_workers, oleft, otop, ocols, orows):
+def _limit_threads(gdal_threads, blas_threads):
 
     """
-    Computes a DataArray window block of data
+    Limits the GDAL and BLAS threads of the current process
+
+    This is used as the initializer of ``to_raster`` worker pools so that each worker
+    stays within its share of the thread budget.
+
+    Args:
+        gdal_threads (int): The value of GDAL_NUM_THREADS.
+        blas_threads (int): The number of BLAS/OpenMP threads.
+    """
+
+    os.environ['GDAL_NUM_THREADS'] = str(gdal_threads)
+
+    if THREADPOOLCTL_INSTALLED:
+        threadpool_limits(limits=blas_threads)
+    elif MKL_LIB:
+        __ = MKL_LIB.MKL_Set_Num_Threads(blas_threads)
+
+
+@contextmanager
+def _thread_limits(gdal_threads, blas_threads):
+
+    """
+    Limits the GDAL and BLAS threads of the current process and restores them on exit
+
+    Args:
+        gdal_threads (int): The value of GDAL_NUM_THREADS.
+        blas_threads (int): The number of BLAS/OpenMP threads.
+    """
+
+    gdal_env = os.environ.get('GDAL_NUM_THREADS')
+
+    os.environ['GDAL_NUM_THREADS'] = str(gdal_threads)
+
+    try:
+
+        if THREADPOOLCTL_INSTALLED:
+
+            with threadpool_limits(limits=blas_threads):
+                yield
+
+        elif MKL_LIB:
+
+            mkl_threads = MKL_LIB.MKL_Get_Max_Threads()
+            __ = MKL_LIB.MKL_Set_Num_Threads(blas_threads)
+
+            try:
+                yield
+            finally:
+                __ = MKL_LIB.MKL_Set_Num_Threads(mkl_threads)
+
+        else:
+            yield
+
+    finally:
+
+        if gdal_env is None:
+            del os.environ['GDAL_NUM_THREADS']
+        else:
+            os.environ['GDAL_NUM_THREADS'] = gdal_env
+
+
+def _read_block(block, wid, window_, padded_window_, n_workers, num_workers):
+
+    """
+    Reads a DataArray window block into memory
+
+    Lazy ``geowombat`` functions are evaluated as part of the read.
 
     Args:
         block (DataArray): The ``xarray.DataArray`` to compute.
@@ -237,18 +314,11 @@ def _compute_block(block, wid, window_, padded_window_, n_workers, num_workers,
         padded_window_ (namedtuple): A padded window ``rasterio.windows.Window`` object.
         n_workers (int): The number of parallel workers for chunks.
         num_workers (int): The number of parallel workers for ``dask.compute``.
-        oleft (float): The output image left coordinate.
-        otop (float): The output image top coordinate.
-        ocols (int): The output image columns.
-        orows (int): The output image rows.
 
     Returns:
-        ``numpy.ndarray``, ``rasterio.windows.Window``, ``int`` | ``list``
+        ``numpy.ndarray``
     """
 
-    # The geo-transform is needed on the block
-    # left_, top_ = Affine(*block.transform) * (window_.col_off, window_.row_off)
-
     out_data_ = None
 
     if 'apply' in block.attrs:
@@ -273,12 +343,7 @@ def _compute_block(block, wid, window_, padded_window_, n_workers, num_workers,
 
             out_data_ = block.attrs['apply'](**block.attrs['apply_kwargs'])
 
-            if n_workers == 1:
-                out_data_ = out_data_.data.compute(scheduler='threads', num_workers=num_workers)
-            else:
-
-                with threading.Lock():
-                    out_data_ = out_data_.data.compute(scheduler='threads', num_workers=num_workers)
+            out_data_ = out_data_.data.compute(scheduler='threads', num_workers=num_workers)
 
         else:
             logger.exception('  The lazy wombat function is turned off.')
@@ -289,80 +354,109 @@ def _compute_block(block, wid, window_, padded_window_, n_workers, num_workers,
         # Get the data as a NumPy array
         ###############################
 
-        if n_workers == 1:
-            out_data_ = block.data.compute(scheduler='threads', num_workers=num_workers)
-        else:
+        out_data_ = block.data.compute(scheduler='threads', num_workers=num_workers)
 
-            with threading.Lock():
-                out_data_ = block.data.compute(scheduler='threads', num_workers=num_workers)
+        if padded_window_ and not ('apply' in block.attrs):
+            logger.warning('  Padding is only supported with user functions.')
 
-        if ('apply' in block.attrs) and not hasattr(block.attrs['apply'], 'wombat_func_'):
+    return out_data_
 
-            if padded_window_:
 
-                # Add extra padding on the image borders
-                rspad = padded_window_.height - window_.height if window_.row_off == 0 else 0
-                cspad = padded_window_.width - window_.width if window_.col_off == 0 else 0
-                repad = padded_window_.height - window_.height if (window_.row_off != 0) and (window_.height < block.gw.row_chunks) else 0
-                cepad = padded_window_.width - window_.width if (window_.col_off != 0) and (window_.width < block.gw.col_chunks) else 0
+def _apply_user_func(out_data_, func, func_args, func_kwargs, window_, padded_window_, row_chunks, col_chunks):
 
-                dshape = out_data_.shape
+    """
+    Applies a user function to an in-memory window block
 
-                if (rspad > 0) or (cspad > 0) or (repad > 0) or (cepad > 0):
+    Args:
+        out_data_ (ndarray): The block data.
+        func (func): The user function.
+        func_args (tuple): Arguments passed to ``func``, or None.
+        func_kwargs (dict): Keyword arguments passed to ``func``, or None.
+        window_ (namedtuple): The window ``rasterio.windows.Window`` object.
+        padded_window_ (namedtuple): A padded window ``rasterio.windows.Window`` object.
+        row_chunks (int): The block row chunk size.
+        col_chunks (int): The block column chunk size.
 
-                    if len(dshape) == 2:
-                        out_data_ = np.pad(out_data_, ((rspad, repad), (cspad, cepad)), mode='reflect')
-                    elif len(dshape) == 3:
-                        out_data_ = np.pad(out_data_, ((0, 0), (rspad, repad), (cspad, cepad)), mode='reflect')
-                    elif len(dshape) == 4:
-                        out_data_ = np.pad(out_data_, ((0, 0), (0, 0), (rspad, repad), (cspad, cepad)), mode='reflect')
+    Returns:
+        ``numpy.ndarray``
+    """
 
-            # Apply the user function
-            if ('apply_args' in block.attrs) and ('apply_kwargs' in block.attrs):
-                out_data_ = block.attrs['apply'](out_data_, *block.attrs['apply_args'], **block.attrs['apply_kwargs'])
-            elif ('apply_args' in block.attrs) and ('apply_kwargs' not in block.attrs):
-                out_data_ = block.attrs['apply'](out_data_, *block.attrs['apply_args'])
-            elif ('apply_args' not in block.attrs) and ('apply_kwargs' in block.attrs):
-                out_data_ = block.attrs['apply'](out_data_, **block.attrs['apply_kwargs'])
-            else:
-                out_data_ = block.attrs['apply'](out_data_)
+    if padded_window_:
 
-            if padded_window_:
+        # Add extra padding on the image borders
+        rspad = padded_window_.height - window_.height if window_.row_off == 0 else 0
+        cspad = padded_window_.width - window_.width if window_.col_off == 0 else 0
+        repad = padded_window_.height - window_.height if (window_.row_off != 0) and (window_.height < row_chunks) else 0
+        cepad = padded_window_.width - window_.width if (window_.col_off != 0) and (window_.width < col_chunks) else 0
 
-                ##########################
-                # Remove the extra padding
-                ##########################
+        dshape = out_data_.shape
 
-                dshape = out_data_.shape
+        if (rspad > 0) or (cspad > 0) or (repad > 0) or (cepad > 0):
+
+            if len(dshape) == 2:
+                out_data_ = np.pad(out_data_, ((rspad, repad), (cspad, cepad)), mode='reflect')
+            elif len(dshape) == 3:
+                out_data_ = np.pad(out_data_, ((0, 0), (rspad, repad), (cspad, cepad)), mode='reflect')
+            elif len(dshape) == 4:
+                out_data_ = np.pad(out_data_, ((0, 0), (0, 0), (rspad, repad), (cspad, cepad)), mode='reflect')
+
+    # Apply the user function
+    if func_args and func_kwargs:
+        out_data_ = func(out_data_, *func_args, **func_kwargs)
+    elif func_args:
+        out_data_ = func(out_data_, *func_args)
+    elif func_kwargs:
+        out_data_ = func(out_data_, **func_kwargs)
+    else:
+        out_data_ = func(out_data_)
 
-                if len(dshape) == 2:
-                    out_data_ = out_data_[rspad:rspad+padded_window_.height, cspad:cspad+padded_window_.width]
-                elif len(dshape) == 3:
-                    out_data_ = out_data_[:, rspad:rspad+padded_window_.height, cspad:cspad+padded_window_.width]
-                elif len(dshape) == 4:
-                    out_data_ = out_data_[:, :, rspad:rspad+padded_window_.height, cspad:cspad+padded_window_.width]
+    if padded_window_:
 
-                dshape = out_data_.shape
+        ##########################
+        # Remove the extra padding
+        ##########################
 
-                ####################
-                # Remove the padding
-                ####################
+        dshape = out_data_.shape
 
-                # Get the non-padded array slice
-                row_diff = abs(window_.row_off - padded_window_.row_off)
-                col_diff = abs(window_.col_off - padded_window_.col_off)
+        if len(dshape) == 2:
+            out_data_ = out_data_[rspad:rspad+padded_window_.height, cspad:cspad+padded_window_.width]
+        elif len(dshape) == 3:
+            out_data_ = out_data_[:, rspad:rspad+padded_window_.height, cspad:cspad+padded_window_.width]
+        elif len(dshape) == 4:
+            out_data_ = out_data_[:, :, rspad:rspad+padded_window_.height, cspad:cspad+padded_window_.width]
+
+        dshape = out_data_.shape
 
-                if len(dshape) == 2:
-                    out_data_ = out_data_[row_diff:row_diff+window_.height, col_diff:col_diff+window_.width]
-                elif len(dshape) == 3:
-                    out_data_ = out_data_[:, row_diff:row_diff+window_.height, col_diff:col_diff+window_.width]
-                elif len(dshape) == 4:
-                    out_data_ = out_data_[:, :, row_diff:row_diff+window_.height, col_diff:col_diff+window_.width]
+        ####################
+        # Remove the padding
+        ####################
 
-        else:
+        # Get the non-padded array slice
+        row_diff = abs(window_.row_off - padded_window_.row_off)
+        col_diff = abs(window_.col_off - padded_window_.col_off)
+
+        if len(dshape) == 2:
+            out_data_ = out_data_[row_diff:row_diff+window_.height, col_diff:col_diff+window_.width]
+        elif len(dshape) == 3:
+            out_data_ = out_data_[:, row_diff:row_diff+window_.height, col_diff:col_diff+window_.width]
+        elif len(dshape) == 4:
+            out_data_ = out_data_[:, :, row_diff:row_diff+window_.height, col_diff:col_diff+window_.width]
+
+    return out_data_
+
+
+def _squeeze_block(out_data_, wid):
+
+    """
+    Squeezes a computed block and gets the output band indices
+
+    Args:
+        out_data_ (ndarray): The block data.
+        wid (int): The window id.
 
-            if padded_window_:
-                logger.warning('  Padding is only supported with user functions.')
+    Returns:
+        ``numpy.ndarray``, ``int`` | ``list``
+    """
 
     if not isinstance(out_data_, np.ndarray):
         logger.exception('  The data were not computed properly for block {:,d}'.format(wid))
@@ -377,9 +471,143 @@ def _compute_block(block, wid, window_, padded_window_, n_workers, num_workers,
     else:
         indexes_ = 1 if dshape[0] == 1 else list(range(1, dshape[0]+1))
 
+    return out_data_, indexes_
+
+
+def _has_user_func(block):
+    return ('apply' in block.attrs) and not hasattr(block.attrs['apply'], 'wombat_func_')
+
+
+def _compute_block(block, wid, window_, padded_window_, n_workers, num_workers, oleft, otop, ocols, orows, timings=None):
+
+    """
+    Computes a DataArray window block of data
+
+    Args:
+        block (DataArray): The ``xarray.DataArray`` to compute.
+        wid (int): The window id.
+        window_ (namedtuple): The window ``rasterio.windows.Window`` object.
+        padded_window_ (namedtuple): A padded window ``rasterio.windows.Window`` object.
+        n_workers (int): The number of parallel workers for chunks.
+        num_workers (int): The number of parallel workers for ``dask.compute``.
+        oleft (float): The output image left coordinate.
+        otop (float): The output image top coordinate.
+        ocols (int): The output image columns.
+        orows (int): The output image rows.
+        timings (Optional[dict]): A dictionary to add the read and compute (start, end) times and
+            the bytes read to.
+
+    Returns:
+        ``numpy.ndarray``, ``rasterio.windows.Window``, ``int`` | ``list``
+    """
+
+    t0 = time.time()
+
+    out_data_ = _read_block(block, wid, window_, padded_window_, n_workers, num_workers)
+
+    t1 = time.time()
+
+    if _has_user_func(block):
+
+        out_data_ = _apply_user_func(out_data_,
+                                     block.attrs['apply'],
+                                     block.attrs['apply_args'] if 'apply_args' in block.attrs else None,
+                                     block.attrs['apply_kwargs'] if 'apply_kwargs' in block.attrs else None,
+                                     window_,
+                                     padded_window_,
+                                     block.gw.row_chunks,
+                                     block.gw.col_chunks)
+
+    out_data_, indexes_ = _squeeze_block(out_data_, wid)
+
+    if timings is not None:
+
+        timings['read'] = (t0, t1)
+        timings['compute'] = (t1, time.time())
+        timings['bytes_read'] = block.data.nbytes
+
     return out_data_, indexes_, window_
 
 
+def _window_key(w):
+
+    """
+    Gets a window id that is stable across runs
+    """
+
+    return 'y{Y:09d}_x{X:09d}_h{H:09d}_w{W:09d}'.format(Y=int(w.row_off),
+                                                        X=int(w.col_off),
+                                                        H=int(w.height),
+                                                        W=int(w.width))
+
+
+def _read_journal(journal_file):
+
+    """
+    Reads the completed window ids from a ``to_raster`` journal
+    """
+
+    with open(str(journal_file), mode='r') as jf:
+        return set(line.strip() for line in jf if line.strip())
+
+
+def _check_resume_output(filename, zarr_store, separate, kwargs, overview_factors=None):
+
+    """
+    Checks whether an existing output matches the output that will be written
+
+    Args:
+        filename (str): The output file.
+        zarr_store (bool): Whether the output is a zarr store.
+        separate (bool): Whether the output is written as separate block files.
+        kwargs (dict): The output file keyword arguments.
+        overview_factors (Optional[list]): The overview levels that are written with each window.
+
+    Returns:
+        ``bool``
+    """
+
+    if separate:
+        return True
+
+    try:
+
+        if zarr_store:
+
+            z = zarr.open_array(str(filename), mode='r', path='data')
+
+            return z.shape == (kwargs['count'], kwargs['height'], kwargs['width'])
+
+        else:
+
+            with rio.open(filename) as src:
+
+                return (src.width == kwargs['width']) and \
+                       (src.height == kwargs['height']) and \
+                       (src.count == kwargs['count']) and \
+                       (('dtype' not in kwargs) or (src.dtypes[0] == np.dtype(kwargs['dtype']).name)) and \
+                       (not overview_factors or (src.overviews(1) == list(overview_factors)))
+
+    except:
+        return False
+
+
+def _is_empty_block(data, nodata):
+
+    """
+    Checks whether a computed block only contains 'no data' values
+    """
+
+    # Without a 'no data' value, every block holds valid data
+    if nodata is None:
+        return False
+
+    if np.isnan(nodata):
+        return np.issubdtype(data.dtype, np.floating) and bool(np.isnan(data).all())
+
+    return bool((data == nodata).all())
+
+
 def _write_xarray(*args):
 
     """
@@ -392,21 +620,427 @@ def _write_xarray(*args):
         https://github.com/dask/dask/issues/3600
 
     Returns:
-        ``str`` | None
+        ``tuple`` of (window id, whether the window was written, window record or ``None``, overviews or ``None``),
+            where the overviews are given as (window, indexes, blocks) for the parent process to write
     """
 
-    zarr_file = None
+    block, filename, wid, block_window, padded_window, n_workers, n_threads, separate, chunks, root, out_block_type, tags, oleft, otop, ocols, orows, skip_empty, instrument, overview_info, kwargs = list(itertools.chain(*args))
+
+    timings = {} if instrument else None
+
+    output, out_indexes, block_window = _compute_block(block, wid, block_window, padded_window, n_workers, n_threads, oleft, otop, ocols, orows, timings=timings)
 
-    block, filename, wid, block_window, padded_window, n_workers, n_threads, separate, chunks, root, out_block_type, tags, oleft, otop, ocols, orows, kwargs = list(itertools.chain(*args))
+    wkey = _window_key(block_window)
 
-    output, out_indexes, block_window = _compute_block(block, wid, block_window, padded_window, n_workers, n_threads, oleft, otop, ocols, orows)
+    if skip_empty and _is_empty_block(output, kwargs['nodata'] if 'nodata' in kwargs else None):
+        return wkey, False, window_record(wkey, **timings) if instrument else None, None
 
-    if separate and (out_block_type.lower() == 'zarr'):
-        zarr_file = to_zarr(filename, output, block_window, chunks, root=root)
+    t0 = time.time()
+
+    overviews = None
+
+    if Path(filename).suffix.lower() == '.zarr':
+        write_zarr_window(filename, output, block_window)
+    elif separate and (out_block_type.lower() == 'zarr'):
+        to_zarr(filename, output, block_window, chunks, root=root)
     else:
+
         to_gtiff(filename, output, block_window, out_indexes, block.gw.transform, n_workers, separate, tags, kwargs)
 
-    return zarr_file
+        if overview_info:
+
+            factors, resampling = overview_info
+            block_3d = output[np.newaxis] if output.ndim == 2 else output
+
+            # Downsample the block that is already in memory. Only the parent writes overviews.
+            overviews = (block_window,
+                         out_indexes,
+                         [downsample_block(block_3d, factor, resampling=resampling, nodata=kwargs['nodata'] if 'nodata' in kwargs else None)
+                          for factor in factors])
+
+    if instrument:
+        return wkey, True, window_record(wkey, write=(t0, time.time()), bytes_written=output.nbytes, **timings), overviews
+
+    return wkey, True, None, overviews
+
+
+def _write_overview_blocks(filename, overview_windows, factors):
+
+    """
+    Writes the overviews of finished windows through one ``GDAL`` handle
+
+    Args:
+        filename (str): The output file name. The file must already have the overview levels.
+        overview_windows (list): The overviews of each window, as (window, indexes, blocks).
+        factors (list): The overview factors.
+
+    Returns:
+        ``None``
+    """
+
+    dst = gdal.Open(str(filename), gdal.GA_Update)
+
+    for window, indexes, blocks in overview_windows:
+        write_gdal_blocks(dst, blocks, factors, window, indexes)
+
+    dst = None
+
+
+def _slice_block(data, w):
+
+    """
+    Slices a window from a 2d, 3d or 4d DataArray
+    """
+
+    if len(data.shape) == 2:
+        return data[w.row_off:w.row_off + w.height, w.col_off:w.col_off + w.width]
+    elif len(data.shape) == 3:
+        return data[:, w.row_off:w.row_off + w.height, w.col_off:w.col_off + w.width]
+    else:
+        return data[:, :, w.row_off:w.row_off + w.height, w.col_off:w.col_off + w.width]
+
+
+def _pipeline_compute(out_data_, wid, window_, padded_window_, func, func_args, func_kwargs, row_chunks, col_chunks, skip_empty, nodata, instrument, overview_info=None):
+
+    """
+    The compute stage of the ``to_raster`` pipeline
+    """
+
+    t0 = time.time()
+
+    if func:
+        out_data_ = _apply_user_func(out_data_, func, func_args, func_kwargs, window_, padded_window_, row_chunks, col_chunks)
+
+    out_data_, indexes_ = _squeeze_block(out_data_, wid)
+
+    is_empty = skip_empty and _is_empty_block(out_data_, nodata)
+
+    overview_blocks = None
+
+    if overview_info and not is_empty:
+
+        factors, resampling = overview_info
+        block_3d = out_data_[np.newaxis] if out_data_.ndim == 2 else out_data_
+
+        overview_blocks = [downsample_block(block_3d, factor, resampling=resampling, nodata=nodata) for factor in factors]
+
+    t1 = time.time()
+
+    record = window_record(_window_key(window_), compute=(t0, t1)) if instrument else None
+
+    return out_data_, indexes_, window_, is_empty, overview_blocks, t1 - t0, record
+
+
+def _write_pipeline(data,
+                    filename,
+                    windows,
+                    padding,
+                    n_readers,
+                    n_workers,
+                    n_threads,
+                    queue_size,
+                    scheduler,
+                    separate,
+                    tags,
+                    kwargs,
+                    journal=None,
+                    skip_empty=False,
+                    thread_limits=(1, 1),
+                    profiler=None,
+                    overview_info=None,
+                    checkpoint_size=50):
+
+    """
+    Writes a DataArray to file with a reader, compute and writer pipeline
+
+    Reader threads materialize the next windows, a pool of workers applies user functions,
+    and a single writer thread holds the output file open. The stages are connected by
+    bounded queues, so reads, computation and writes overlap.
+
+    Args:
+        data (DataArray): The ``xarray.DataArray`` to write.
+        filename (str): The output file, which must already exist.
+        windows (list or WindowGrid): The ``rasterio.windows.Window`` objects to write.
+        padding (tuple): The window padding. If given, ``windows`` holds (window, padded window) tuples.
+        n_readers (int): The number of reader threads.
+        n_workers (int): The number of compute workers.
+        n_threads (int): The number of ``dask`` threads per reader.
+        queue_size (int or tuple): The read and write queue depths, given as one value or (read, write).
+        scheduler (str): The compute pool. Choices are ['processes', 'threads', 'mpool'].
+        separate (bool): Whether to write blocks as separate files.
+        tags (dict): Image tags for separate files.
+        kwargs (dict): The output file keyword arguments.
+        journal (Optional[file object]): An open journal to append completed window ids to.
+        skip_empty (Optional[bool]): Whether to skip writing windows that only contain 'no data' values.
+        thread_limits (Optional[tuple]): The GDAL and BLAS threads of each compute worker.
+        profiler (Optional[WindowProfiler]): A profiler to add per-window stage records to.
+        overview_info (Optional[tuple]): The overview (factors, resampling) to build from each window. The
+            overviews are downsampled by the compute workers and written by the writer.
+        checkpoint_size (Optional[int]): The number of windows between journal checkpoints. At each checkpoint,
+            the output file is closed, so that cached blocks are flushed to disk, before the window ids are
+            appended to ``journal``.
+
+    Returns:
+        ``dict`` of stage utilization (0-1) and the number of skipped windows
+    """
+
+    read_queue_size, write_queue_size = queue_size if isinstance(queue_size, tuple) else (queue_size, queue_size)
+
+    read_queue = queue.Queue(maxsize=read_queue_size)
+    write_queue = queue.Queue(maxsize=write_queue_size)
+
+    zarr_store = Path(filename).suffix.lower() == '.zarr'
+
+    func = data.attrs['apply'] if _has_user_func(data) else None
+    func_args = data.attrs['apply_args'] if func and ('apply_args' in data.attrs) else None
+    func_kwargs = data.attrs['apply_kwargs'] if func and ('apply_kwargs' in data.attrs) else None
+
+    busy = dict(read=0.0, compute=0.0, write=0.0)
+    n_skipped = [0]
+    busy_lock = threading.Lock()
+    window_iter = iter(enumerate(windows))
+    iter_lock = threading.Lock()
+    errors = []
+
+    def _reader():
+
+        while not errors:
+
+            with iter_lock:
+                item = next(window_iter, None)
+
+            if item is None:
+                break
+
+            wid, w = item
+
+            window_, padded_window_ = w if padding else (w, None)
+
+            t0 = time.time()
+
+            try:
+
+                block = _slice_block(data, padded_window_ if padding else window_)
+                out_data_ = _read_block(block, wid, window_, padded_window_, 1, n_threads)
+
+            except Exception as e:
+                errors.append(e)
+                break
+
+            t1 = time.time()
+
+            with busy_lock:
+                busy['read'] += t1 - t0
+
+            if profiler:
+                profiler.add(window_record(_window_key(window_), read=(t0, t1), bytes_read=block.data.nbytes))
+
+            read_queue.put((out_data_, wid, window_, padded_window_, block.gw.row_chunks, block.gw.col_chunks))
+
+        read_queue.put(None)
+
+    def _writer(pbar):
+
+        handles = dict(dst=None, gdal_dst=None)
+
+        # Window ids that are written but not yet journaled
+        pending = []
+
+        def _open():
+
+            if zarr_store or separate:
+                return
+            elif overview_info:
+
+                # One GDAL handle writes the windows and their overviews
+                handles['gdal_dst'] = gdal.Open(str(filename), gdal.GA_Update)
+
+            else:
+                handles['dst'] = rio.open(filename, mode='r+', sharing=False)
+
+        def _close():
+
+            if handles['dst'] is not None:
+                handles['dst'].close()
+
+            if handles['gdal_dst'] is not None:
+                handles['gdal_dst'].FlushCache()
+
+            handles['dst'] = None
+            handles['gdal_dst'] = None
+
+        def _checkpoint(reopen):
+
+            # Written blocks can be held in the GDAL cache until the
+            #   dataset is closed, so journal the windows after closing.
+            _close()
+
+            if journal and pending:
+
+                journal.write(''.join(wkey + '\n' for wkey in pending))
+                journal.flush()
+
+            del pending[:]
+
+            if reopen:
+                _open()
+
+        _open()
+
+        try:
+
+            while True:
+
+                item = write_queue.get()
+
+                if item is None:
+                    break
+
+                out_data_, indexes_, window_, is_empty, overview_blocks = item
+
+                if errors:
+
+                    # Keep draining the queue so that upstream stages do not block
+                    continue
+
+                t0 = time.time()
+
+                try:
+
+                    if is_empty:
+                        n_skipped[0] += 1
+                    elif zarr_store:
+                        write_zarr_window(filename, out_data_, window_)
+                    elif separate:
+                        to_gtiff(filename, out_data_, window_, indexes_, data.gw.transform, 1, separate, tags, kwargs)
+                    elif handles['gdal_dst'] is not None:
+                        write_gdal_blocks(handles['gdal_dst'], [out_data_] + overview_blocks, [1] + list(overview_info[0]), window_, indexes_)
+                    else:
+                        handles['dst'].write(out_data_, window=window_, indexes=indexes_)
+
+                    if journal:
+
+                        pending.append(_window_key(window_))
+
+                        if len(pending) >= checkpoint_size:
+                            _checkpoint(True)
+
+                except Exception as e:
+                    errors.append(e)
+                    continue
+
+                t1 = time.time()
+                elapsed = t1 - t0
+
+                if profiler and not is_empty:
+                    profiler.add(window_record(_window_key(window_), write=(t0, t1), bytes_written=out_data_.nbytes))
+
+                with busy_lock:
+
+                    busy['write'] += elapsed
+
+                    wall = max(time.time() - start, 1e-9)
+
+                    pbar.set_postfix(read='{:.0%}'.format(min(busy['read'] / (wall * n_readers), 1)),
+                                     compute='{:.0%}'.format(min(busy['compute'] / (wall * n_workers), 1)),
+                                     write='{:.0%}'.format(min(busy['write'] / wall, 1)),
+                                     skipped=n_skipped[0])
+
+                pbar.update(1)
+
+            if not errors:
+                _checkpoint(False)
+
+        finally:
+            _close()
+
+    if scheduler.lower() == 'threads':
+        compute_executor = concurrent.futures.ThreadPoolExecutor
+    else:
+        compute_executor = concurrent.futures.ProcessPoolExecutor
+
+    # Bound the number of blocks held by the compute pool
+    compute_slots = threading.BoundedSemaphore(n_workers * 2)
+
+    def _on_computed(future):
+
+        try:
+
+            out_data_, indexes_, window_, is_empty, overview_blocks, elapsed, record = future.result()
+
+            with busy_lock:
+                busy['compute'] += elapsed
+
+            if profiler:
+                profiler.add(record)
+
+            write_queue.put((out_data_, indexes_, window_, is_empty, overview_blocks))
+
+        except Exception as e:
+            errors.append(e)
+
+        finally:
+            compute_slots.release()
+
+    start = time.time()
+
+    with tqdm(total=len(windows)) as pbar:
+
+        writer = threading.Thread(target=_writer, args=(pbar,))
+        writer.start()
+
+        readers = [threading.Thread(target=_reader) for __ in range(0, n_readers)]
+
+        for reader in readers:
+            reader.start()
+
+        n_finished = 0
+
+        with compute_executor(max_workers=n_workers, initializer=_limit_threads, initargs=thread_limits) as executor:
+
+            while n_finished < n_readers:
+
+                item = read_queue.get()
+
+                if item is None:
+                    n_finished += 1
+                    continue
+
+                out_data_, wid, window_, padded_window_, row_chunks, col_chunks = item
+
+                compute_slots.acquire()
+
+                future = executor.submit(_pipeline_compute,
+                                         out_data_,
+                                         wid,
+                                         window_,
+                                         padded_window_,
+                                         func,
+                                         func_args,
+                                         func_kwargs,
+                                         row_chunks,
+                                         col_chunks,
+                                         skip_empty,
+                                         kwargs['nodata'] if 'nodata' in kwargs else None,
+                                         profiler is not None,
+                                         overview_info)
+
+                future.add_done_callback(_on_computed)
+
+        write_queue.put(None)
+        writer.join()
+
+        for reader in readers:
+            reader.join()
+
+    if errors:
+        raise errors[0]
+
+    wall = max(time.time() - start, 1e-9)
+
+    return dict(read=min(busy['read'] / (wall * n_readers), 1),
+                compute=min(busy['compute'] / (wall * n_workers), 1),
+                write=min(busy['write'] / wall, 1)), n_skipped[0]
 
 
 def to_vrt(data,
@@ -505,6 +1139,12 @@ def to_raster(data,
               total_memory=48,
               padding=None,
               tags=None,
+              pipeline=False,
+              n_readers=None,
+              queue_size=None,
+              resume=False,
+              skip_empty=False,
+              instrument=False,
               **kwargs):
 
     """
@@ -512,7 +1152,9 @@ def to_raster(data,
 
     Args:
         data (DataArray): The ``xarray.DataArray`` to write.
-        filename (str): The output file name to write to.
+        filename (str): The output file name to write to. If the file extension is '.zarr', the data are
+            written to a single chunked zarr array, with a chunk grid aligned to the write windows, that can
+            be opened with ``geowombat.open``.
         readxsize (Optional[int]): The size of column chunks to read. If not given, ``readxsize`` defaults to Dask
             chunk size.
         readysize (Optional[int]): The size of row chunks to read. If not given, ``readysize`` defaults to Dask
@@ -533,9 +1175,16 @@ def to_raster(data,
 
         n_jobs (Optional[int]): The total number of parallel jobs.
         n_workers (Optional[int]): The number of processes.
-        n_threads (Optional[int]): The number of threads.
+        n_threads (Optional[int]): The number of threads. ``n_workers`` x ``n_threads`` is capped by the thread budget
+            (see ``geowombat.config.allocate_threads``), and the remaining budget sets the GDAL and BLAS threads of
+            each worker. The budget defaults to the number of CPUs and can be set with
+            ``geowombat.config.update(max_threads=...)``.
         n_chunks (Optional[int]): The chunk size of windows. If not given, equal to ``n_workers`` x 50.
-        overviews (Optional[bool or list]): Whether to build overview layers.
+        overviews (Optional[bool or list]): Whether to build internal overview layers of a GeoTiff, given as ``True``
+            for [2, 4, 8, 16] or a list of factors. With block resampling methods (['nearest', 'average', 'min',
+            'max', 'med']), each level is downsampled from the windows as they are written, so no second read of the
+            output is needed. This requires the window sizes (``readxsize``, ``readysize``) to be multiples of the
+            factor. Other levels and methods are built from the output after it is written.
         resampling (Optional[str]): The resampling method for overviews when ``overviews`` is ``True`` or a ``list``.
             Choices are ['average', 'bilinear', 'cubic', 'cubic_spline', 'gauss', 'lanczos', 'max', 'med', 'min', 'mode', 'nearest'].
         use_client (Optional[bool]): Whether to use a ``dask`` client.
@@ -546,6 +1195,28 @@ def to_raster(data,
             a tuple of ``rasterio.windows.Window`` objects as (w1, w2), where w1 contains the normal window offsets
             and w2 contains the padded window offsets.
         tags (Optional[dict]): Image tags to write to file.
+        pipeline (Optional[bool]): Whether to overlap reading, computation and writing with a three-stage pipeline.
+            ``n_readers`` threads read windows, ``n_workers`` workers (threads if ``scheduler`` = 'threads',
+            otherwise processes) apply user functions, and one writer thread keeps the output file open. The
+            progress bar shows the utilization of each stage.
+        n_readers (Optional[int]): The number of reader threads when ``pipeline`` = ``True``. Default is ``n_workers``.
+        queue_size (Optional[int or tuple]): The depth of the read and write queues when ``pipeline`` = ``True``,
+            given as one value or as (read depth, write depth). Default is ``n_workers`` x 2.
+        resume (Optional[bool]): Whether to checkpoint and resume the write. Completed window ids are appended to a
+            '<filename>.journal' sidecar file, which is created before the output and removed once the write finishes.
+            If the journal exists and the existing output matches the output dimensions, only the windows missing from
+            the journal are written. An existing output that does not match is written again.
+            Not supported with ``use_dask_store`` = ``True``.
+        skip_empty (Optional[bool]): Whether to skip windows that only contain 'no data' values. Windows outside of
+            the source footprints (e.g., from a mosaic) are skipped before they are read, and windows that compute
+            to all ``nodata`` are not written, so computed windows are only skipped if ``nodata`` is set. GeoTiff
+            outputs written by a single process (``pipeline`` = ``True``, ``scheduler`` = 'threads' or
+            ``n_workers`` = 1) are created with SPARSE_OK=TRUE so that skipped blocks are not allocated.
+            Not supported with ``use_dask_store`` = ``True``.
+        instrument (Optional[bool or str]): Whether to record the read, compute and write time, the bytes read and
+            written, the worker and the peak RSS of each window. A summary with percentiles and throughput is logged
+            at the end. If a file name is given, a Chrome trace timeline is also written to it. With
+            ``use_dask_store`` = ``True``, only writes are recorded.
         kwargs (Optional[dict]): Additional keyword arguments to pass to ``rasterio.write``.
 
     Returns:
@@ -569,28 +1240,69 @@ def to_raster(data,
         >>> # Compress the output and build overviews
         >>> with gw.open('input.tif') as ds:
         >>>     gw.to_raster(ds, 'output.tif', n_jobs=8, overviews=True, compress='lzw')
+        >>>
+        >>> # Build averaged overviews in the same pass as the write
+        >>> with gw.open('input.tif', chunks=512) as ds:
+        >>>     gw.to_raster(ds, 'output.tif', n_workers=8, overviews=[2, 4, 8, 16], resampling='average')
+        >>>
+        >>> # Overlap reads, user functions and writes
+        >>> with gw.open('input.tif') as ds:
+        >>>     gw.to_raster(ds, 'output.tif', n_workers=4, n_threads=2, pipeline=True, n_readers=2, queue_size=8)
+        >>>
+        >>> # Checkpoint the write, then resume it after an interruption by running the same call
+        >>> with gw.open('input.tif') as ds:
+        >>>     gw.to_raster(ds, 'output.tif', n_workers=4, n_threads=2, resume=True)
+        >>>
+        >>> # Write to a zarr store
+        >>> with gw.open('input.tif') as ds:
+        >>>     gw.to_raster(ds, 'output.zarr', n_workers=4, n_threads=2)
+        >>>
+        >>> # Log per-window timings and write a timeline that can be viewed with chrome://tracing
+        >>> with gw.open('input.tif') as ds:
+        >>>     gw.to_raster(ds, 'output.tif', n_workers=4, n_threads=2, instrument='trace.json')
+        >>>
+        >>> # Skip empty windows of a sparse mosaic
+        >>> with gw.open(['image1.tif', 'image2.tif'], mosaic=True) as ds:
+        >>>     gw.to_raster(ds, 'output.tif', n_workers=4, n_threads=2, nodata=0, skip_empty=True)
     """
 
-    if MKL_LIB:
-        __ = MKL_LIB.MKL_Set_Num_Threads(n_threads)
-
     if separate and not ZARR_INSTALLED and (out_block_type.lower() == 'zarr'):
         logger.exception('  zarr must be installed to write separate blocks.')
         raise ImportError
 
     pfile = Path(filename)
 
+    zarr_store = pfile.suffix.lower() == '.zarr'
+
+    if zarr_store and not ZARR_INSTALLED:
+        logger.exception('  zarr must be installed to write to a zarr store.')
+        raise ImportError
+
     if scheduler.lower() == 'mpool':
         pool_executor = multi.Pool
     else:
         pool_executor = concurrent.futures.ProcessPoolExecutor if scheduler.lower() == 'processes' else concurrent.futures.ThreadPoolExecutor
 
+    journal_file = Path(str(filename) + '.journal')
+
+    if resume and use_dask_store:
+
+        logger.warning('  Resuming is not supported with dask stores, so the write will not be checkpointed.')
+        resume = False
+
     if overwrite:
 
         if pfile.is_file():
             pfile.unlink()
+        elif zarr_store and pfile.is_dir():
+            shutil.rmtree(str(pfile))
+
+        if journal_file.is_file():
+            journal_file.unlink()
 
-    if pfile.is_file():
+    resuming = resume and journal_file.is_file()
+
+    if (pfile.is_file() or (zarr_store and pfile.is_dir())) and not resuming:
         logger.warning('  The output file already exists.')
         return
 
@@ -618,6 +1330,24 @@ def to_raster(data,
         n_workers = n_jobs
         n_threads = 1
 
+    # Fit the workers, dask threads and GDAL/BLAS threads within the thread budget
+    thread_alloc = allocate_threads(n_workers=n_workers,
+                                    n_threads=n_threads,
+                                    max_threads=kwargs.pop('max_threads', None))
+
+    if (thread_alloc['n_workers'], thread_alloc['n_threads']) != (n_workers, n_threads):
+
+        logger.warning('  {:d} workers x {:d} threads exceeds the thread budget, so {:d} workers x {:d} threads will be used.'.format(n_workers,
+                                                                                                                                   n_threads,
+                                                                                                                                   thread_alloc['n_workers'],
+                                                                                                                                   thread_alloc['n_threads']))
+
+        n_workers = thread_alloc['n_workers']
+        n_threads = thread_alloc['n_threads']
+        n_jobs = n_workers * n_threads
+
+    thread_limits = (thread_alloc['gdal_threads'], thread_alloc['blas_threads'])
+
     mem_per_core = int(total_memory / n_workers)
 
     if not isinstance(n_chunks, int):
@@ -695,9 +1425,108 @@ def to_raster(data,
     if 'transform' not in kwargs:
         kwargs['transform'] = data.gw.transform
 
+    if skip_empty and (kwargs['driver'] == 'GTiff') and (pipeline or (scheduler.lower() == 'threads') or (n_workers == 1)):
+
+        # Leave skipped blocks unallocated in the output. Sparse blocks are appended to
+        #   the file when they are written, so this is only safe with a single writer process.
+        kwargs['sparse_ok'] = True
+
+    overview_factors = []
+    block_factors = []
+
+    if overviews:
+
+        overview_factors = overviews if isinstance(overviews, list) else [2, 4, 8, 16]
+
+        if resampling not in ['average', 'bilinear', 'cubic', 'cubic_spline',
+                              'gauss', 'lanczos', 'max', 'med', 'min', 'mode', 'nearest']:
+
+            logger.warning("  The resampling method is not supported by rasterio. Setting to 'nearest'")
+
+            resampling = 'nearest'
+
+        if separate or zarr_store or (kwargs['driver'] != 'GTiff'):
+
+            logger.warning('  Overviews are only built for single GeoTiff outputs.')
+
+            overview_factors = []
+
+        elif not use_dask_store and (resampling in BLOCK_OVERVIEW_METHODS):
+
+            # Levels that every window maps to without sharing overview cells with neighbors
+            block_factors = [factor for factor in overview_factors if (readysize % factor == 0) and (readxsize % factor == 0)]
+
+            if (len(block_factors) < len(overview_factors)) and (verbose > 0):
+                logger.info('  Overview factors that do not divide the window size are built after writing.')
+
+    overview_info = (block_factors, resampling) if block_factors else None
+
+    if pipeline and separate and (out_block_type.lower() == 'zarr'):
+
+        logger.warning('  The pipeline does not support separate zarr blocks, so the pipeline will not be used.')
+        pipeline = False
+
+    completed_windows = set()
+
+    if resuming:
+
+        if _check_resume_output(filename, zarr_store, separate, kwargs, overview_factors=block_factors):
+
+            completed_windows = _read_journal(journal_file)
+
+            if verbose > 0:
+                logger.info('  Resuming with {:,d} completed windows ...'.format(len(completed_windows)))
+
+        else:
+
+            logger.warning('  The existing output does not match the data, so the write will start over.')
+
+            if pfile.is_file():
+                pfile.unlink()
+            elif zarr_store and pfile.is_dir():
+                shutil.rmtree(str(pfile))
+
+            journal_file.unlink()
+            resuming = False
+
+    if resume and not resuming:
+
+        # The journal is created before the output, so a rerun resumes (or starts over) even if this run
+        #   stops before any window is written. An output without a journal is always complete.
+        journal_file.touch()
+
     root = None
 
-    if separate and (out_block_type.lower() == 'zarr'):
+    if zarr_store:
+
+        # The store is compressed by the zarr compressor
+        compress = False
+
+    if resuming:
+
+        if separate and (out_block_type.lower() == 'zarr'):
+
+            sub_dir = pfile.parent.joinpath('sub_tmp_')
+            zarr_file = str(sub_dir.joinpath('data.zarr'))
+            root = zarr.open(zarr_file, mode='a')
+
+    elif zarr_store:
+
+        if verbose > 0:
+            logger.info('  Creating the zarr store ...\n')
+
+        create_zarr(str(filename),
+                    (kwargs['count'], kwargs['height'], kwargs['width']),
+                    kwargs['dtype'] if 'dtype' in kwargs else data.dtype.name,
+                    (kwargs['count'], readysize, readxsize),
+                    kwargs['crs'],
+                    kwargs['transform'],
+                    (data.gw.cellx, data.gw.celly),
+                    nodata=kwargs['nodata'] if 'nodata' in kwargs else None,
+                    band_names=data.band.values if data.gw.has_band_coord else None,
+                    tags=tags)
+
+    elif separate and (out_block_type.lower() == 'zarr'):
 
         d_name = pfile.parent
         sub_dir = d_name.joinpath('sub_tmp_')
@@ -719,10 +1548,16 @@ def to_raster(data,
                 if tags:
                     rio_dst.update_tags(**tags)
 
+            if block_factors:
+                create_overviews(filename, block_factors)
+
     if verbose > 0:
         logger.info('  Writing data to file ...\n')
 
-    with rio.Env(GDAL_CACHEMAX=gdal_cache):
+    profiler = WindowProfiler(trace_file=instrument if isinstance(instrument, str) else None) if instrument else None
+
+    # The limits of this process are restored once the data are written
+    with rio.Env(GDAL_CACHEMAX=gdal_cache, GDAL_NUM_THREADS=thread_limits[0]), _thread_limits(*thread_limits):
 
         if not use_dask_store:
 
@@ -730,98 +1565,166 @@ def to_raster(data,
                                          data.gw.ncols,
                                          readysize,
                                          readxsize,
-                                         return_as='list',
+                                         return_as='grid',
                                          padding=padding)
 
+            if completed_windows:
+                windows = windows[~np.isin(windows.keys(), list(completed_windows))]
+
+            n_skipped = 0
+
+            if skip_empty and (data.gw.footprint_grid is not None):
+
+                # Skip windows outside of the source footprints before they are read
+                in_footprint = windows.intersects(data.gw.footprint_grid.geometry.unary_union, data.gw.transform)
+
+                n_skipped += int((~in_footprint).sum())
+                windows = windows[in_footprint]
+
             n_windows = len(windows)
 
+            journal = journal_file.open(mode='a') if resume else None
+
             oleft, otop = kwargs['transform'][2], kwargs['transform'][5]
             ocols, orows = kwargs['width'], kwargs['height']
 
-            # Iterate over the windows in chunks
-            for wchunk in range(0, n_windows, n_chunks):
-
-                window_slice = windows[wchunk:wchunk+n_chunks]
-                n_windows_slice = len(window_slice)
+            if pipeline:
+
+                utilization, n_skipped_pipeline = _write_pipeline(data,
+                                                                  filename,
+                                                                  windows,
+                                                                  padding,
+                                                                  n_readers if isinstance(n_readers, int) else n_workers,
+                                                                  n_workers,
+                                                                  n_threads,
+                                                                  queue_size if queue_size else n_workers * 2,
+                                                                  scheduler,
+                                                                  separate,
+                                                                  tags,
+                                                                  kwargs,
+                                                                  journal=journal,
+                                                                  skip_empty=skip_empty,
+                                                                  thread_limits=thread_limits,
+                                                                  profiler=profiler,
+                                                                  overview_info=overview_info)
+
+                n_skipped += n_skipped_pipeline
 
                 if verbose > 0:
 
-                    logger.info('  Windows {:,d}--{:,d} of {:,d} ...'.format(wchunk+1,
-                                                                             wchunk+n_windows_slice,
-                                                                             n_windows))
+                    logger.info('  Stage utilization: read {read:.0%}, compute {compute:.0%}, write {write:.0%}'.format(**utilization))
+
+            else:
+
+                # Iterate over the windows in chunks
+                for wchunk in range(0, n_windows, n_chunks):
 
-                if padding:
+                    window_slice = windows[wchunk:wchunk+n_chunks]
+                    n_windows_slice = len(window_slice)
 
-                    # Read the padded window
+                    if verbose > 0:
 
-                    if len(data.shape) == 2:
+                        logger.info('  Windows {:,d}--{:,d} of {:,d} ...'.format(wchunk+1,
+                                                                                 wchunk+n_windows_slice,
+                                                                                 n_windows))
 
-                        data_gen = ((data[w[1].row_off:w[1].row_off + w[1].height, w[1].col_off:w[1].col_off + w[1].width],
-                                     filename, widx, w[0], w[1], n_workers, n_threads, separate, chunksize, root, out_block_type, tags, oleft, otop, ocols, orows, kwargs) for widx, w in enumerate(window_slice))
+                    if padding:
 
-                    elif len(data.shape) == 3:
+                        # Read the padded window
 
-                        data_gen = ((data[:, w[1].row_off:w[1].row_off + w[1].height, w[1].col_off:w[1].col_off + w[1].width],
-                                     filename, widx, w[0], w[1], n_workers, n_threads, separate, chunksize, root, out_block_type, tags, oleft, otop, ocols, orows, kwargs) for widx, w in enumerate(window_slice))
+                        if len(data.shape) == 2:
+
+                            data_gen = ((data[w[1].row_off:w[1].row_off + w[1].height, w[1].col_off:w[1].col_off + w[1].width],
+                                         filename, widx, w[0], w[1], n_workers, n_threads, separate, chunksize, root, out_block_type, tags, oleft, otop, ocols, orows, skip_empty, instrument, overview_info, kwargs) for widx, w in enumerate(window_slice))
+
+                        elif len(data.shape) == 3:
+
+                            data_gen = ((data[:, w[1].row_off:w[1].row_off + w[1].height, w[1].col_off:w[1].col_off + w[1].width],
+                                         filename, widx, w[0], w[1], n_workers, n_threads, separate, chunksize, root, out_block_type, tags, oleft, otop, ocols, orows, skip_empty, instrument, overview_info, kwargs) for widx, w in enumerate(window_slice))
+
+                        else:
+
+                            data_gen = ((data[:, :, w[1].row_off:w[1].row_off + w[1].height, w[1].col_off:w[1].col_off + w[1].width],
+                                         filename, widx, w[0], w[1], n_workers, n_threads, separate, chunksize, root, out_block_type, tags, oleft, otop, ocols, orows, skip_empty, instrument, overview_info, kwargs) for widx, w in enumerate(window_slice))
 
                     else:
 
-                        data_gen = ((data[:, :, w[1].row_off:w[1].row_off + w[1].height, w[1].col_off:w[1].col_off + w[1].width],
-                                     filename, widx, w[0], w[1], n_workers, n_threads, separate, chunksize, root, out_block_type, tags, oleft, otop, ocols, orows, kwargs) for widx, w in enumerate(window_slice))
+                        if len(data.shape) == 2:
 
-                else:
+                            data_gen = ((data[w.row_off:w.row_off + w.height, w.col_off:w.col_off + w.width],
+                                         filename, widx, w, None, n_workers, n_threads, separate, chunksize, root, out_block_type, tags, oleft, otop, ocols, orows, skip_empty, instrument, overview_info, kwargs) for widx, w in enumerate(window_slice))
 
-                    if len(data.shape) == 2:
+                        elif len(data.shape) == 3:
 
-                        data_gen = ((data[w.row_off:w.row_off + w.height, w.col_off:w.col_off + w.width],
-                                     filename, widx, w, None, n_workers, n_threads, separate, chunksize, root, out_block_type, tags, oleft, otop, ocols, orows, kwargs) for widx, w in enumerate(window_slice))
+                            data_gen = ((data[:, w.row_off:w.row_off + w.height, w.col_off:w.col_off + w.width],
+                                         filename, widx, w, None, n_workers, n_threads, separate, chunksize, root, out_block_type, tags, oleft, otop, ocols, orows, skip_empty, instrument, overview_info, kwargs) for widx, w in enumerate(window_slice))
 
-                    elif len(data.shape) == 3:
+                        else:
+
+                            data_gen = ((data[:, :, w.row_off:w.row_off + w.height, w.col_off:w.col_off + w.width],
+                                         filename, widx, w, None, n_workers, n_threads, separate, chunksize, root, out_block_type, tags, oleft, otop, ocols, orows, skip_empty, instrument, overview_info, kwargs) for widx, w in enumerate(window_slice))
+
+                    # The overviews of the windows, and their window ids, held until the parent writes them
+                    overview_windows = []
+                    overview_keys = []
+
+                    if n_workers == 1:
+
+                        for wkey, written, record, overviews in tqdm(map(_write_xarray, data_gen), total=n_windows_slice):
+
+                            n_skipped += not written
+
+                            if profiler:
+                                profiler.add(record)
 
-                        data_gen = ((data[:, w.row_off:w.row_off + w.height, w.col_off:w.col_off + w.width],
-                                     filename, widx, w, None, n_workers, n_threads, separate, chunksize, root, out_block_type, tags, oleft, otop, ocols, orows, kwargs) for widx, w in enumerate(window_slice))
+                            if overviews:
+
+                                overview_windows.append(overviews)
+                                overview_keys.append(wkey)
+
+                            elif journal:
+                                journal.write(wkey + '\n')
+                                journal.flush()
 
                     else:
 
-                        data_gen = ((data[:, :, w.row_off:w.row_off + w.height, w.col_off:w.col_off + w.width],
-                                     filename, widx, w, None, n_workers, n_threads, separate, chunksize, root, out_block_type, tags, oleft, otop, ocols, orows, kwargs) for widx, w in enumerate(window_slice))
+                        with pool_executor(n_workers, initializer=_limit_threads, initargs=thread_limits) as executor:
 
-                if n_workers == 1:
+                            if scheduler == 'mpool':
+                                results = executor.imap_unordered(_write_xarray, data_gen)
+                            else:
+                                results = executor.map(_write_xarray, data_gen)
 
-                    for __ in tqdm(map(_write_xarray, data_gen), total=n_windows_slice):
-                        pass
+                            for wkey, written, record, overviews in tqdm(results, total=n_windows_slice):
 
-                else:
+                                n_skipped += not written
 
-                    with pool_executor(n_workers) as executor:
+                                if profiler:
+                                    profiler.add(record)
 
-                        if scheduler == 'mpool':
+                                if overviews:
 
-                            for __ in tqdm(executor.imap_unordered(_write_xarray, data_gen), total=n_windows_slice):
-                                pass
+                                    overview_windows.append(overviews)
+                                    overview_keys.append(wkey)
 
-                        else:
+                                elif journal:
+                                    journal.write(wkey + '\n')
+                                    journal.flush()
+
+                    if overview_windows:
+
+                        # The workers of this chunk are finished, so the parent is the only writer
+                        _write_overview_blocks(filename, overview_windows, overview_info[0])
+
+                        if journal:
+                            journal.write(''.join(wkey + '\n' for wkey in overview_keys))
+                            journal.flush()
 
-                            for __ in tqdm(executor.map(_write_xarray, data_gen), total=n_windows_slice):
-                                pass
-
-            # if overviews:
-            #
-            #     if not isinstance(overviews, list):
-            #         overviews = [2, 4, 8, 16]
-            #
-            #     if resampling not in ['average', 'bilinear', 'cubic', 'cubic_spline',
-            #                           'gauss', 'lanczos', 'max', 'med', 'min', 'mode', 'nearest']:
-            #
-            #         logger.warning("  The resampling method is not supported by rasterio. Setting to 'nearest'")
-            #
-            #         resampling = 'nearest'
-            #
-            #     if verbose > 0:
-            #         logger.info('  Building pyramid overviews ...')
-            #
-            #     rio_dst.build_overviews(overviews, getattr(Resampling, resampling))
-            #     rio_dst.update_tags(ns='overviews', resampling=resampling)
+            if journal:
+                journal.close()
+
+            if skip_empty and (verbose > 0):
+                logger.info('  Skipped {:,d} empty windows.'.format(n_skipped))
 
         else:
 
@@ -835,27 +1738,16 @@ def to_raster(data,
 
                 with client_object(address=cluster_address) as client:
 
-                    with WriteDaskArray(filename,
-                                        overwrite=overwrite,
-                                        separate=separate,
-                                        out_block_type=out_block_type,
-                                        keep_blocks=keep_blocks,
-                                        gdal_cache=gdal_cache,
-                                        **kwargs) as dst:
-
-                        # Store the data and return a lazy evaluator
-                        res = da.store(da.squeeze(data.data),
-                                       dst,
+                    if zarr_store:
+
+                        dask_data = data.data if data.gw.ndims > 2 else data.data[np.newaxis]
+
+                        # Match the zarr chunks so that no two tasks write to the same chunk
+                        res = da.store(dask_data.rechunk((kwargs['count'], readysize, readxsize)),
+                                       zarr.open_array(str(filename), mode='r+', path='data'),
                                        lock=False,
                                        compute=False)
 
-                        if verbose > 0:
-                            logger.info('  Writing data to file ...')
-
-                        # Send the data to file
-                        #
-                        # *Note that the progress bar will
-                        #   not work with a client.
                         if use_client:
                             res.compute(num_workers=n_jobs)
                         else:
@@ -863,13 +1755,44 @@ def to_raster(data,
                             with ProgressBar():
                                 res.compute(num_workers=n_jobs)
 
-                        if verbose > 0:
-                            logger.info('  Finished writing data to file.')
+                    else:
+
+                        with WriteDaskArray(filename,
+                                            overwrite=overwrite,
+                                            separate=separate,
+                                            out_block_type=out_block_type,
+                                            keep_blocks=keep_blocks,
+                                            gdal_cache=gdal_cache,
+                                            profiler=profiler,
+                                            **kwargs) as dst:
+
+                            # Store the data and return a lazy evaluator
+                            res = da.store(da.squeeze(data.data),
+                                           dst,
+                                           lock=False,
+                                           compute=False)
+
+                            if verbose > 0:
+                                logger.info('  Writing data to file ...')
+
+                            # Send the data to file
+                            #
+                            # *Note that the progress bar will
+                            #   not work with a client.
+                            if use_client:
+                                res.compute(num_workers=n_jobs)
+                            else:
+
+                                with ProgressBar():
+                                    res.compute(num_workers=n_jobs)
 
-                        out_block_type = dst.out_block_type
-                        keep_blocks = dst.keep_blocks
-                        zarr_file = dst.zarr_file
-                        sub_dir = dst.sub_dir
+                            if verbose > 0:
+                                logger.info('  Finished writing data to file.')
+
+                            out_block_type = dst.out_block_type
+                            keep_blocks = dst.keep_blocks
+                            zarr_file = dst.zarr_file
+                            sub_dir = dst.sub_dir
 
         if compress:
 
@@ -970,11 +1893,39 @@ def to_raster(data,
                                 compress=compress_type,
                                 tags=tags)
 
+                if block_factors:
+
+                    # Carry over the overviews that were built during the write
+                    copy_overviews(filename, str(temp_file), block_factors)
+
                 temp_file.rename(filename)
 
             if verbose > 0:
                 logger.info('  Finished compressing')
 
+    if overview_factors:
+
+        post_factors = [factor for factor in overview_factors if factor not in block_factors]
+
+        with rio.open(filename, mode='r+') as rio_dst:
+
+            if post_factors:
+
+                if verbose > 0:
+                    logger.info('  Building pyramid overviews ...')
+
+                rio_dst.build_overviews(post_factors, getattr(Resampling, resampling))
+
+            rio_dst.update_tags(ns='overviews', resampling=resampling)
+
+    if profiler:
+
+        profiler.close()
+        profiler.log_summary()
+
+    if resume and journal_file.is_file():
+        journal_file.unlink()
+
     if verbose > 0:
         logger.info('\nFinished writing the data.')
 
@@ -994,6 +1945,7 @@ def apply(infile,
           n_jobs=4,
           overwrite=False,
           tags=None,
+          instrument=False,
           **kwargs):
 
     """
@@ -1012,6 +1964,8 @@ def apply(infile,
         n_jobs (Optional[int]): The number of blocks to process in parallel.
         overwrite (Optional[bool]): Whether to overwrite an existing output file.
         tags (Optional[dict]): Image tags to write to file.
+        instrument (Optional[bool or str]): Whether to record per-block timings and log a summary at the end.
+            If a file name is given, a Chrome trace timeline is also written to it. See ``to_raster``.
         kwargs (Optional[dict]): Additional keyword arguments to pass to ``rasterio.open``.
 
     Returns:
@@ -1057,6 +2011,8 @@ def apply(infile,
 
     futures_executor = concurrent.futures.ThreadPoolExecutor if scheduler == 'threads' else concurrent.futures.ProcessPoolExecutor
 
+    profiler = WindowProfiler(trace_file=instrument if isinstance(instrument, str) else None) if instrument else None
+
     with rio.Env(GDAL_CACHEMAX=gdal_cache):
 
         with rio.open(infile) as src:
@@ -1098,7 +2054,10 @@ def apply(infile,
                 # of it with the windows list to get (window, result)
                 # pairs.
                 # if nbands == 1:
-                data_gen = (src.read(window=w, out_dtype=profile['dtype']) for ij, w in src.block_windows(1))
+                if profiler:
+                    data_gen = _timed_read_gen(src, profile['dtype'], profiler)
+                else:
+                    data_gen = (src.read(window=w, out_dtype=profile['dtype']) for ij, w in src.block_windows(1))
                 # else:
                 #
                 #     data_gen = (np.array([rio.open(fn).read(window=w,
@@ -1110,20 +2069,42 @@ def apply(infile,
 
                 with futures_executor(max_workers=n_jobs) as executor:
 
-                    # Submit all of the tasks as futures
-                    futures = [executor.submit(block_func,
-                                               iter_[0][1],    # window object
-                                               *iter_[1:])     # other arguments
-                               for iter_ in zip(list(src.block_windows(1)), data_gen, *args)]
+                    if profiler:
+
+                        # Submit all of the tasks as futures
+                        futures = [executor.submit(_timed_block_func,
+                                                   block_func,
+                                                   iter_[0][1],    # window object
+                                                   *iter_[1:])     # other arguments
+                                   for iter_ in zip(list(src.block_windows(1)), data_gen, *args)]
+
+                    else:
+
+                        # Submit all of the tasks as futures
+                        futures = [executor.submit(block_func,
+                                                   iter_[0][1],    # window object
+                                                   *iter_[1:])     # other arguments
+                                   for iter_ in zip(list(src.block_windows(1)), data_gen, *args)]
 
                     for f in tqdm(concurrent.futures.as_completed(futures), total=len(futures)):
 
-                        out_window, out_block = f.result()
+                        if profiler:
+
+                            out_window, out_block, record = f.result()
+                            profiler.add(record)
+
+                        else:
+                            out_window, out_block = f.result()
+
+                        t0 = time.time()
 
                         dst.write(np.squeeze(out_block),
                                   window=out_window,
                                   indexes=out_indexes)
 
+                        if profiler:
+                            profiler.add(window_record(_window_key(out_window), write=(t0, time.time()), bytes_written=out_block.nbytes))
+
                     # We map the block_func() function over the raster
                     # data generator, zip the resulting iterator with
                     # the windows list, and as pairs come back we
@@ -1138,6 +2119,41 @@ def apply(infile,
                     #               window=window_tuple[1],
                     #               indexes=out_indexes)
 
+    if profiler:
+
+        profiler.close()
+        profiler.log_summary()
+
+
+def _timed_read_gen(src, dtype, profiler):
+
+    """
+    Reads the blocks of a dataset and records the read times
+    """
+
+    for ij, w in src.block_windows(1):
+
+        t0 = time.time()
+
+        data = src.read(window=w, out_dtype=dtype)
+
+        profiler.add(window_record(_window_key(w), read=(t0, time.time()), bytes_read=data.nbytes))
+
+        yield data
+
+
+def _timed_block_func(block_func, w, *args):
+
+    """
+    Applies a block function and records the compute time
+    """
+
+    t0 = time.time()
+
+    out_window, out_block = block_func(w, *args)
+
+    return out_window, out_block, window_record(_window_key(w), compute=(t0, time.time()))
+
 
 def _compress_dummy(w, block, dummy):
 
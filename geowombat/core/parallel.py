@@ -2,6 +2,7 @@ import multiprocessing as multi
 import concurrent.futures
 
 from .windows import get_window_offsets
+from .profiling import WindowProfiler, TimedFunc
 
 from tqdm import tqdm
 
@@ -31,6 +32,9 @@ class ParallelTask(object):
             threads: thread pool of workers using ``concurrent.futures``
         n_workers (Optional[int]): The number of parallel workers for ``scheduler``.
         n_chunks (Optional[int]): The chunk size of windows. If not given, equal to ``n_workers`` x 50.
+        instrument (Optional[bool or str]): Whether to record the time, worker and peak RSS of each window.
+            A summary is logged after each ``map`` and kept in ``profiler``. If a file name is given, a Chrome
+            trace timeline is also written to it.
 
     Example:
         >>> import geowombat as gw
@@ -56,7 +60,8 @@ class ParallelTask(object):
                  padding=None,
                  scheduler='threads',
                  n_workers=1,
-                 n_chunks=None):
+                 n_chunks=None,
+                 instrument=False):
 
         self.data = data
         self.padding = padding
@@ -65,6 +70,8 @@ class ParallelTask(object):
         self.executor = _EXEC_DICT[scheduler]
         self.n_workers = n_workers
         self.n_chunks = n_chunks
+        self.instrument = instrument
+        self.profiler = None
 
         self.windows = None
         self.n_windows = None
@@ -83,7 +90,7 @@ class ParallelTask(object):
                                           self.data.gw.ncols,
                                           rchunksize,
                                           cchunksize,
-                                          return_as='list',
+                                          return_as='grid',
                                           padding=self.padding)
 
         self.n_windows = len(self.windows)
@@ -102,6 +109,15 @@ class ParallelTask(object):
 
         results = []
 
+        if self.instrument:
+
+            self.profiler = WindowProfiler(trace_file=self.instrument if isinstance(self.instrument, str) else None)
+
+            map_func = TimedFunc(func)
+
+        else:
+            map_func = func
+
         # Iterate over the windows in chunks
         for wchunk in range(0, self.n_windows, self.n_chunks):
 
@@ -127,10 +143,16 @@ class ParallelTask(object):
                 else:
                     data_gen = ((self.data[:, :, w.row_off:w.row_off + w.height, w.col_off:w.col_off + w.width], *args) for widx, w in enumerate(window_slice))
 
+            if self.instrument:
+
+                # Pair each item with its window id
+                data_gen = zip(('y{:09d}_x{:09d}'.format((w[0] if self.padding else w).row_off,
+                                                         (w[0] if self.padding else w).col_off) for w in window_slice), data_gen)
+
             if self.n_workers == 1:
 
-                for result in tqdm(map(func, data_gen), total=n_windows_slice):
-                    results.append(result)
+                for result in tqdm(map(map_func, data_gen), total=n_windows_slice):
+                    results.append(self._unpack(result))
 
             else:
 
@@ -138,12 +160,26 @@ class ParallelTask(object):
 
                     if self.scheduler == 'mpool':
 
-                        for result in tqdm(executor.imap_unordered(func, data_gen), total=n_windows_slice):
-                            results.append(result)
+                        for result in tqdm(executor.imap_unordered(map_func, data_gen), total=n_windows_slice):
+                            results.append(self._unpack(result))
 
                     else:
 
-                        for result in tqdm(executor.map(func, data_gen), total=n_windows_slice):
-                            results.append(result)
+                        for result in tqdm(executor.map(map_func, data_gen), total=n_windows_slice):
+                            results.append(self._unpack(result))
+
+        if self.profiler:
+
+            self.profiler.close()
+            self.profiler.log_summary()
 
         return results
+
+    def _unpack(self, result):
+
+        if self.profiler:
+
+            result, record = result
+            self.profiler.add(record)
+
+        return result
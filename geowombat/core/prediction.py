@@ -0,0 +1,304 @@
+import os
+import tempfile
+import threading
+
+from .io import to_raster
+
+import numpy as np
+import xarray as xr
+import dask.array as da
+import joblib
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+# Models loaded by each worker process, keyed by model file
+_WORKER_MODELS = {}
+_WORKER_LOCK = threading.Lock()
+
+
+class ModelRef(object):
+
+    """
+    A light-weight, picklable reference to a fitted model
+
+    When a model file is set, only the file name is pickled, and each worker process loads the
+    model once on first use. Without a model file, the model is held in memory (e.g., for threads).
+
+    Args:
+        model (Optional[object]): A fitted model with a ``predict`` method.
+        model_file (Optional[str]): A ``joblib`` model file.
+    """
+
+    def __init__(self, model=None, model_file=None):
+
+        self.model = model
+        self.model_file = model_file
+
+    def __getstate__(self):
+
+        state = self.__dict__.copy()
+
+        # Workers load the model from file instead of receiving it with each task
+        if self.model_file:
+            state['model'] = None
+
+        return state
+
+    def get(self):
+
+        """
+        Gets the model
+
+        Returns:
+            ``object``
+        """
+
+        if self.model is not None:
+            return self.model
+
+        with _WORKER_LOCK:
+
+            if self.model_file not in _WORKER_MODELS:
+                _WORKER_MODELS[self.model_file] = joblib.load(self.model_file)
+
+            return _WORKER_MODELS[self.model_file]
+
+
+def _predict_block(block, model_ref=None, proba=False, n_outputs=1, batch_size=5000, nodata=None, out_nodata=None, scale=None, out_dtype='uint8'):
+
+    """
+    Predicts one chunk
+
+    The chunk is reshaped to (pixels x features), rows with 'no data' or non-finite values are dropped,
+    and the remaining rows are passed to the model in batches.
+
+    Args:
+        block (3d array): The predictors, shaped (features, rows, columns).
+        model_ref (ModelRef): The model reference.
+        proba (Optional[bool]): Whether to predict class probabilities.
+        n_outputs (Optional[int]): The number of output layers.
+        batch_size (Optional[int]): The number of pixels to pass to the model at once.
+        nodata (Optional[int or float]): The 'no data' value of the predictors.
+        out_nodata (Optional[int or float]): The output 'no data' value.
+        scale (Optional[float]): A scale factor for probabilities.
+        out_dtype (Optional[str]): The output data type.
+
+    Returns:
+        3d ``numpy.ndarray``, shaped (outputs, rows, columns)
+    """
+
+    n_features, nrows, ncols = block.shape
+
+    X = block.reshape(n_features, nrows*ncols).T
+
+    valid = np.isfinite(X).all(axis=1) if np.issubdtype(X.dtype, np.floating) else np.ones(X.shape[0], dtype='bool')
+
+    if nodata is not None:
+        valid &= ~(X == nodata).any(axis=1)
+
+    valid_idx = np.flatnonzero(valid)
+
+    out = np.full((nrows*ncols, n_outputs), out_nodata if out_nodata is not None else 0, dtype=out_dtype)
+
+    if valid_idx.shape[0] > 0:
+
+        model = model_ref.get()
+
+        for i in range(0, valid_idx.shape[0], batch_size):
+
+            batch_idx = valid_idx[i:i+batch_size]
+
+            if proba:
+
+                pred = model.predict_proba(X[batch_idx])
+
+                if scale:
+                    pred = np.round(pred * scale)
+
+            else:
+                pred = model.predict(X[batch_idx])
+
+            out[batch_idx] = np.asarray(pred).reshape(batch_idx.shape[0], n_outputs)
+
+    return out.T.reshape(n_outputs, nrows, ncols)
+
+
+def predict(data,
+            clf,
+            outname=None,
+            chunksize='same',
+            x_chunks=(5000, 1),
+            overwrite=False,
+            return_as='array',
+            n_jobs=1,
+            backend='dask',
+            verbose=0,
+            nodata=None,
+            dtype='uint8',
+            gdal_cache=512,
+            proba=False,
+            scale=None,
+            out_nodata=None,
+            **kwargs):
+
+    """
+    Predicts an image using a pre-fit model, one chunk at a time
+
+    Each chunk is reshaped to (pixels x features), 'no data' pixels are dropped and the remaining
+    pixels are predicted in batches of ``x_chunks[0]``. When ``outname`` is given, predictions are streamed to
+    file with ``geowombat.to_raster``, and the model is written to a temporary file that each worker process
+    loads once, so memory is bounded by the chunk size and the model is not sent with every task.
+
+    Args:
+        data (DataArray): The predictors, shaped (band, y, x), where each band is a feature.
+        clf (object or str): A fitted model with ``predict`` (and ``predict_proba``) methods, or a ``joblib`` model file.
+        outname (Optional[str]): A file name for the predictions. If not given, the lazy predictions are returned.
+        chunksize (Optional[str or tuple]): The (row, column) chunk size to predict. Default is 'same', or use the
+            input chunk size.
+        x_chunks (Optional[tuple]): The first item is the number of pixels to pass to the model at once.
+        overwrite (Optional[bool]): Whether to overwrite an existing file.
+        return_as (Optional[str]): Whether to return the predictions as a ``xarray.DataArray`` ('array') or
+            ``xarray.Dataset`` ('dataset'). Only relevant if ``outname`` is not given.
+        n_jobs (Optional[int]): The number of parallel workers for writing.
+        backend (Optional[str]): The ``to_raster`` scheduler. 'dask' uses the ``to_raster`` default.
+        verbose (Optional[int]): The verbosity level.
+        nodata (Optional[int or float]): The 'no data' value in the predictors.
+        dtype (Optional[str]): The output data type. Probabilities are typically 'float32', or 'uint8' with ``scale``.
+        gdal_cache (Optional[int]): The GDAL cache (in MB) passed to ``to_raster``.
+        proba (Optional[bool]): Whether to predict class probabilities, with one output band per class.
+        scale (Optional[float]): A scale factor for probabilities (e.g., 100 for percentages in 'uint8').
+        out_nodata (Optional[int or float]): The output 'no data' value. Default is 0, or 255 for scaled
+            'uint8' probabilities.
+        kwargs (Optional[dict]): Additional keyword arguments passed to ``to_raster`` (e.g., ``n_threads`` per worker).
+
+    Returns:
+        ``xarray.DataArray`` or ``xarray.Dataset`` if ``outname`` is not given, otherwise ``None``
+
+    Examples:
+        >>> import geowombat as gw
+        >>> from sklearn import ensemble
+        >>>
+        >>> clf = ensemble.RandomForestClassifier()
+        >>> clf.fit(X, y)
+        >>>
+        >>> with gw.open('image.tif') as ds:
+        >>>     pred = ds.gw.predict(clf)
+        >>>
+        >>> # Stream class probabilities, as percentages, to file
+        >>> with gw.open('mosaic.vrt', chunks=1024) as ds:
+        >>>     ds.gw.predict(clf, outname='proba.tif', proba=True, scale=100, dtype='uint8', n_jobs=8)
+    """
+
+    if return_as not in ['array', 'dataset']:
+        logger.exception("  The return_as argument must be 'array' or 'dataset'.")
+        raise NameError
+
+    if data.gw.ndims != 3:
+        logger.exception('  The predictors must be shaped (band, y, x).')
+        raise ValueError
+
+    if outname and os.path.isfile(outname):
+
+        if overwrite:
+            os.remove(outname)
+        else:
+            logger.warning('  The output file already exists.')
+            return
+
+    model_file = None
+    temp_model_file = None
+
+    if isinstance(clf, str):
+
+        model_file = clf
+        model = joblib.load(model_file)
+
+    else:
+        model = clf
+
+    if proba:
+
+        if not hasattr(model, 'predict_proba'):
+            logger.exception('  The model does not have a predict_proba method.')
+            raise AttributeError
+
+        n_outputs = len(model.classes_)
+        band_names = model.classes_.tolist()
+
+    else:
+
+        n_outputs = 1
+        band_names = ['pred']
+
+    if out_nodata is None:
+        out_nodata = 255 if proba and scale and (np.dtype(dtype) == np.dtype('uint8')) else 0
+
+    if outname and not model_file:
+
+        # Workers load the model from file once rather than receiving it with each task
+        temp_model_file = tempfile.NamedTemporaryFile(suffix='.joblib', delete=False).name
+        joblib.dump(model, temp_model_file)
+
+        model_file = temp_model_file
+
+    model_ref = ModelRef(model=model, model_file=model_file)
+
+    row_chunks, col_chunks = (data.gw.row_chunks, data.gw.col_chunks) if chunksize == 'same' else chunksize
+
+    # All features of a chunk are predicted together
+    predictors = data.data.rechunk((-1, row_chunks, col_chunks))
+
+    pred = da.map_blocks(_predict_block,
+                         predictors,
+                         model_ref=model_ref,
+                         proba=proba,
+                         n_outputs=n_outputs,
+                         batch_size=x_chunks[0],
+                         nodata=nodata,
+                         out_nodata=out_nodata,
+                         scale=scale,
+                         out_dtype=dtype,
+                         dtype=dtype,
+                         chunks=((n_outputs,),) + predictors.chunks[1:],
+                         meta=np.array((), dtype=dtype))
+
+    attrs = data.attrs.copy()
+    attrs['nodatavals'] = (out_nodata,) * n_outputs
+
+    pred = xr.DataArray(data=pred,
+                        dims=('band', 'y', 'x'),
+                        coords={'band': band_names,
+                                'y': data.y,
+                                'x': data.x},
+                        attrs=attrs)
+
+    if outname:
+
+        if backend != 'dask':
+            kwargs['scheduler'] = backend
+
+        try:
+
+            to_raster(pred,
+                      outname,
+                      n_workers=n_jobs,
+                      n_threads=kwargs.pop('n_threads', 1),
+                      verbose=verbose,
+                      gdal_cache=gdal_cache,
+                      dtype=pred.dtype.name,
+                      nodata=out_nodata,
+                      **kwargs)
+
+        finally:
+
+            if temp_model_file and os.path.isfile(temp_model_file):
+                os.remove(temp_model_file)
+
+    else:
+
+        if return_as == 'dataset':
+            return pred.to_dataset(name='pred' if not proba else 'proba')
+
+        return pred
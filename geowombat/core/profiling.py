@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import resource
+    RESOURCE_INSTALLED = True
+except:
+    RESOURCE_INSTALLED = False
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+STAGES = ['read', 'compute', 'write']
+
+
+def peak_rss():
+
+    """
+    Gets the peak resident set size of the current process (in bytes)
+
+    Returns:
+        ``int`` or ``None``
+    """
+
+    if not RESOURCE_INSTALLED:
+        return None
+
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def worker_id():
+
+    """
+    Gets an id for the current process and thread
+
+    Returns:
+        ``tuple`` of (process id, thread id)
+    """
+
+    return os.getpid(), threading.get_ident()
+
+
+def window_record(window_key, **stages):
+
+    """
+    Creates a window record
+
+    Args:
+        window_key (str): The window id.
+        stages (dict): Stage keywords. Stage names map to (start, end) time tuples and
+            'bytes_read' and 'bytes_written' map to byte counts.
+
+    Returns:
+        ``dict``
+
+    Example:
+        >>> t0 = time.time()
+        >>> data = src.read(window=w)
+        >>> record = window_record('y0_x0', read=(t0, time.time()), bytes_read=data.nbytes)
+    """
+
+    pid, tid = worker_id()
+
+    record = dict(window=window_key,
+                  pid=pid,
+                  tid=tid,
+                  peak_rss=peak_rss(),
+                  bytes_read=0,
+                  bytes_written=0)
+
+    record.update(stages)
+
+    return record
+
+
+class WindowProfiler(object):
+
+    """
+    A class to collect per-window read, compute and write timings
+
+    Records are created with ``window_record`` (usually inside workers), returned to the
+    main process and added with ``add``. Stages of the same window may be recorded separately.
+
+    Args:
+        trace_file (Optional[str]): A file to write a Chrome trace (chrome://tracing or Perfetto) to on ``close``.
+
+    Example:
+        >>> import geowombat as gw
+        >>>
+        >>> with gw.open('input.tif') as ds:
+        >>>     gw.to_raster(ds, 'output.tif', n_workers=4, instrument='trace.json')
+    """
+
+    def __init__(self, trace_file=None):
+
+        self.trace_file = trace_file
+        self.records = []
+        self.start = time.time()
+        self.end = None
+
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+
+        # Locks cannot be pickled
+        state = self.__dict__.copy()
+        del state['_lock']
+
+        return state
+
+    def __setstate__(self, state):
+
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add(self, record):
+
+        """
+        Adds a window record
+
+        Args:
+            record (dict): A record from ``window_record``.
+        """
+
+        with self._lock:
+            self.records.append(record)
+
+    def stage_times(self, stage):
+
+        """
+        Gets the durations of a stage (in seconds)
+
+        Args:
+            stage (str): The stage name. Choices are ['read', 'compute', 'write'].
+
+        Returns:
+            ``numpy.ndarray``
+        """
+
+        return np.array([r[stage][1] - r[stage][0] for r in self.records if stage in r], dtype='float64')
+
+    def summary(self):
+
+        """
+        Summarizes the window records
+
+        Returns:
+            ``dict`` with per-stage counts, totals and percentiles (in seconds), the bytes read and written,
+            the throughput (in MB/s of wall time), the number of workers and the peak RSS (in MB)
+        """
+
+        wall = max((self.end if self.end else time.time()) - self.start, 1e-9)
+
+        stats = dict(wall=wall,
+                     n_windows=len(set(r['window'] for r in self.records)),
+                     n_workers=len(set((r['pid'], r['tid']) for r in self.records)))
+
+        for stage in STAGES:
+
+            times = self.stage_times(stage)
+
+            if times.shape[0] > 0:
+
+                p50, p90, p99 = np.percentile(times, [50, 90, 99])
+
+                stats[stage] = dict(n=times.shape[0],
+                                    total=times.sum(),
+                                    mean=times.mean(),
+                                    p50=p50,
+                                    p90=p90,
+                                    p99=p99,
+                                    max=times.max())
+
+        bytes_read = sum(r['bytes_read'] for r in self.records)
+        bytes_written = sum(r['bytes_written'] for r in self.records)
+
+        stats['bytes_read'] = bytes_read
+        stats['bytes_written'] = bytes_written
+        stats['read_mbs'] = bytes_read / 1e6 / wall
+        stats['write_mbs'] = bytes_written / 1e6 / wall
+
+        rss = [r['peak_rss'] for r in self.records if r['peak_rss'] is not None]
+        stats['peak_rss_mb'] = max(rss) / 1e6 if rss else None
+
+        return stats
+
+    def log_summary(self):
+
+        """
+        Logs the summary at the info level
+        """
+
+        stats = self.summary()
+
+        logger.info('  {n_windows:,d} windows on {n_workers:,d} workers in {wall:.2f} seconds'.format(**stats))
+
+        for stage in STAGES:
+
+            if stage in stats:
+
+                logger.info('  {stage}: total {total:.2f}s, p50 {p50:.3f}s, p90 {p90:.3f}s, p99 {p99:.3f}s, max {max:.3f}s'.format(stage=stage,
+                                                                                                                              **stats[stage]))
+
+        logger.info('  Read {:.1f} MB/s, wrote {:.1f} MB/s'.format(stats['read_mbs'], stats['write_mbs']))
+
+        if stats['peak_rss_mb'] is not None:
+            logger.info('  Peak worker RSS: {:.1f} MB'.format(stats['peak_rss_mb']))
+
+    def to_chrome_trace(self, filename):
+
+        """
+        Writes the records to a Chrome trace event file
+
+        Args:
+            filename (str): The output JSON file.
+        """
+
+        events = []
+
+        for r in self.records:
+
+            for stage in STAGES:
+
+                if stage in r:
+
+                    t0, t1 = r[stage]
+
+                    events.append(dict(name=stage,
+                                       cat='window',
+                                       ph='X',
+                                       ts=(t0 - self.start) * 1e6,
+                                       dur=(t1 - t0) * 1e6,
+                                       pid=r['pid'],
+                                       tid=r['tid'],
+                                       args=dict(window=r['window'],
+                                                 bytes_read=r['bytes_read'],
+                                                 bytes_written=r['bytes_written'],
+                                                 peak_rss=r['peak_rss'])))
+
+        with open(str(Path(filename)), mode='w') as tf:
+            json.dump(dict(traceEvents=events, displayTimeUnit='ms'), tf)
+
+    def close(self):
+
+        """
+        Stops the clock and writes the trace file, if given
+        """
+
+        self.end = time.time()
+
+        if self.trace_file:
+            self.to_chrome_trace(self.trace_file)
+
+
+class TimedFunc(object):
+
+    """
+    A picklable wrapper that records the time of a function applied to a window
+
+    The wrapped function is called with items of (window id, function arguments).
+
+    Args:
+        func (func): The function to wrap.
+
+    Returns:
+        ``tuple`` of (function result, window record)
+    """
+
+    def __init__(self, func):
+        self.func = func
+
+    def __call__(self, item):
+
+        window_key, args = item
+
+        t0 = time.time()
+
+        result = self.func(args)
+
+        return result, window_record(window_key, compute=(t0, time.time()))
@@ -1,14 +1,15 @@
 from pathlib import Path
 from collections import namedtuple
 
-from .util import n_rows_cols
+from .windows import WindowGrid
 
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 from rasterio.coords import BoundingBox
 from affine import Affine
 import shapely
-from shapely.geometry import Polygon
+from shapely.geometry import Polygon, box
 
 try:
     from shapely import speedups
@@ -702,42 +703,99 @@ class DataProperties(object):
     @property
     def chunk_grid(self):
 
-        """Get the image chunk grid"""
+        """
+        Get the image chunk grid
+
+        The grid is cached on the accessor until the array shape, chunks or transform change. Besides
+        the 'chunk' id (1-based), each chunk has its 'row_chunk' and 'col_chunk' indices and its
+        'row_off', 'col_off', 'height' and 'width' window offsets.
+        """
 
-        geometries = []
+        grid_key = (self.nrows, self.ncols, self.row_chunks, self.col_chunks, tuple(self.transform), str(self._obj.crs))
 
-        top = self.top
-        for i in range(0, self.nrows, self.row_chunks):
+        if getattr(self, '_chunk_grid_key', None) == grid_key:
+            return self._chunk_grid
 
-            i_csize = n_rows_cols(i, self.row_chunks, self.nrows)
-            bottom = top - (i_csize * abs(self.celly))
-            left = self.left
+        windows = WindowGrid.from_shape(self.nrows, self.ncols, self.row_chunks, self.col_chunks)
 
-            for j in range(0, self.ncols, self.col_chunks):
+        bounds = windows.bounds(self.transform)
 
-                j_csize = n_rows_cols(j, self.col_chunks, self.ncols)
-                right = left + (j_csize * abs(self.cellx))
+        if hasattr(shapely, 'box'):
 
-                geom = Polygon([(left, bottom),
-                                (left, top),
-                                (right, top),
-                                (right, bottom),
-                                (left, bottom)])
+            # Vectorized in shapely>=2.0
+            geometries = shapely.box(bounds[:, 0], bounds[:, 1], bounds[:, 2], bounds[:, 3])
 
-                geometries.append(geom)
+        else:
+            geometries = [box(*b) for b in bounds.tolist()]
 
-                left += self.col_chunks * abs(self.cellx)
-            top -= self.row_chunks * abs(self.celly)
+        n_col_chunks = int(np.ceil(self.ncols / self.col_chunks))
 
-        return gpd.GeoDataFrame(data=list(range(1, len(geometries)+1)),
-                                columns=['chunk'],
-                                geometry=geometries,
-                                crs=self._obj.crs)
+        chunk_ids = np.arange(0, len(windows))
+
+        self._chunk_grid = gpd.GeoDataFrame(data={'chunk': chunk_ids + 1,
+                                                  'row_chunk': chunk_ids // n_col_chunks,
+                                                  'col_chunk': chunk_ids % n_col_chunks,
+                                                  'row_off': windows.row_off,
+                                                  'col_off': windows.col_off,
+                                                  'height': windows.height,
+                                                  'width': windows.width},
+                                            geometry=geometries,
+                                            crs=self._obj.crs)
+
+        self._chunk_grid_key = grid_key
+
+        return self._chunk_grid
+
+    def chunks_intersecting(self, geometry):
+
+        """
+        Gets the chunks that intersect a geometry
+
+        Chunks are queried with the spatial index (an STRtree with shapely>=2.0 or pygeos) of the cached
+        ``chunk_grid``, so only the chunks that a geometry touches need to be processed.
+
+        Args:
+            geometry (Shapely geometry, GeoSeries or GeoDataFrame): The geometry to query. ``GeoSeries`` and
+                ``GeoDataFrame`` geometries are transformed to the array CRS.
+
+        Returns:
+            ``geopandas.GeoDataFrame`` of the intersecting rows of ``chunk_grid``
+
+        Example:
+            >>> import geowombat as gw
+            >>>
+            >>> with gw.open('image.tif') as src:
+            >>>     chunks = src.gw.chunks_intersecting(df)
+            >>>
+            >>>     for row in chunks.itertuples():
+            >>>         block = src[:, row.row_off:row.row_off+row.height, row.col_off:row.col_off+row.width]
+        """
+
+        grid = self.chunk_grid
+
+        if isinstance(geometry, (gpd.GeoDataFrame, gpd.GeoSeries)):
+
+            if (geometry.crs is not None) and (grid.crs is not None) and (geometry.crs != grid.crs):
+                geometry = geometry.to_crs(grid.crs)
+
+            geoms = geometry.geometry.values if isinstance(geometry, gpd.GeoDataFrame) else geometry.values
+
+        else:
+            geoms = [geometry]
+
+        sindex = grid.sindex
+
+        indices = set()
+
+        for geom in geoms:
+            indices.update(np.asarray(sindex.query(geom, predicate='intersects')).tolist())
+
+        return grid.iloc[sorted(indices)]
 
     @property
     def footprint_grid(self):
         """Get the image footprint grid"""
-        return self._footprint_grid
+        return getattr(self, '_footprint_grid', None)
 
     @footprint_grid.setter
     def footprint_grid(self, geometries):
@@ -1,14 +1,18 @@
 import os
 import math
 import itertools
+import importlib.util
+import concurrent.futures
 from datetime import datetime
 from collections import defaultdict
 
-from ..backends.rasterio_ import align_bounds, array_bounds, aligned_target
+from ..config import thread_budget
+from ..backends.rasterio_ import align_bounds, array_bounds, crs_equal, crs_key, transform_coords
 from .conversion import Converters
 from .base import PropertyMixin as _PropertyMixin
 from .util import lazy_wombat
 from .parallel import ParallelTask
+from .coreg import tiled_coregister
 
 import numpy as np
 from scipy.stats import mode as sci_mode
@@ -18,21 +22,14 @@ import geopandas as gpd
 import xarray as xr
 import dask
 import dask.array as da
-from rasterio.crs import CRS
+import rasterio as rio
+from rasterio.windows import Window
 from rasterio import features
 from affine import Affine
 
-try:
-    import arosics
-    AROSICS_INSTALLED = True
-except:
-    AROSICS_INSTALLED = False
-
-try:
-    import pymorph
-    PYMORPH_INSTALLED = True
-except:
-    PYMORPH_INSTALLED = False
+# Optional packages are only looked up here and are imported where they are used
+AROSICS_INSTALLED = importlib.util.find_spec('arosics') is not None
+PYMORPH_INSTALLED = importlib.util.find_spec('pymorph') is not None
 
 import logging
 logger = logging.getLogger(__name__)
@@ -90,6 +87,67 @@ def _transform_and_shift(affine_transform, col_indices, row_indices, cellxh, cel
     return x_coords, y_coords
 
 
+def _file_grid(filename):
+
+    """
+    Gets the grid of a file from its header
+
+    Args:
+        filename (str): The file.
+
+    Returns:
+        ``tuple`` of (grid key, band count, data type)
+    """
+
+    with rio.open(filename) as src:
+        return (crs_key(src.crs), tuple(src.transform)[:6], src.height, src.width), src.count, src.dtypes[0]
+
+
+def _sample_file(filename, rows, cols, bands):
+
+    """
+    Samples pixels from a file with one windowed read per group of points that share a file block
+
+    Args:
+        filename (str): The file.
+        rows (1d array): The row indices.
+        cols (1d array): The column indices.
+        bands (list): The GDAL-indexed bands to sample.
+
+    Returns:
+        2d ``numpy.ndarray`` shaped (samples x bands)
+    """
+
+    with rio.open(filename) as src:
+
+        out = np.empty((rows.shape[0], len(bands)), dtype=src.dtypes[0])
+
+        if rows.shape[0] == 0:
+            return out
+
+        block_height, block_width = src.block_shapes[0]
+
+        block_ids = (rows // block_height) * (src.width // block_width + 1) + cols // block_width
+
+        order = np.argsort(block_ids, kind='stable')
+        splits = np.flatnonzero(np.diff(block_ids[order])) + 1
+
+        for idx in np.split(order, splits):
+
+            row_off = rows[idx].min()
+            col_off = cols[idx].min()
+
+            chunk = src.read(bands,
+                             window=Window(col_off=col_off,
+                                           row_off=row_off,
+                                           width=cols[idx].max() - col_off + 1,
+                                           height=rows[idx].max() - row_off + 1))
+
+            out[idx] = chunk[:, rows[idx] - row_off, cols[idx] - col_off].T
+
+    return out
+
+
 class SpatialOperations(_PropertyMixin):
 
     @staticmethod
@@ -583,6 +641,195 @@ class SpatialOperations(_PropertyMixin):
 
         return df
 
+    def extract_timeseries(self,
+                           filenames,
+                           aoi,
+                           bands=None,
+                           band_names=None,
+                           time_names=None,
+                           id_column='id',
+                           layout='wide',
+                           n_workers=1,
+                           scheduler='threads',
+                           verbose=0):
+
+        """
+        Extracts point time series directly from a list of files, without stacking the files into one array
+
+        The points are transformed once for each distinct file grid, and each file is sampled with one
+        windowed read per group of points that fall in the same file block. The cost therefore scales with
+        the number of points x the number of files rather than with the image area x the number of files.
+
+        Args:
+            filenames (list): The files to extract data from, ordered by time. Files do not need to share a CRS or grid.
+            aoi (str or GeoDataFrame): A file or ``geopandas.GeoDataFrame`` of points.
+            bands (Optional[int or 1d array-like]): A band or list of bands to extract.
+                If not given, all bands are used. Bands should be GDAL-indexed (i.e., the first band is 1, not 0).
+            band_names (Optional[list]): A list of band names. Length should be the same as `bands`.
+            time_names (Optional[list]): A list of time names. Length should be the same as `filenames`.
+            id_column (Optional[str]): The id column name.
+            layout (Optional[str]): The table layout. Choices are ['wide', 'long'].
+
+                wide: One row per point, with columns named {time}_{band}, as in ``geowombat.extract``
+                long: One row per point and time, with a 'time' column and one column per band
+
+            n_workers (Optional[int]): The number of files to sample concurrently.
+            scheduler (Optional[str]): The ``concurrent.futures`` scheduler to use. Choices are ['threads', 'processes'].
+            verbose (Optional[int]): The verbosity level.
+
+        Returns:
+            ``geopandas.GeoDataFrame``. Points outside of an image are NaN for that time.
+
+        Examples:
+            >>> import geowombat as gw
+            >>>
+            >>> df = gw.extract_timeseries(file_list, 'points.gpkg', bands=[3, 4], band_names=['red', 'nir'], n_workers=8)
+            >>>
+            >>> # One row per point and date
+            >>> df = gw.extract_timeseries(file_list, 'points.gpkg', time_names=dates, layout='long')
+        """
+
+        if layout not in ['wide', 'long']:
+            logger.exception("  The layout must be 'wide' or 'long'.")
+            raise NameError
+
+        if isinstance(aoi, gpd.GeoDataFrame):
+            df = aoi.copy()
+        else:
+
+            if isinstance(aoi, str):
+
+                if not os.path.isfile(aoi):
+                    logger.exception('  The AOI file does not exist.')
+                    raise OSError
+
+                df = gpd.read_file(aoi)
+
+            else:
+                logger.exception('  The AOI must be a vector file or a GeoDataFrame.')
+                raise TypeError
+
+        df = df[df['geometry'].apply(lambda x_: x_ is not None)].reset_index(drop=True)
+
+        if not (df.geom_type == 'Point').all():
+            logger.exception('  The AOI must only contain points.')
+            raise TypeError
+
+        if not id_column in df.columns:
+            df[id_column] = df.index.values
+
+        n_files = len(filenames)
+        n_points = df.shape[0]
+
+        # Group the files by grid so that points are transformed and indexed once per grid
+        grids = defaultdict(list)
+        dtypes = []
+
+        for fidx, filename in enumerate(filenames):
+
+            grid, count, dtype = _file_grid(filename)
+
+            grids[grid].append(fidx)
+            dtypes.append(dtype)
+
+        if isinstance(bands, int):
+            bands = [bands]
+        elif bands is None:
+            bands = list(range(1, count+1))
+        else:
+            bands = [int(b) for b in bands]
+
+        if not band_names:
+            band_names = bands
+
+        if len(band_names) != len(bands):
+            logger.exception('  The band names should be the same length as the bands.')
+            raise ValueError
+
+        if time_names:
+
+            if len(time_names) != n_files:
+                logger.exception('  The time names should be the same length as the files.')
+                raise ValueError
+
+            if isinstance(time_names[0], datetime):
+                time_names = [t.strftime('%Y-%m-%d') for t in time_names]
+
+        else:
+            time_names = ['t{:d}'.format(t) for t in range(1, n_files+1)]
+
+        x = df.geometry.x.values
+        y = df.geometry.y.values
+
+        projected = {}
+        tasks = []
+
+        for (grid_crs, grid_transform, grid_height, grid_width), file_indices in grids.items():
+
+            if grid_crs not in projected:
+
+                if crs_equal(df.crs, grid_crs):
+                    projected[grid_crs] = (x, y)
+                else:
+                    projected[grid_crs] = transform_coords(x, y, crs_key(df.crs), grid_crs)
+
+            grid_x, grid_y = projected[grid_crs]
+
+            cols, rows = ~Affine(*grid_transform) * (grid_x, grid_y)
+
+            cols = np.floor(cols).astype('int64')
+            rows = np.floor(rows).astype('int64')
+
+            inside = np.flatnonzero((rows >= 0) & (rows < grid_height) & (cols >= 0) & (cols < grid_width))
+
+            for fidx in file_indices:
+                tasks.append((fidx, inside, rows[inside], cols[inside]))
+
+        out_dtype = np.result_type(*dtypes)
+
+        if any(t[1].shape[0] < n_points for t in tasks):
+            out_dtype = np.result_type(out_dtype, 'float64')
+
+        values = np.full((n_points, n_files, len(bands)), np.nan if out_dtype.kind == 'f' else 0, dtype=out_dtype)
+
+        if scheduler == 'threads':
+
+            n_workers = min(n_workers, thread_budget())
+            pool_executor = concurrent.futures.ThreadPoolExecutor
+
+        else:
+            pool_executor = concurrent.futures.ProcessPoolExecutor
+
+        if verbose > 0:
+            logger.info('  Extracting {:,d} points from {:,d} files on {:,d} grids ...'.format(n_points, n_files, len(grids)))
+
+        with pool_executor(max_workers=n_workers) as executor:
+
+            futures = {executor.submit(_sample_file, filenames[fidx], rows, cols, bands): (fidx, inside)
+                       for fidx, inside, rows, cols in tasks}
+
+            for future in concurrent.futures.as_completed(futures):
+
+                fidx, inside = futures[future]
+                values[inside, fidx] = future.result()
+
+        if layout == 'wide':
+
+            band_names_concat = ['{}_{}'.format(t, b) for t in time_names for b in band_names]
+
+            return pd.concat((df,
+                              pd.DataFrame(data=values.reshape(n_points, n_files*len(bands)),
+                                           columns=band_names_concat)),
+                             axis=1)
+
+        df = df.iloc[np.repeat(np.arange(0, n_points), n_files)].reset_index(drop=True)
+        df['time'] = time_names * n_points
+
+        return pd.concat((df,
+                          pd.DataFrame(data=values.reshape(n_points*n_files, len(bands)),
+                                       columns=band_names)),
+                         axis=1)
+
     def clip(self,
              data,
              df,
@@ -621,18 +868,9 @@ class SpatialOperations(_PropertyMixin):
         if query:
             df = df.query(query)
 
-        df_crs_ = df.crs.to_proj4().strip() if hasattr(df.crs, 'to_proj4') else df.crs
-
         # Re-project the DataFrame to match the image CRS
-        try:
-
-            if data.crs.strip() != CRS.from_dict(df_crs_).to_proj4().strip():
-                df = df.to_crs(data.crs)
-
-        except:
-
-            if data.crs.strip() != CRS.from_proj4(df_crs_).to_proj4().strip():
-                df = df.to_crs(data.crs)
+        if not crs_equal(data.crs, df.crs):
+            df = df.to_crs(data.crs)
 
         row_chunks = data.gw.row_chunks
         col_chunks = data.gw.col_chunks
@@ -669,8 +907,8 @@ class SpatialOperations(_PropertyMixin):
 
             # Rasterize the geometry and store as a DataArray
             mask = xr.DataArray(data=da.from_array(features.rasterize(list(df.geometry.values),
-                                                                      out_shape=(align_height, align_width),
-                                                                      transform=align_transform,
+                                                                      out_shape=(data.gw.nrows, data.gw.ncols),
+                                                                      transform=data.gw.transform,
                                                                       fill=0,
                                                                       out=None,
                                                                       all_touched=True,
@@ -720,19 +958,9 @@ class SpatialOperations(_PropertyMixin):
         if query:
             dataframe = dataframe.query(query)
 
-        df_crs_ = dataframe.crs.to_proj4().strip() if hasattr(dataframe.crs, 'to_proj4') else dataframe.crs
-
-        try:
-
-            if data.crs.strip() != CRS.from_dict(df_crs_).to_proj4().strip():
-
-                # Re-project the DataFrame to match the image CRS
-                dataframe = dataframe.to_crs(data.crs)
-
-        except:
-
-            if data.crs.strip() != CRS.from_proj4(df_crs_).to_proj4().strip():
-                dataframe = dataframe.to_crs(data.crs)
+        # Re-project the DataFrame to match the image CRS
+        if not crs_equal(data.crs, dataframe.crs):
+            dataframe = dataframe.to_crs(data.crs)
 
         # Rasterize the geometry and store as a DataArray
         mask = xr.DataArray(data=da.from_array(features.rasterize(list(dataframe.geometry.values),
@@ -853,6 +1081,9 @@ class SpatialOperations(_PropertyMixin):
         """
         Subsets a DataArray
 
+        The subset is taken with integer row and column offsets on the array grid, so the
+        returned array is a view that keeps the input chunk boundaries.
+
         Args:
             data (DataArray): The ``xarray.DataArray`` to subset.
             left (Optional[float]): The left coordinate.
@@ -880,7 +1111,7 @@ class SpatialOperations(_PropertyMixin):
         """
 
         if isinstance(right, int) or isinstance(right, float):
-            cols = int((right - left) / data.gw.celly)
+            cols = int(round((right - left) / data.gw.cellx))
 
         if not isinstance(cols, int):
 
@@ -888,33 +1119,42 @@ class SpatialOperations(_PropertyMixin):
             raise NameError
 
         if isinstance(bottom, int) or isinstance(bottom, float):
-            rows = int((top - bottom) / data.gw.celly)
+            rows = int(round((top - bottom) / data.gw.celly))
 
         if not isinstance(rows, int):
 
             logger.exception('  The bottom coordinate or rows must be specified.')
             raise NameError
 
-        x_idx = np.linspace(math.ceil(left), math.ceil(left) + (cols * abs(data.gw.cellx)), cols) + abs(data.gw.cellxh)
-        y_idx = np.linspace(math.ceil(top), math.ceil(top) - (rows * abs(data.gw.celly)), rows) - abs(data.gw.cellyh)
+        # Integer offsets of the upper left corner on the array grid
+        col_off = int(math.floor((left - data.gw.left) / data.gw.cellx + 1e-6))
+        row_off = int(math.floor((data.gw.top - top) / data.gw.celly + 1e-6))
 
         if center:
 
-            y_idx += ((rows / 2.0) * abs(data.gw.celly))
-            x_idx -= ((cols / 2.0) * abs(data.gw.cellx))
+            col_off -= int(cols / 2.0)
+            row_off -= int(rows / 2.0)
 
-        ds_sub = data.sel(y=y_idx,
-                          x=x_idx,
-                          method='nearest')
+        col_start = min(max(col_off, 0), data.gw.ncols)
+        row_start = min(max(row_off, 0), data.gw.nrows)
+        col_end = min(max(col_off + cols, 0), data.gw.ncols)
+        row_end = min(max(row_off + rows, 0), data.gw.nrows)
+
+        # Slicing keeps the chunk boundaries and only the chunks
+        # that intersect the window are read from the source file.
+        ds_sub = data.isel(y=slice(row_start, row_end),
+                           x=slice(col_start, col_end))
 
         if mask_corners:
 
             if PYMORPH_INSTALLED:
 
+                import pymorph
+
                 try:
 
-                    disk = da.from_array(pymorph.sedisk(r=int(rows/2.0))[:rows, :cols],
-                                         chunks=ds_sub.data.chunksize).astype('uint8')
+                    disk = da.from_array(pymorph.sedisk(r=int(rows/2.0))[:ds_sub.gw.nrows, :ds_sub.gw.ncols],
+                                         chunks=(ds_sub.gw.row_chunks, ds_sub.gw.col_chunks)).astype('uint8')
                     ds_sub = ds_sub.where(disk == 1)
 
                 except:
@@ -924,37 +1164,36 @@ class SpatialOperations(_PropertyMixin):
                 logger.warning('  Cannot mask corners without Pymorph.')
 
         # Update the left and top coordinates
-        transform = list(data.gw.transform)
-
-        transform[2] = x_idx[0]
-        transform[5] = y_idx[0]
-
-        # Align the coordinates to the target grid
-        dst_transform, dst_width, dst_height = aligned_target(Affine(*transform),
-                                                              ds_sub.shape[1],
-                                                              ds_sub.shape[0],
-                                                              data.res)
-
-        ds_sub.attrs['transform'] = dst_transform
+        ds_sub.attrs['transform'] = Affine(data.gw.cellx,
+                                           0.0,
+                                           data.gw.left + col_start * data.gw.cellx,
+                                           0.0,
+                                           -data.gw.celly,
+                                           data.gw.top - row_start * data.gw.celly)
 
         return ds_sub
 
     @staticmethod
     def coregister(target,
                    reference,
+                   tiled=False,
                    **kwargs):
 
         """
-        Co-registers an image, or images, using AROSICS.
+        Co-registers an image, or images, using AROSICS or tiled phase correlation.
 
-        While the required inputs are DataArrays, the intermediate results are stored as NumPy arrays.
-        Therefore, memory usage is constrained to the size of the input data. Dask is not used for any of the
-        computation in this function.
+        With AROSICS, the intermediate results are stored as NumPy arrays. Therefore, memory usage is constrained
+        to the size of the input data and a single, global shift is applied. With ``tiled=True``, local shifts are
+        estimated on a grid of windows in parallel, interpolated to a smooth shift field and applied lazily to
+        each chunk, so memory is bounded by the window and chunk sizes. The tiled mode requires ``target`` and
+        ``reference`` to be on the same grid and does not require AROSICS.
 
         Args:
             target (DataArray or str): The target ``xarray.DataArray`` or file name to co-register to ``reference``.
             reference (DataArray or str): The reference ``xarray.DataArray`` or file name used to co-register ``target``.
-            kwargs (Optional[dict]): Keyword arguments passed to ``arosics``.
+            tiled (Optional[bool]): Whether to co-register with tiled phase correlation instead of AROSICS.
+            kwargs (Optional[dict]): Keyword arguments passed to ``arosics`` or, if ``tiled=True``, to
+                ``geowombat.core.coreg.tiled_coregister``.
 
         Reference:
             https://pypi.org/project/arosics
@@ -972,11 +1211,17 @@ class SpatialOperations(_PropertyMixin):
             >>> # or
             >>>
             >>> results = gw.coregister('target.tif', 'reference.tif', q=True, ws=(512, 512), max_shift=3, CPUs=4)
+            >>>
+            >>> # Co-register with local shifts and write with bounded memory
+            >>> with gw.config.update(ref_image='reference.tif'):
+            >>>     with gw.open('target.tif', chunks=1024) as tar, gw.open('reference.tif', chunks=1024) as ref:
+            >>>         results = gw.coregister(tar, ref, tiled=True, wsize=256, max_shift=5, n_workers=8)
+            >>>         results.gw.to_raster('target_coreg.tif', n_workers=4)
         """
 
         import geowombat as gw_
 
-        if not AROSICS_INSTALLED:
+        if not tiled and not AROSICS_INSTALLED:
 
             logger.exception('\nAROSICS must be installed to co-register data.\nSee https://pypi.org/project/arosics for details')
             raise NameError
@@ -1001,6 +1246,11 @@ class SpatialOperations(_PropertyMixin):
             with gw_.open(target) as target:
                 pass
 
+        if tiled:
+            return tiled_coregister(target, reference, **kwargs)
+
+        import arosics
+
         cr = arosics.COREG(reference.filename,
                            target.filename,
                            **kwargs)
@@ -4,6 +4,7 @@ from collections import namedtuple, OrderedDict
 from datetime import datetime
 from pathlib import Path
 
+from ..config import config
 from ..moving import moving_window
 
 import numpy as np
@@ -11,6 +12,7 @@ import geopandas as gpd
 import xarray as xr
 import dask.array as da
 
+import rasterio as rio
 from rasterio import features
 from rasterio.crs import CRS
 from rasterio.warp import reproject, transform_bounds
@@ -173,13 +175,10 @@ def project_coords(x, y, src_crs, dst_crs, return_as='1d', **kwargs):
 
     if return_as == '1d':
 
-        df_tmp = gpd.GeoDataFrame(np.arange(0, x.shape[0]),
-                                  geometry=gpd.points_from_xy(x, y),
-                                  crs=src_crs)
+        # Imported here because the backends import this module
+        from ..backends.rasterio_ import transform_coords
 
-        df_tmp = df_tmp.to_crs(dst_crs)
-
-        return df_tmp.geometry.x.values, df_tmp.geometry.y.values
+        return transform_coords(x, y, src_crs, dst_crs)
 
     else:
 
@@ -319,6 +318,54 @@ class Chunks(object):
 
         return chunksize
 
+    @staticmethod
+    def auto_chunks(filename, n_layers=1, chunk_mem=None):
+
+        """
+        Gets chunk sizes that are whole multiples of the file block size
+
+        Args:
+            filename (str): The file to get the block size from.
+            n_layers (Optional[int]): The number of stacked layers (e.g., files along the 'time' dimension)
+                that are held in memory with each chunk.
+            chunk_mem (Optional[int]): The memory budget per chunk (in MB), across all bands and layers.
+                If not given, the 'chunk_mem' configuration value is used.
+
+        Returns:
+            ``tuple`` of (1, rows, columns)
+
+        Example:
+            >>> from geowombat.core.util import Chunks
+            >>>
+            >>> chunks = Chunks().auto_chunks('image.tif', chunk_mem=256)
+        """
+
+        if not chunk_mem:
+            chunk_mem = config['chunk_mem']
+
+        with rio.open(filename) as src:
+
+            block_height, block_width = src.block_shapes[0]
+            n_bands = src.count
+            itemsize = max(np.dtype(dtype).itemsize for dtype in src.dtypes)
+            height = src.height
+            width = src.width
+
+        # The number of pixels that fit in the memory budget
+        target_pixels = (chunk_mem * 1024.0 * 1024.0) / float(itemsize * n_bands * n_layers)
+
+        n_blocks = max(1, int(target_pixels / (block_height * block_width)))
+
+        max_row_blocks = int(np.ceil(height / float(block_height)))
+        max_col_blocks = int(np.ceil(width / float(block_width)))
+
+        # Keep the chunks as close to square as the blocks allow
+        row_blocks = min(max(1, int(round(np.sqrt(n_blocks * block_width / float(block_height))))), max_row_blocks)
+        col_blocks = min(max(1, int(n_blocks / row_blocks)), max_col_blocks)
+        row_blocks = min(max(1, int(n_blocks / col_blocks)), max_row_blocks)
+
+        return 1, min(row_blocks * block_height, height), min(col_blocks * block_width, width)
+
 
 class MapProcesses(object):
 
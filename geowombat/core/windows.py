@@ -1,6 +1,259 @@
 from .util import n_rows_cols
 
+import numpy as np
 from rasterio.windows import Window
+from affine import Affine
+from shapely.geometry import box
+from shapely.prepared import prep
+
+
+def _n_rows_cols(pixel_index, block_size, rows_cols):
+
+    """
+    A vectorized ``n_rows_cols``
+    """
+
+    return np.where(pixel_index + block_size < rows_cols, block_size, rows_cols - pixel_index)
+
+
+class WindowGrid(object):
+
+    """
+    A grid of windows backed by arrays of offsets and sizes
+
+    Windows are only created as ``rasterio.windows.Window`` objects when they are accessed, so
+    large grids are cheap to build, slice and send to workers.
+
+    Args:
+        row_off (1d array-like): The window row offsets.
+        col_off (1d array-like): The window column offsets.
+        height (1d array-like): The window heights.
+        width (1d array-like): The window widths.
+        padded (Optional[tuple]): The padded window (row_off, col_off, height, width) arrays. If given,
+            items are returned as (window, padded window) tuples, like ``get_window_offsets``.
+
+    Example:
+        >>> from geowombat.core.windows import WindowGrid
+        >>>
+        >>> grid = WindowGrid.from_shape(10000, 10000, 256, 256)
+        >>>
+        >>> # The first window
+        >>> w = grid[0]
+        >>>
+        >>> # A grid of the first 100 windows
+        >>> sub_grid = grid[:100]
+        >>>
+        >>> # The windows that intersect a bounding box
+        >>> sub_grid = grid[grid.intersects_bounds((left, bottom, right, top), transform)]
+    """
+
+    def __init__(self, row_off, col_off, height, width, padded=None):
+
+        self.row_off = np.asarray(row_off, dtype='int64')
+        self.col_off = np.asarray(col_off, dtype='int64')
+        self.height = np.asarray(height, dtype='int64')
+        self.width = np.asarray(width, dtype='int64')
+        self.padded = tuple(np.asarray(a, dtype='int64') for a in padded) if padded is not None else None
+
+    @classmethod
+    def from_shape(cls, n_rows, n_cols, row_chunks, col_chunks, padding=None):
+
+        """
+        Creates a grid from image dimensions and chunk sizes
+
+        Args:
+            n_rows (int): The number of rows.
+            n_cols (int): The number of columns.
+            row_chunks (int): The row chunk size.
+            col_chunks (int): The column chunk size.
+            padding (Optional[tuple]): Padding for each window, given as (left pad, bottom pad, right pad, top pad).
+
+        Returns:
+            ``WindowGrid``
+        """
+
+        row_offs, col_offs = np.meshgrid(np.arange(0, n_rows, row_chunks, dtype='int64'),
+                                         np.arange(0, n_cols, col_chunks, dtype='int64'),
+                                         indexing='ij')
+
+        row_off = row_offs.ravel()
+        col_off = col_offs.ravel()
+
+        height = _n_rows_cols(row_off, row_chunks, n_rows)
+        width = _n_rows_cols(col_off, col_chunks, n_cols)
+
+        padded = None
+
+        if padding:
+
+            lpad, bpad, rpad, tpad = padding
+
+            padded_row_off = np.where(row_off - tpad >= 0, row_off - tpad, 0)
+            padded_col_off = np.where(col_off - lpad >= 0, col_off - lpad, 0)
+
+            padded_height = _n_rows_cols(padded_row_off, np.abs(row_off - padded_row_off) + row_chunks + bpad, n_rows)
+            padded_width = _n_rows_cols(padded_col_off, np.abs(col_off - padded_col_off) + col_chunks + rpad, n_cols)
+
+            padded = (padded_row_off, padded_col_off, padded_height, padded_width)
+
+        return cls(row_off, col_off, height, width, padded=padded)
+
+    def __len__(self):
+        return self.row_off.shape[0]
+
+    def __iter__(self):
+
+        for i in range(0, len(self)):
+            yield self[i]
+
+    def __getitem__(self, index):
+
+        if isinstance(index, (int, np.integer)):
+
+            if self.padded is not None:
+                return self.window(index), self.padded_window(index)
+
+            return self.window(index)
+
+        # Slices, integer arrays and boolean masks return a sub-grid
+        return WindowGrid(self.row_off[index],
+                          self.col_off[index],
+                          self.height[index],
+                          self.width[index],
+                          padded=tuple(a[index] for a in self.padded) if self.padded is not None else None)
+
+    def window(self, index):
+
+        """
+        Gets a window
+
+        Args:
+            index (int): The window index.
+
+        Returns:
+            ``rasterio.windows.Window``
+        """
+
+        return Window(col_off=int(self.col_off[index]),
+                      row_off=int(self.row_off[index]),
+                      width=int(self.width[index]),
+                      height=int(self.height[index]))
+
+    def padded_window(self, index):
+
+        """
+        Gets a padded window
+
+        Args:
+            index (int): The window index.
+
+        Returns:
+            ``rasterio.windows.Window``
+        """
+
+        row_off, col_off, height, width = self.padded
+
+        return Window(col_off=int(col_off[index]),
+                      row_off=int(row_off[index]),
+                      width=int(width[index]),
+                      height=int(height[index]))
+
+    def keys(self):
+
+        """
+        Gets window ids that are stable across runs
+
+        Returns:
+            1d ``numpy.ndarray`` of ``str``
+        """
+
+        return np.array(['y{:09d}_x{:09d}_h{:09d}_w{:09d}'.format(*offsets)
+                         for offsets in zip(self.row_off.tolist(),
+                                            self.col_off.tolist(),
+                                            self.height.tolist(),
+                                            self.width.tolist())], dtype=str)
+
+    def bounds(self, transform):
+
+        """
+        Gets the window bounds
+
+        Args:
+            transform (Affine or tuple): The image transform.
+
+        Returns:
+            2d ``numpy.ndarray`` of (left, bottom, right, top) rows
+        """
+
+        transform = transform if isinstance(transform, Affine) else Affine(*transform)
+
+        left = transform.c + self.col_off * transform.a
+        right = transform.c + (self.col_off + self.width) * transform.a
+        top = transform.f + self.row_off * transform.e
+        bottom = transform.f + (self.row_off + self.height) * transform.e
+
+        return np.column_stack((np.minimum(left, right),
+                                np.minimum(bottom, top),
+                                np.maximum(left, right),
+                                np.maximum(bottom, top)))
+
+    def intersects_bounds(self, bounds, transform):
+
+        """
+        Checks which windows intersect a bounding box
+
+        Args:
+            bounds (tuple): The (left, bottom, right, top) bounding box.
+            transform (Affine or tuple): The image transform.
+
+        Returns:
+            1d ``numpy.ndarray`` of ``bool``
+        """
+
+        left, bottom, right, top = bounds
+
+        wb = self.bounds(transform)
+
+        return (wb[:, 0] <= right) & (wb[:, 2] >= left) & (wb[:, 1] <= top) & (wb[:, 3] >= bottom)
+
+    def intersects(self, geometry, transform):
+
+        """
+        Checks which windows intersect a geometry
+
+        Windows outside of the geometry bounds are excluded without creating polygons.
+
+        Args:
+            geometry (Shapely geometry): The geometry.
+            transform (Affine or tuple): The image transform.
+
+        Returns:
+            1d ``numpy.ndarray`` of ``bool``
+        """
+
+        mask = self.intersects_bounds(geometry.bounds, transform)
+
+        candidates = np.flatnonzero(mask)
+
+        if candidates.shape[0] > 0:
+
+            prepared = prep(geometry)
+            wb = self.bounds(transform)
+
+            mask[candidates] = [prepared.intersects(box(*wb[i])) for i in candidates]
+
+        return mask
+
+    def to_list(self):
+
+        """
+        Materializes the grid as a list, in the format of ``get_window_offsets``
+
+        Returns:
+            ``list``
+        """
+
+        return list(self)
 
 
 def get_window_offsets(n_rows,
@@ -18,7 +271,8 @@ def get_window_offsets(n_rows,
         n_cols (int): The number of columns to iterate over.
         row_chunks (int): The row chunk size.
         col_chunks (int): The column chunk size.
-        return_as (Optional[str]): How to return the window information. Choices are ['dict', 'list'].
+        return_as (Optional[str]): How to return the window information. Choices are ['dict', 'list', 'grid'].
+            'grid' returns a ``WindowGrid``, which holds the windows as arrays and behaves like the list.
         padding (Optional[tuple]): Padding for each window. ``padding`` should be given as a tuple
             of (left pad, bottom pad, right pad, top pad). If ``padding`` is given, the returned list will contain
             a tuple of ``rasterio.windows.Window`` objects as (w1, w2), where w1 contains the normal window offsets
@@ -28,6 +282,9 @@ def get_window_offsets(n_rows,
         Window information (list or dict)
     """
 
+    if return_as == 'grid':
+        return WindowGrid.from_shape(n_rows, n_cols, row_chunks, col_chunks, padding=padding)
+
     if return_as == 'list':
         window_info = list()
     else:
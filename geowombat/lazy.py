@@ -0,0 +1,86 @@
+import sys
+import types
+import importlib
+
+
+def lazy_attributes(package, attributes):
+
+    """
+    Creates module ``__getattr__`` and ``__dir__`` functions (PEP 562) that import attributes on first access
+
+    Resolved attributes are cached in the module namespace, so the import is paid for once. Submodules
+    with the same name as a lazy attribute (e.g., ``geowombat.moving``) are not bound in the module
+    namespace when they are imported, so the attribute always resolves to the lazy value.
+
+    Args:
+        package (str): The module name (i.e., ``__name__``).
+        attributes (dict): The lazy attributes, given as {name: (module, attribute)} or
+            {name: (module, class, method)}, where methods are bound to a new instance of the class.
+            Relative module names are resolved against ``package``.
+
+    Returns:
+        ``tuple`` of (``__getattr__``, ``__dir__``)
+
+    Example:
+        >>> __getattr__, __dir__ = lazy_attributes(__name__, {'open': ('.core.api', 'open')})
+    """
+
+    namespace = sys.modules[package].__dict__
+
+    def __getattr__(name):
+
+        if name not in attributes:
+            raise AttributeError('module {!r} has no attribute {!r}'.format(package, name))
+
+        spec = attributes[name]
+
+        value = getattr(importlib.import_module(spec[0], package), spec[1])
+
+        if len(spec) == 3:
+            value = getattr(value(), spec[2])
+
+        namespace[name] = value
+
+        return value
+
+    def __dir__():
+        return sorted(set(namespace) | set(attributes))
+
+    class LazyModule(types.ModuleType):
+
+        def __setattr__(self, name, value):
+
+            # The import system binds each imported submodule in its package, which would hide the attribute
+            if (name in attributes) and isinstance(value, types.ModuleType):
+                return
+
+            super(LazyModule, self).__setattr__(name, value)
+
+    sys.modules[package].__class__ = LazyModule
+
+    return __getattr__, __dir__
+
+
+def lazy_accessor(package, module, attribute):
+
+    """
+    Creates an ``xarray`` accessor that imports the accessor class on first use
+
+    Args:
+        package (str): The package name that ``module`` is relative to (i.e., ``__name__``).
+        module (str): The module of the accessor class.
+        attribute (str): The accessor class name.
+
+    Returns:
+        ``function``
+
+    Example:
+        >>> import xarray as xr
+        >>>
+        >>> xr.register_dataarray_accessor('gw')(lazy_accessor(__name__, '.core.geoxarray', 'GeoWombatAccessor'))
+    """
+
+    def accessor(xarray_obj):
+        return getattr(importlib.import_module(module, package), attribute)(xarray_obj)
+
+    return accessor
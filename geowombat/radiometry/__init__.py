@@ -1,4 +1,4 @@
-from .angles import landsat_pixel_angles, sentinel_pixel_angles
+from .angles import landsat_pixel_angles, sentinel_pixel_angles, sentinel_pixel_angles_lazy
 from .brdf import BRDF
 from .topo import Topo
 from .sr import LinearAdjustments, RadTransforms
@@ -7,6 +7,7 @@ from .qa import QAMasker
 
 __all__ = ['landsat_pixel_angles',
            'sentinel_pixel_angles',
+           'sentinel_pixel_angles_lazy',
            'BRDF',
            'Topo',
            'LinearAdjustments',
@@ -1,16 +1,22 @@
 import os
+import importlib.util
+import warnings
 from pathlib import Path
 import fnmatch
 import subprocess
 from collections import namedtuple
 import tarfile
 
+from ..config import thread_budget
+from ..backends.rasterio_ import crs_key, crs_equal, transform_coords
 
 import numpy as np
 import xarray as xr
+import dask.array as da
 import rasterio as rio
 from rasterio.warp import reproject
 from affine import Affine
+from scipy.ndimage import distance_transform_edt
 import xml.etree.ElementTree as ET
 # from pysolar.solar import get_altitude_fast, get_azimuth_fast
 
@@ -18,11 +24,8 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-try:
-    import cv2
-    OPENCV_INSTALLED = True
-except:
-    OPENCV_INSTALLED = False
+# OpenCV is only looked up here and is imported where it is used
+OPENCV_INSTALLED = importlib.util.find_spec('cv2') is not None
 
 
 def shift_objects(data,
@@ -358,6 +361,8 @@ def sentinel_pixel_angles(metadata,
     if not OPENCV_INSTALLED:
         logger.exception('OpenCV must be installed.')
 
+    import cv2
+
     AngleInfo = namedtuple('AngleInfo', 'vza vaa sza saa sensor')
 
     sza, saa = _parse_sentinel_angles(metadata, 'solar', nodata)
@@ -438,6 +443,277 @@ def sentinel_pixel_angles(metadata,
                      sensor=sensor_name)
 
 
+def _values_list(element):
+
+    """
+    Gets an angle grid from a Sentinel-2 metadata Values_List element
+
+    Returns:
+        2d ``numpy.ndarray``, with missing values as NaNs
+    """
+
+    for field in element:
+
+        if field.tag == 'Values_List':
+            return np.array([[float(v) for v in row.text.split()] for row in field], dtype='float64')
+
+
+def _grid_step(element):
+
+    steps = dict(COL_STEP=5000.0, ROW_STEP=5000.0)
+
+    for field in element:
+
+        if field.tag in steps:
+            steps[field.tag] = float(field.text)
+
+    return steps['COL_STEP'], steps['ROW_STEP']
+
+
+def _mean_angle(grids, circular=False):
+
+    """
+    Averages angle grids (e.g., over bands and detectors), ignoring missing values
+
+    Args:
+        grids (list): The 2d angle grids.
+        circular (Optional[bool]): Whether to take the circular mean (for azimuth angles).
+
+    Returns:
+        2d ``numpy.ndarray``
+    """
+
+    stack = np.stack(grids)
+
+    with warnings.catch_warnings():
+
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+
+        if circular:
+
+            rad = np.deg2rad(stack)
+
+            return np.rad2deg(np.arctan2(np.nanmean(np.sin(rad), axis=0), np.nanmean(np.cos(rad), axis=0))) % 360.0
+
+        return np.nanmean(stack, axis=0)
+
+
+def _fill_missing(grid):
+
+    """
+    Fills missing grid nodes with the nearest valid node
+    """
+
+    missing = np.isnan(grid)
+
+    if missing.any() and not missing.all():
+
+        indices = distance_transform_edt(missing, return_distances=False, return_indices=True)
+        grid = grid[tuple(indices)]
+
+    return grid
+
+
+def _parse_sentinel_angle_grids(metadata):
+
+    """
+    Gets the Sentinel-2 angle grids and their geolocation from metadata
+
+    View angles are averaged over bands and detectors.
+
+    Args:
+        metadata (str): The metadata file.
+
+    Returns:
+        ``dict`` of 'sza', 'saa', 'vza' and 'vaa' 2d grids (in degrees) and the grid 'crs',
+            upper left node ('ulx', 'uly') and node spacing ('col_step', 'row_step')
+    """
+
+    tree = ET.parse(metadata)
+    root = tree.getroot()
+
+    for child in root:
+
+        if child.tag[-14:] == 'Geometric_Info':
+            geoinfo = child
+
+    grids = dict(vza=[], vaa=[])
+
+    for segment in geoinfo:
+
+        if segment.tag == 'Tile_Geocoding':
+
+            for field in segment:
+
+                if field.tag == 'HORIZONTAL_CS_CODE':
+                    grids['crs'] = field.text.strip()
+
+                # The upper left corner is the same at every resolution
+                if field.tag == 'Geoposition':
+
+                    for pos in field:
+
+                        if pos.tag == 'ULX':
+                            grids['ulx'] = float(pos.text)
+                        elif pos.tag == 'ULY':
+                            grids['uly'] = float(pos.text)
+
+        if segment.tag == 'Tile_Angles':
+
+            for angle in segment:
+
+                if angle.tag == 'Sun_Angles_Grid':
+
+                    for bset in angle:
+
+                        if bset.tag == 'Zenith':
+
+                            grids['sza'] = _values_list(bset)
+                            grids['col_step'], grids['row_step'] = _grid_step(bset)
+
+                        elif bset.tag == 'Azimuth':
+                            grids['saa'] = _values_list(bset)
+
+                # One grid for each band and detector, with NaNs outside of the detector footprint
+                elif angle.tag == 'Viewing_Incidence_Angles_Grids':
+
+                    for bset in angle:
+
+                        if bset.tag == 'Zenith':
+                            grids['vza'].append(_values_list(bset))
+                        elif bset.tag == 'Azimuth':
+                            grids['vaa'].append(_values_list(bset))
+
+    grids['vza'] = _mean_angle(grids['vza'])
+    grids['vaa'] = _mean_angle(grids['vaa'], circular=True)
+
+    for angle_name in ['sza', 'saa', 'vza', 'vaa']:
+        grids[angle_name] = _fill_missing(grids[angle_name])
+
+    return grids
+
+
+def _interp_angle_block(block, grid, ulx, uly, col_step, row_step, transform, src_crs, dst_crs, circular, nodata, block_info=None):
+
+    """
+    Bilinearly interpolates an angle grid to the pixels of one chunk
+
+    Returns:
+        3d ``numpy.ndarray`` of angles / 0.01, shaped (1, rows, columns)
+    """
+
+    (row_start, row_stop), (col_start, col_stop) = block_info[0]['array-location'][-2:]
+
+    cols, rows = np.meshgrid(np.arange(col_start, col_stop) + 0.5,
+                             np.arange(row_start, row_stop) + 0.5)
+
+    x, y = transform * (cols, rows)
+
+    if src_crs != dst_crs:
+
+        x, y = transform_coords(x.ravel(), y.ravel(), src_crs, dst_crs)
+
+        x = x.reshape(cols.shape)
+        y = y.reshape(cols.shape)
+
+    # Fractional grid node indices
+    gx = np.clip((x - ulx) / col_step, 0, grid.shape[1]-1)
+    gy = np.clip((uly - y) / row_step, 0, grid.shape[0]-1)
+
+    j0 = np.clip(np.floor(gx).astype('int64'), 0, max(grid.shape[1]-2, 0))
+    i0 = np.clip(np.floor(gy).astype('int64'), 0, max(grid.shape[0]-2, 0))
+    j1 = np.minimum(j0 + 1, grid.shape[1]-1)
+    i1 = np.minimum(i0 + 1, grid.shape[0]-1)
+
+    fx = gx - j0
+    fy = gy - i0
+
+    def _bilinear(g):
+        return g[i0, j0]*(1.0-fy)*(1.0-fx) + g[i0, j1]*(1.0-fy)*fx + g[i1, j0]*fy*(1.0-fx) + g[i1, j1]*fy*fx
+
+    if circular:
+
+        # Interpolate azimuths as unit vectors to avoid artifacts at 0/360 degrees
+        rad = np.deg2rad(grid)
+        angles = np.rad2deg(np.arctan2(_bilinear(np.sin(rad)), _bilinear(np.cos(rad)))) % 360.0
+
+    else:
+        angles = _bilinear(grid)
+
+    angles = np.where(np.isnan(angles), nodata, np.round(angles / 0.01))
+
+    return angles[np.newaxis].astype(block.dtype)
+
+
+def sentinel_pixel_angles_lazy(metadata, data, nodata=-32768):
+
+    """
+    Generates lazy Sentinel pixel angles on the grid of a DataArray
+
+    The coarse metadata angle grids are interpolated chunk by chunk when the angles are computed,
+    so no angle files are written. Angles are scaled to match ``sentinel_pixel_angles`` (i.e., degrees / 0.01),
+    and view angles are averaged over bands and detectors.
+
+    Args:
+        metadata (str): The metadata file.
+        data (DataArray): The data that defines the output grid (CRS, transform, shape and chunks).
+        nodata (Optional[int]): The 'no data' value.
+
+    Returns:
+        zenith and azimuth angles as a ``namedtuple`` of int16 ``xarray.DataArray`` and the sensor name
+
+    Example:
+        >>> import geowombat as gw
+        >>> from geowombat.radiometry import sentinel_pixel_angles_lazy
+        >>>
+        >>> with gw.open(band_files, stack_dim='band') as src:
+        >>>
+        >>>     angles = sentinel_pixel_angles_lazy('MTD_TL.xml', src)
+        >>>     sr = rt.toar_to_sr(src, angles.sza, angles.saa, angles.vza, angles.vaa, 's2a')
+    """
+
+    AngleInfo = namedtuple('AngleInfo', 'vza vaa sza saa sensor')
+
+    grids = _parse_sentinel_angle_grids(metadata)
+
+    src_crs = crs_key(data.crs)
+    dst_crs = grids['crs'] if not crs_equal(src_crs, grids['crs']) else src_crs
+
+    template = da.zeros((1,) + data.shape[-2:],
+                        chunks=((1,),) + data.data.chunks[-2:],
+                        dtype='int16')
+
+    attrs = data.attrs.copy()
+    attrs['nodatavals'] = (nodata,)
+
+    angle_arrays = {}
+
+    for angle_name in ['vza', 'vaa', 'sza', 'saa']:
+
+        angle_data = da.map_blocks(_interp_angle_block,
+                                   template,
+                                   grid=grids[angle_name],
+                                   ulx=grids['ulx'],
+                                   uly=grids['uly'],
+                                   col_step=grids['col_step'],
+                                   row_step=grids['row_step'],
+                                   transform=Affine(*data.gw.transform),
+                                   src_crs=src_crs,
+                                   dst_crs=dst_crs,
+                                   circular=angle_name in ['vaa', 'saa'],
+                                   nodata=nodata,
+                                   dtype='int16')
+
+        angle_arrays[angle_name] = xr.DataArray(data=angle_data,
+                                                dims=('band', 'y', 'x'),
+                                                coords={'band': [1],
+                                                        'y': data.y,
+                                                        'x': data.x},
+                                                attrs=attrs)
+
+    return AngleInfo(sensor=get_sentinel_sensor(metadata), **angle_arrays)
+
+
 # Potentially useful for angle creation
 # https://github.com/gee-community/gee_tools/blob/master/geetools/algorithms.py
 
@@ -634,7 +910,7 @@ def landsat_pixel_angles(angles_file,
         if sensor.lower() in ['l5', 'l7']:
 
             angle_command = '{PATH} {META} -s 1 -b 1'.format(PATH=Path(l57_angles_path).joinpath('landsat_angles').as_posix(),
-                                                             META=angles_file)
+                                                             META=os.path.realpath(angles_file))
 
             # 1=zenith, 2=azimuth
             out_order = dict(azimuth=2, zenith=1)
@@ -643,19 +919,17 @@ def landsat_pixel_angles(angles_file,
         else:
 
             angle_command = '{PATH} {META} BOTH 1 -f -32768 -b 4'.format(PATH=Path(l8_angles_path).joinpath('l8_angles').as_posix(),
-                                                                         META=angles_file)
+                                                                         META=os.path.realpath(angles_file))
 
             # 1=azimuth, 2=zenith
             out_order = dict(azimuth=1, zenith=2)
             # out_order = [1, 2, 1, 2]
 
-        os.chdir(outdir)
-
         if verbose > 0:
             logger.info('  Generating pixel angles ...')
 
-        # Create the angle files.
-        subprocess.call(angle_command, shell=True)
+        # Create the angle files in the output directory, without changing the process working directory
+        subprocess.call(angle_command, shell=True, cwd=str(outdir))
 
         # Get angle data from 1 band.
         sensor_angles = fnmatch.filter(os.listdir(outdir), '*sensor_B04.img')[0]
@@ -698,10 +972,9 @@ def landsat_pixel_angles(angles_file,
 
                     dst_band = rio.Band(dst, 1, 'int16', (dst.height, dst.width))
 
-                    # TODO: num_threads
                     reproject(src_band,
                               destination=dst_band,
-                              num_threads=8)
+                              num_threads=min(8, thread_budget()))
 
     return AngleInfo(vaa=sensor_azimuth_file,
                      vza=sensor_zenith_file,
@@ -1,19 +1,17 @@
+import importlib.util
+
 import numpy as np
 from osgeo import gdal, gdal_array
 import dask
 import dask.array as da
 import xarray as xr
-from sklearn.linear_model import LinearRegression, TheilSenRegressor
 
 import logging
 logger = logging.getLogger(__name__)
 
 
-try:
-    import cv2
-    OPENCV_INSTALLED = True
-except:
-    OPENCV_INSTALLED = False
+# OpenCV is only looked up here and is imported where it is used
+OPENCV_INSTALLED = importlib.util.find_spec('cv2') is not None
 
 
 def calc_slope(elev, proc_dims=None, w=None, **kwargs):
@@ -36,6 +34,8 @@ def calc_slope(elev, proc_dims=None, w=None, **kwargs):
 
     if proc_dims:
 
+        import cv2
+
         inrows, incols = elev.shape
 
         elev = cv2.resize(elev.astype('float32'),
@@ -88,6 +88,8 @@ def calc_aspect(elev, proc_dims=None, w=None, **kwargs):
 
     if proc_dims:
 
+        import cv2
+
         inrows, incols = elev.shape
 
         elev = cv2.resize(elev.astype('float32'),
@@ -137,6 +139,8 @@ class Topo(object):
         Calculates the slope and intercept
         """
 
+        from sklearn.linear_model import LinearRegression, TheilSenRegressor
+
         if robust:
             model = TheilSenRegressor(n_jobs=n_jobs)
         else:
@@ -0,0 +1,224 @@
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    sensor TEXT NOT NULL,
+    query TEXT NOT NULL,
+    n_files INTEGER NOT NULL,
+    listed_at REAL NOT NULL,
+    PRIMARY KEY (sensor, query)
+);
+
+CREATE TABLE IF NOT EXISTS files (
+    url TEXT PRIMARY KEY,
+    scene_key TEXT NOT NULL,
+    sensor TEXT NOT NULL,
+    location TEXT,
+    date TEXT,
+    band TEXT
+);
+
+CREATE INDEX IF NOT EXISTS files_sensor_location_date ON files (sensor, location, date);
+CREATE INDEX IF NOT EXISTS files_sensor_date ON files (sensor, date);
+CREATE INDEX IF NOT EXISTS files_band ON files (band);
+CREATE INDEX IF NOT EXISTS files_scene_key ON files (scene_key);
+"""
+
+
+def parse_gcp_url(url):
+
+    """
+    Parses the location, date and band from a Google Cloud Platform Landsat or Sentinel 2 URL
+
+    Args:
+        url (str): The URL.
+
+    Returns:
+        ``tuple`` of (location, date, band), where location is path/row for Landsat or the
+            MGRS tile for Sentinel 2, date is yyyymmdd and any item that cannot be parsed is ``None``
+
+    Example:
+        >>> parse_gcp_url('gs://gcp-public-data-landsat/LC08/01/042/034/LC08_L1TP_042034_20161104_20170219_01_T1/LC08_L1TP_042034_20161104_20170219_01_T1_B4.TIF')
+        ('042/034', '20161104', 'B4')
+    """
+
+    url_parts = url.rstrip('/').split('/')
+    name = url_parts[-1]
+
+    if name == 'MTD_TL.xml':
+        band = 'MTD_TL'
+    else:
+        band = name.split('.')[0].split('_')[-1]
+
+    location = None
+    date = None
+
+    try:
+
+        if 'tiles' in url_parts:
+
+            # gs://gcp-public-data-sentinel-2/tiles/21/H/UD/S2A_MSIL1C_20160519T222025_..._T21HUD_....SAFE/...
+            tidx = url_parts.index('tiles')
+
+            location = '/'.join(url_parts[tidx+1:tidx+4])
+            date = url_parts[tidx+4].split('_')[2][:8]
+
+        else:
+
+            # LC08_L1TP_042034_20161104_20170219_01_T1_B4.TIF
+            scene_parts = name.split('_')
+
+            location = '{}/{}'.format(scene_parts[2][:3], scene_parts[2][3:])
+            date = scene_parts[3]
+
+    except IndexError:
+        pass
+
+    return location, date, band
+
+
+class GCPCatalog(object):
+
+    """
+    A persistent, indexed SQLite catalogue of Google Cloud Platform listings
+
+    Listings from ``GeoDownloads.list_gcp`` are ingested once and then searched by sensor, location,
+    date and band. Each ingested query is recorded so that it is only listed again when it is
+    older than ``max_age``.
+
+    Args:
+        db_file (str): The SQLite database file.
+        max_age (Optional[float]): The age (in days) after which a listed query is refreshed. If ``None``,
+            listed queries never expire.
+
+    Example:
+        >>> from geowombat.util import GeoDownloads
+        >>>
+        >>> gdl = GeoDownloads(catalog='gcp_catalog.sqlite', catalog_max_age=30)
+        >>>
+        >>> # The first cube lists GCP and fills the catalogue. Overlapping cubes are planned from the catalogue.
+        >>> gdl.download_cube(['l8'], ['2015-01-01', '2019-12-31'], bounds, ['blue', 'green', 'red'])
+        >>>
+        >>> gdl.catalog.search('l8', location='042/034', start='20160101', end='20161231', bands=['MTL', 'B4'])
+    """
+
+    def __init__(self, db_file, max_age=None):
+
+        self.db_file = str(db_file)
+        self.max_age = max_age
+
+        Path(self.db_file).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def is_listed(self, sensor, query):
+
+        """
+        Checks whether a query has been ingested and has not expired
+
+        Args:
+            sensor (str): The sensor.
+            query (str): The ``list_gcp`` query string.
+
+        Returns:
+            ``bool``
+        """
+
+        with self._lock:
+            row = self._conn.execute('SELECT listed_at FROM listings WHERE sensor = ? AND query = ?', (sensor, query)).fetchone()
+
+        if row is None:
+            return False
+
+        if self.max_age is None:
+            return True
+
+        return (time.time() - row[0]) < self.max_age * 86400.0
+
+    def ingest(self, sensor, query, search_dict):
+
+        """
+        Ingests a listing
+
+        Args:
+            sensor (str): The sensor.
+            query (str): The ``list_gcp`` query string.
+            search_dict (dict): The parsed listing, as a dictionary of {scene key: [urls]}. An empty dictionary
+                records that the query returned nothing.
+        """
+
+        rows = []
+
+        for scene_key, urls in search_dict.items():
+
+            for url in urls:
+                rows.append((url, scene_key, sensor) + parse_gcp_url(url))
+
+        with self._lock, self._conn:
+
+            self._conn.executemany('INSERT OR REPLACE INTO files (url, scene_key, sensor, location, date, band) VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+            self._conn.execute('INSERT OR REPLACE INTO listings (sensor, query, n_files, listed_at) VALUES (?, ?, ?, ?)',
+                               (sensor, query, len(rows), time.time()))
+
+    def search(self, sensor, location=None, start=None, end=None, bands=None):
+
+        """
+        Searches the catalogue
+
+        Args:
+            sensor (str): The sensor.
+            location (Optional[str]): The Landsat path/row (e.g., '042/034') or Sentinel 2 MGRS tile (e.g., '21/H/UD').
+            start (Optional[str]): The first date, as yyyymmdd or yyyymm.
+            end (Optional[str]): The last date, as yyyymmdd or yyyymm.
+            bands (Optional[list]): The bands (e.g., ['MTL', 'B4'] or ['MTD_TL', 'B04']).
+
+        Returns:
+            ``dict`` of {scene key: [urls]}, in the format of ``GeoDownloads.search_dict``
+        """
+
+        sql = 'SELECT scene_key, url FROM files WHERE sensor = ?'
+        params = [sensor]
+
+        if location:
+            sql += ' AND location = ?'
+            params.append(location)
+
+        if start:
+            sql += ' AND date >= ?'
+            params.append(str(start).ljust(8, '0'))
+
+        if end:
+            sql += ' AND date <= ?'
+            params.append(str(end).ljust(8, '9'))
+
+        if bands:
+            sql += ' AND band IN ({})'.format(','.join(['?'] * len(bands)))
+            params += list(bands)
+
+        sql += ' ORDER BY scene_key, url'
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        search_dict = OrderedDict()
+
+        for scene_key, url in rows:
+            search_dict.setdefault(scene_key, []).append(url)
+
+        return search_dict
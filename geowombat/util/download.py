@@ -0,0 +1,352 @@
+import os
+import time
+import glob
+import shutil
+import random
+import subprocess
+import concurrent.futures
+from pathlib import Path
+from collections import namedtuple
+
+try:
+    import requests
+    REQUESTS_INSTALLED = True
+except:
+    REQUESTS_INSTALLED = False
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+DownloadTask = namedtuple('DownloadTask', 'src dst')
+
+PART_SUFFIX = '.part'
+
+
+class Transport(object):
+
+    """
+    A base class for download transports
+
+    Transports copy one remote file to one local file. ``resumable`` transports append to an
+    existing partial file rather than starting over.
+    """
+
+    resumable = False
+
+    def fetch(self, src, dst):
+
+        """
+        Copies a remote file to a local file
+
+        Args:
+            src (str): The remote file.
+            dst (str): The local file. If the transport is resumable and ``dst`` exists, the download resumes from its size.
+        """
+
+        raise NotImplementedError
+
+    def size(self, src):
+
+        """
+        Gets the size of a remote file (in bytes), if it is cheap to get
+
+        Args:
+            src (str): The remote file.
+
+        Returns:
+            ``int`` or ``None``
+        """
+
+        return None
+
+    def list(self, url):
+
+        """
+        Recursively lists remote files in the format of ``gsutil ls -r``
+
+        Args:
+            url (str): The remote URL, which may include wildcards.
+
+        Returns:
+            ``list`` of lines
+        """
+
+        raise NotImplementedError
+
+
+class GsutilTransport(Transport):
+
+    """
+    A transport for Google Cloud Storage that uses ``gsutil``
+
+    ``gsutil`` tracks and resumes partial downloads of the same destination itself.
+    """
+
+    resumable = True
+
+    def fetch(self, src, dst):
+
+        proc = subprocess.run(['gsutil', '-q', 'cp', src, dst],
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE)
+
+        if proc.returncode != 0:
+            raise IOError(proc.stderr.decode('utf-8').strip())
+
+    def list(self, url):
+
+        try:
+
+            proc = subprocess.run(['gsutil', 'ls', '-r', url],
+                                  stdout=subprocess.PIPE,
+                                  stderr=subprocess.PIPE)
+
+        except:
+            logger.exception('gsutil must be installed.')
+            raise OSError
+
+        return proc.stdout.decode('utf-8').split('\n')
+
+
+class HTTPTransport(Transport):
+
+    """
+    A transport for HTTP(S) URLs that resumes with range requests
+
+    Args:
+        prefix_map (Optional[dict]): A mapping of URL prefixes to replace, e.g., to read
+            ``gs://gcp-public-data-landsat`` keys from ``https://storage.googleapis.com/gcp-public-data-landsat``.
+        chunk_size (Optional[int]): The streaming chunk size (in bytes).
+        timeout (Optional[float]): The connection timeout (in seconds).
+    """
+
+    resumable = True
+
+    def __init__(self, prefix_map=None, chunk_size=1024*1024, timeout=60):
+
+        if not REQUESTS_INSTALLED:
+            logger.exception('Requests must be installed.')
+            raise ImportError
+
+        self.prefix_map = prefix_map if prefix_map else {'gs://': 'https://storage.googleapis.com/'}
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+
+    def url(self, src):
+
+        for k, v in self.prefix_map.items():
+
+            if src.startswith(k):
+                return v + src[len(k):]
+
+        return src
+
+    def size(self, src):
+
+        response = requests.head(self.url(src), allow_redirects=True, timeout=self.timeout)
+
+        if response.ok and ('Content-Length' in response.headers):
+            return int(response.headers['Content-Length'])
+
+        return None
+
+    def fetch(self, src, dst):
+
+        offset = os.path.getsize(dst) if os.path.isfile(dst) else 0
+        headers = {'Range': 'bytes={:d}-'.format(offset)} if offset > 0 else {}
+
+        with requests.get(self.url(src), headers=headers, stream=True, timeout=self.timeout) as response:
+
+            # The range starts at the end of the remote file, so the partial file is already complete
+            if (response.status_code == 416) and (offset > 0) and (self.size(src) == offset):
+                return
+
+            response.raise_for_status()
+
+            # The server ignored the range, so start over
+            mode = 'ab' if response.status_code == 206 else 'wb'
+
+            with open(dst, mode=mode) as f:
+
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+
+
+class LocalTransport(Transport):
+
+    """
+    A transport that copies from a local directory laid out like a bucket, e.g., for testing
+
+    Args:
+        root (str): The local directory that stands in for ``prefix``.
+        prefix (Optional[str]): The remote prefix that ``root`` replaces.
+
+    Example:
+        >>> from geowombat.util import GeoDownloads
+        >>> from geowombat.util.download import LocalTransport
+        >>>
+        >>> # gs://gcp-public-data-landsat/LC08/... is read from /data/mirror/gcp-public-data-landsat/LC08/...
+        >>> dl = GeoDownloads(transport=LocalTransport('/data/mirror'))
+    """
+
+    resumable = True
+
+    def __init__(self, root, prefix='gs://', chunk_size=1024*1024):
+
+        self.root = Path(root)
+        self.prefix = prefix
+        self.chunk_size = chunk_size
+
+    def path(self, src):
+        return self.root.joinpath(src[len(self.prefix):] if src.startswith(self.prefix) else src)
+
+    def size(self, src):
+        return self.path(src).stat().st_size
+
+    def fetch(self, src, dst):
+
+        offset = os.path.getsize(dst) if os.path.isfile(dst) else 0
+
+        with open(str(self.path(src)), mode='rb') as fsrc:
+
+            fsrc.seek(offset)
+
+            with open(dst, mode='ab') as fdst:
+                shutil.copyfileobj(fsrc, fdst, self.chunk_size)
+
+    def list(self, url):
+
+        lines = []
+
+        for match in sorted(glob.glob(str(self.path(url)))):
+
+            for dirpath, dirnames, filenames in sorted(os.walk(match)):
+
+                dir_url = self.prefix + str(Path(dirpath).relative_to(self.root))
+
+                lines.append(dir_url + '/:')
+                lines += [dir_url + '/' + fn for fn in sorted(filenames)]
+                lines.append('')
+
+        return lines
+
+
+class DownloadManager(object):
+
+    """
+    A bounded pool of concurrent, resumable downloads
+
+    Each file is written to a ``.part`` file that is renamed when complete, so an existing output
+    file is always a complete download and is skipped. Failed transfers are retried with
+    exponential backoff, resuming from the partial file when the transport allows it. When the
+    transport reports remote sizes, a partial file that is already complete is renamed without
+    a transfer, and one that is larger than the remote file is discarded.
+
+    Args:
+        transport (Optional[Transport]): The transport. Default is ``GsutilTransport``.
+        n_workers (Optional[int]): The number of concurrent downloads.
+        retries (Optional[int]): The number of retries per file.
+        backoff (Optional[float]): The base backoff (in seconds). Retry ``i`` waits ``backoff`` x 2^i seconds, plus jitter.
+        verbose (Optional[int]): The verbosity level.
+
+    Example:
+        >>> from geowombat.util.download import DownloadManager, DownloadTask
+        >>>
+        >>> manager = DownloadManager(n_workers=8, retries=5)
+        >>> status = manager.download([DownloadTask(src='gs://bucket/file1.TIF', dst='file1.TIF'),
+        >>>                            DownloadTask(src='gs://bucket/file2.TIF', dst='file2.TIF')])
+    """
+
+    def __init__(self, transport=None, n_workers=4, retries=3, backoff=1.0, verbose=0):
+
+        self.transport = transport if transport else GsutilTransport()
+        self.n_workers = n_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.verbose = verbose
+
+    def _download_one(self, task):
+
+        dst = Path(task.dst)
+        part = Path(str(dst) + PART_SUFFIX)
+
+        if dst.is_file():
+            return 'skipped'
+
+        dst.parent.mkdir(parents=True, exist_ok=True)
+
+        for attempt in range(0, self.retries+1):
+
+            if part.is_file() and not self.transport.resumable:
+                part.unlink()
+
+            try:
+
+                expected_size = self.transport.size(task.src)
+
+                if part.is_file() and (expected_size is not None):
+
+                    part_size = part.stat().st_size
+
+                    # The process stopped after the transfer, but before the rename
+                    if part_size == expected_size:
+
+                        os.replace(str(part), str(dst))
+
+                        return 'done'
+
+                    elif part_size > expected_size:
+
+                        logger.warning('  {} is larger than the remote file, so the download will start over.'.format(part.name))
+
+                        part.unlink()
+
+                if self.verbose > 0:
+                    logger.info('  Downloading {} ...'.format(dst.name))
+
+                self.transport.fetch(task.src, str(part))
+
+                if (expected_size is not None) and (part.stat().st_size != expected_size):
+                    raise IOError('{} is incomplete.'.format(part.name))
+
+                os.replace(str(part), str(dst))
+
+                return 'done'
+
+            except Exception as e:
+
+                if attempt == self.retries:
+
+                    logger.warning('  Failed to download {}: {}'.format(task.src, e))
+
+                    return 'failed'
+
+                wait = self.backoff * 2 ** attempt * (1.0 + random.random())
+
+                logger.warning('  Retrying {} in {:.1f} seconds ({}) ...'.format(dst.name, wait, e))
+
+                time.sleep(wait)
+
+    def download(self, tasks):
+
+        """
+        Downloads files concurrently
+
+        Args:
+            tasks (list): A list of ``DownloadTask`` items.
+
+        Returns:
+            ``dict`` of {output file: status}, where status is one of ['done', 'skipped', 'failed']
+        """
+
+        status = {}
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+
+            futures = {executor.submit(self._download_one, task): task for task in tasks}
+
+            for future in concurrent.futures.as_completed(futures):
+                status[futures[future].dst] = future.result()
+
+        return status
@@ -1,19 +1,24 @@
 import os
+import json
 import shutil
 import fnmatch
 import tarfile
-import subprocess
 from pathlib import Path
 from datetime import datetime
 from collections import namedtuple
 import random
 import string
 import time
+import concurrent.futures
+from contextlib import ExitStack
 
-from ..radiometry import BRDF, LinearAdjustments, RadTransforms, landsat_pixel_angles, sentinel_pixel_angles, QAMasker
+from ..radiometry import BRDF, LinearAdjustments, RadTransforms, landsat_pixel_angles, sentinel_pixel_angles_lazy, QAMasker
+from ..radiometry.angles import get_sentinel_sensor
 from ..radiometry.angles import estimate_cloud_shadows
 from ..core import ndarray_to_xarray
 from ..backends.gdal_ import warp
+from .download import DownloadManager, DownloadTask, GsutilTransport
+from .catalog import GCPCatalog
 
 import geowombat as gw
 
@@ -48,6 +53,11 @@ except:
 
 shapely.speedups.enable()
 
+FileInfo = namedtuple('FileInfo', 'name key')
+
+# Scene processing results that do not need to be run again
+SCENE_COMPLETE = ['done', 'nodata', 'exists']
+
 RESAMPLING_DICT = dict(bilinear=gdal.GRA_Bilinear,
                        cubic=gdal.GRA_Cubic,
                        nearest=gdal.GRA_NearestNeighbour)
@@ -255,9 +265,505 @@ def _parse_google_filename(filename, landsat_parts, sentinel_parts, public_url):
     return file_info
 
 
+def _process_scene(sensor, finfo_dict, load_bands, options):
+
+    """
+    Computes angles, surface reflectance, BRDF and QA masks for one downloaded scene and writes the result
+
+    This is the processing stage of ``GeoDownloads.download_cube``. It runs in a separate process, so
+    each scene has its own ``geowombat.config``.
+
+    Args:
+        sensor (str): The sensor.
+        finfo_dict (dict): The downloaded scene files, as {key: FileInfo}.
+        load_bands (list): The band keys to load.
+        options (dict): The ``download_cube`` processing options.
+
+    Returns:
+        ``str`` of the scene result. Choices are ['done', 'nodata', 'exists', 'missing', 'incomplete'].
+    """
+
+    status = options['status']
+    main_path = options['main_path']
+    outdir_brdf = options['outdir_brdf']
+    bands = options['bands']
+    bands_out = options['bands_out']
+    crs = options['crs']
+    out_bounds = options['out_bounds']
+    ref_res = options['ref_res']
+    resampling = options['resampling']
+    l57_angles_path = options['l57_angles_path']
+    l8_angles_path = options['l8_angles_path']
+    write_angle_files = options['write_angle_files']
+    mask_qa = options['mask_qa']
+    lqa_mask_items = options['lqa_mask_items']
+    chunks = options['chunks']
+    cloud_heights = options['cloud_heights']
+    num_threads = options['num_threads']
+    nodataval = options['nodataval']
+    angle_kwargs = options['angle_kwargs']
+    kwargs = options['kwargs']
+
+    rt = RadTransforms()
+    br = BRDF()
+    la = LinearAdjustments()
+
+    # Incomplete dictionary because file was checked, existed, and cleaned
+    if 'meta' not in finfo_dict:
+        logger.warning('  The metadata does not exist.')
+        _clean_and_update(status, None, finfo_dict, None, check_angles=False)
+        return 'missing'
+
+    brdfp = '_'.join(Path(finfo_dict['meta'].name).name.split('_')[:-1])
+    out_brdf = outdir_brdf.joinpath(brdfp + '.tif')
+    out_angles = outdir_brdf.joinpath(brdfp + '_angles.tif')
+
+    if sensor in ['s2', 's2a', 's2b', 's2c']:
+        outdir_angles = main_path.joinpath('angles_{}'.format(Path(finfo_dict['meta'].name).name.replace('_MTD_TL.xml', '')))
+    else:
+        outdir_angles = main_path.joinpath('angles_{}'.format(Path(finfo_dict['meta'].name).name.replace('_MTL.txt', '')))
+
+    if not Path(finfo_dict['meta'].name).is_file():
+        logger.warning('  The metadata does not exist.')
+        _clean_and_update(status, outdir_angles, finfo_dict, finfo_dict['meta'].name, check_angles=False)
+        return 'missing'
+
+    if out_brdf.is_file():
+
+        logger.warning('  The output BRDF file, {}, already exists.'.format(brdfp))
+        _clean_and_update(status, outdir_angles, finfo_dict, finfo_dict['meta'].name, check_angles=False)
+        return 'exists'
+
+    if load_bands[0] not in finfo_dict:
+        logger.warning('  The download for {} was incomplete.'.format(brdfp))
+        _clean_and_update(status, outdir_angles, finfo_dict, finfo_dict['meta'].name, check_angles=False)
+        return 'incomplete'
+
+    outdir_angles.mkdir(parents=True, exist_ok=True)
+
+    ref_file = finfo_dict[load_bands[0]].name
+
+    logger.info('  Processing angles for {} ...'.format(brdfp))
+
+    if sensor.lower() in ['s2', 's2a', 's2b', 's2c']:
+
+        # Sentinel angles are interpolated lazily on the output grid, so only the sensor is needed here
+        sentinel_sensor = get_sentinel_sensor(finfo_dict['meta'].name)
+
+        if ' '.join(bands) == 'coastal blue green red nir1 nir2 nir3 nir rededge water cirrus swir1 swir2':
+            rad_sensor = 's2af' if sentinel_sensor == 's2a' else 's2bf'
+        elif ' '.join(bands) == 'coastal blue red nir1 nir rededge water cirrus swir1 swir2':
+            rad_sensor = 's2acloudless' if sentinel_sensor == 's2a' else 's2bcloudless'
+        elif ' '.join(bands) == 'blue green red nir1 nir2 nir3 nir rededge swir1 swir2':
+            rad_sensor = sentinel_sensor
+        elif ' '.join(bands) == 'blue green red nir swir1 swir2':
+            rad_sensor = 's2al7' if sentinel_sensor == 's2a' else 's2bl7'
+        elif ' '.join(bands) == 'nir1 nir2 nir3 rededge swir1 swir2':
+            rad_sensor = 's2a20' if sentinel_sensor == 's2a' else 's2b20'
+        elif ' '.join(bands) == 'blue green red nir':
+            rad_sensor = 's2a10' if sentinel_sensor == 's2a' else 's2b10'
+        else:
+            rad_sensor = sentinel_sensor
+
+        bandpass_sensor = sentinel_sensor
+
+    else:
+
+        meta = rt.get_landsat_coefficients(finfo_dict['meta'].name)
+
+        angle_info = landsat_pixel_angles(finfo_dict['angle'].name,
+                                          ref_file,
+                                          str(outdir_angles),
+                                          meta.sensor,
+                                          l57_angles_path=l57_angles_path,
+                                          l8_angles_path=l8_angles_path,
+                                          verbose=1)
+
+        if (len(bands) == 1) and (bands[0] == 'pan'):
+            rad_sensor = sensor + bands[0]
+        else:
+
+            if (len(bands) == 6) and (meta.sensor == 'l8'):
+                rad_sensor = 'l8l7'
+            elif (len(bands) == 7) and (meta.sensor == 'l8') and ('pan' in bands):
+                rad_sensor = 'l8l7mspan'
+            elif (len(bands) == 7) and (meta.sensor == 'l7') and ('pan' in bands):
+                rad_sensor = 'l7mspan'
+            else:
+                rad_sensor = meta.sensor
+
+        bandpass_sensor = sensor
+
+    if sensor in ['s2', 's2a', 's2b', 's2c']:
+
+        logger.info('  Translating jp2 files to gtiff for {} ...'.format(brdfp))
+
+        load_bands_names = []
+
+        # Convert to GeoTiffs to avoid CRS issue with jp2 format
+        for bd in load_bands:
+
+            # Check if the file exists to avoid duplicate GCP filenames`
+            if Path(finfo_dict[bd].name).is_file():
+
+                warp(finfo_dict[bd].name,
+                     finfo_dict[bd].name.replace('.jp2', '.tif'),
+                     overwrite=True,
+                     delete_input=True,
+                     multithread=True,
+                     warpMemoryLimit=256,
+                     outputBounds=out_bounds,
+                     xRes=ref_res[0],
+                     yRes=ref_res[1],
+                     resampleAlg=RESAMPLING_DICT[resampling],
+                     creationOptions=['TILED=YES',
+                                      'COMPRESS=LZW',
+                                      'BLOCKXSIZE={CHUNKS:d}'.format(CHUNKS=chunks),
+                                      'BLOCKYSIZE={CHUNKS:d}'.format(CHUNKS=chunks)])
+
+                load_bands_names.append(finfo_dict[bd].name.replace('.jp2', '.tif'))
+
+    else:
+
+        # Get band names from user
+        load_bands_names = [finfo_dict[bd].name for bd in load_bands]
+
+    logger.info('  Applying BRDF and SR correction for {} ...'.format(brdfp))
+
+    with gw.config.update(sensor=rad_sensor,
+                          ref_bounds=out_bounds,
+                          ref_crs=crs,
+                          ref_res=ref_res if ref_res else load_bands_names[-1]):
+
+        valid_data = True
+
+        # Ensure there is data
+        with gw.open(load_bands_names[0],
+                     band_names=[1],
+                     chunks=chunks,
+                     num_threads=num_threads) as data:
+
+            if data.sel(band=1).min().data.compute(num_threads=num_threads) > 10000:
+                valid_data = False
+
+            if valid_data:
+
+                if data.sel(band=1).max().data.compute(num_threads=num_threads) == 0:
+                    valid_data = False
+
+        if valid_data:
+
+            with ExitStack() as stack:
+
+                data = stack.enter_context(gw.open(load_bands_names,
+                                                   band_names=bands,
+                                                   stack_dim='band',
+                                                   chunks=chunks,
+                                                   resampling=resampling,
+                                                   num_threads=num_threads))
+
+                if sensor.lower() in ['s2', 's2a', 's2b', 's2c']:
+
+                    # The angles are computed chunk by chunk with the data and are not written to file
+                    angle_info = sentinel_pixel_angles_lazy(finfo_dict['meta'].name, data)
+
+                    sza, vza, saa, vaa = angle_info.sza, angle_info.vza, angle_info.saa, angle_info.vaa
+
+                else:
+
+                    sza, vza, saa, vaa = [stack.enter_context(gw.open(angle_file,
+                                                                      chunks=chunks,
+                                                                      resampling='cubic'))
+                                          for angle_file in [angle_info.sza, angle_info.vza, angle_info.saa, angle_info.vaa]]
+
+                attrs = data.attrs.copy()
+
+                if mask_qa:
+
+                    if sensor.lower() in ['s2', 's2a', 's2b', 's2c']:
+
+                        if S2CLOUDLESS_INSTALLED:
+
+                            cloud_detector = S2PixelCloudDetector(threshold=0.4,
+                                                                  average_over=1,
+                                                                  dilation_size=5,
+                                                                  all_bands=False)
+
+                            # Get the S2Cloudless bands
+                            data_cloudless = data.sel(band=['coastal', 'blue', 'red', 'nir1', 'nir', 'rededge', 'water', 'cirrus', 'swir1', 'swir2'])
+
+                            # Scale from 0-10000 to 0-1 and reshape
+                            X = (data_cloudless * 0.0001).clip(0, 1).data\
+                                    .compute(num_workers=num_threads)\
+                                    .transpose(1, 2, 0)[np.newaxis, :, :, :]
+
+                            # Predict clouds
+                            # Potential classes? Currently, only clear and clouds are returned.
+                            # clear=0, clouds=1, shadow=2, snow=3, cirrus=4, water=5
+                            mask = ndarray_to_xarray(data,
+                                                     cloud_detector.get_cloud_masks(X),
+                                                     ['mask'])
+
+                        else:
+
+                            if bands_out:
+
+                                # If there are extra bands, remove them because they
+                                # are not supported in the BRDF kernels.
+                                data = _assign_attrs(data, attrs, bands_out)
+
+                            logger.warning('  S2Cloudless is not installed, so skipping Sentinel cloud masking.')
+
+                if sensor.lower() in ['s2', 's2a', 's2b', 's2c']:
+
+                    # The S-2 data are in TOAR (0-10000)
+                    toar_scaled = (data * 0.0001).clip(0, 1).astype('float64')
+                    toar_scaled.attrs = attrs
+
+                    # Convert TOAR to surface reflectance
+                    sr = rt.toar_to_sr(toar_scaled,
+                                       sza, saa, vza, vaa,
+                                       rad_sensor,
+                                       dst_nodata=nodataval)
+
+                else:
+
+                    # Convert DN to surface reflectance
+                    sr = rt.dn_to_sr(data,
+                                     sza, saa, vza, vaa,
+                                     sensor=rad_sensor,
+                                     meta=meta,
+                                     src_nodata=nodataval,
+                                     dst_nodata=nodataval)
+
+                # BRDF normalization
+                sr_brdf = br.norm_brdf(sr,
+                                       sza, saa, vza, vaa,
+                                       sensor=rad_sensor,
+                                       wavelengths=data.band.values.tolist(),
+                                       out_range=10000.0,
+                                       src_nodata=nodataval,
+                                       dst_nodata=nodataval)
+
+                if bandpass_sensor.lower() in ['l5', 'l7', 's2', 's2a', 's2b', 's2c']:
+
+                    # Linearly adjust to Landsat 8
+                    sr_brdf = la.bandpass(sr_brdf,
+                                          bandpass_sensor.lower(),
+                                          to='l8',
+                                          scale_factor=0.0001,
+                                          src_nodata=nodataval,
+                                          dst_nodata=nodataval)
+
+                if mask_qa:
+
+                    if sensor.lower() in ['s2', 's2a', 's2b', 's2c']:
+
+                        if S2CLOUDLESS_INSTALLED:
+
+                            wavel_sub = sr_brdf.gw.set_nodata(nodataval,
+                                                              nodataval,
+                                                              (0, 1),
+                                                              'float64')
+
+                            # Estimate the cloud shadows
+                            mask = estimate_cloud_shadows(wavel_sub,
+                                                          mask,
+                                                          sza,
+                                                          saa,
+                                                          vza,
+                                                          vaa,
+                                                          heights=cloud_heights,
+                                                          num_workers=num_threads)
+
+                            # Update the bands with the mask
+                            sr_brdf = xr.where((mask.sel(band='mask') == 0) &
+                                               (sr_brdf != nodataval),
+                                               sr_brdf.clip(0, 10000),
+                                               nodataval).astype('uint16')
+
+                        sr_brdf = _assign_attrs(sr_brdf, attrs, bands_out)
+                        sr_brdf.gw.to_raster(str(out_brdf), **kwargs)
+
+                    else:
+
+                        with gw.open(finfo_dict['qa'].name,
+                                     band_names=['qa']) as qa:
+
+                            if sensor.lower() == 'l8':
+                                qa_sensor = 'l8-c1'
+                            else:
+                                qa_sensor = 'l-c1'
+
+                            mask = QAMasker(qa,
+                                            qa_sensor,
+                                            mask_items=lqa_mask_items,
+                                            confidence_level='maybe').to_mask()
+
+                            # Mask non-clear pixels
+                            sr_brdf = xr.where(mask.sel(band='mask') < 2,
+                                               sr_brdf.clip(0, 10000),
+                                               nodataval).astype('uint16')
+
+                            sr_brdf = _assign_attrs(sr_brdf, attrs, bands_out)
+                            sr_brdf.gw.to_raster(str(out_brdf), **kwargs)
+
+                else:
+
+                    # Set 'no data' values
+                    sr_brdf = sr_brdf.gw.set_nodata(nodataval,
+                                                    nodataval,
+                                                    (0, 10000),
+                                                    'uint16')
+
+                    sr_brdf = _assign_attrs(sr_brdf, attrs, bands_out)
+                    sr_brdf.gw.to_raster(str(out_brdf), **kwargs)
+
+                if write_angle_files:
+
+                    angle_stack = xr.concat((sza, saa), dim='band').astype('int16')
+                    angle_stack.attrs = sza.attrs.copy()
+                    angle_stack.gw.to_raster(str(out_angles), **angle_kwargs)
+
+        else:
+
+            logger.warning('  Not enough data for {} to store on disk.'.format(str(out_brdf)))
+
+            # Write an empty file for tracking
+            with open(str(out_brdf).replace('.tif', '.nodata'), 'w') as tx:
+                tx.writelines([])
+
+    _clean_and_update(status,
+                      outdir_angles,
+                      finfo_dict,
+                      finfo_dict['meta'].name,
+                      load_bands_names=load_bands_names)
+
+    return 'done' if out_brdf.is_file() else 'nodata'
+
+
+class _SceneStatus(object):
+
+    """
+    A JSON file that tracks the completed stages of each scene in ``GeoDownloads.download_cube``
+
+    Args:
+        filename (Path): The status file.
+    """
+
+    def __init__(self, filename):
+
+        self.filename = Path(filename)
+        self.scenes = {}
+
+        if self.filename.is_file():
+
+            with open(str(self.filename), mode='r') as f:
+                self.scenes = json.load(f)
+
+    def done(self, scene_id, stage):
+        return self.scenes.get(scene_id, {}).get(stage) in SCENE_COMPLETE
+
+    def mark(self, scene_id, stage, result):
+
+        self.scenes.setdefault(scene_id, {})[stage] = result
+
+        tmp_file = self.filename.with_suffix('.tmp')
+
+        # Write and rename so that an interrupted run never leaves a partial file
+        with open(str(tmp_file), mode='w') as f:
+            json.dump(self.scenes, f, indent=2, sort_keys=True)
+
+        os.replace(str(tmp_file), str(self.filename))
+
+
+def _scene_id(search_key):
+
+    # The search keys end with the Landsat scene id or the Sentinel 2 granule id
+    return Path(search_key).name
+
+
+def _group_scenes(search_keys):
+
+    """
+    Groups search keys by scene
+
+    Sentinel 2 granules list their image files in sub-directories, which belong to the granule key.
+
+    Args:
+        search_keys (list): The ``GeoDownloads.search_dict`` keys.
+
+    Returns:
+        ``dict`` of {scene key: [search keys]}
+    """
+
+    scenes = {}
+
+    for search_key in sorted(search_keys):
+
+        scene_key = next((k for k in scenes if search_key.startswith(k + '/')), search_key)
+        scenes.setdefault(scene_key, []).append(search_key)
+
+    return scenes
+
+
+def _collect_scenes(pending, scene_status, return_when, timeout=None):
+
+    """
+    Waits on processing futures and records their results
+
+    Args:
+        pending (dict): The processing futures, as {future: scene id}. Finished futures are removed.
+        scene_status (_SceneStatus): The scene status.
+        return_when (str): The ``concurrent.futures.wait`` condition.
+        timeout (Optional[float]): The maximum time to wait (in seconds). If 0, only futures that
+            are already finished are recorded.
+    """
+
+    done, not_done = concurrent.futures.wait(list(pending.keys()), timeout=timeout, return_when=return_when)
+
+    for future in done:
+
+        scene_id = pending.pop(future)
+
+        try:
+            result = future.result()
+        except Exception as e:
+
+            logger.warning('  Processing failed for {}: {}'.format(scene_id, e))
+            result = 'failed'
+
+        scene_status.mark(scene_id, 'process', result)
+
+        logger.info('  Finished processing {} ({}).'.format(scene_id, result))
+
+
 class GeoDownloads(object):
 
-    def __init__(self):
+    """
+    A class to download and process satellite imagery
+
+    Args:
+        transport (Optional[Transport]): The download transport from ``geowombat.util.download``.
+            Default is ``GsutilTransport``.
+        n_workers (Optional[int]): The number of concurrent file downloads.
+        retries (Optional[int]): The number of retries for each file download.
+        catalog (Optional[str or GCPCatalog]): A SQLite file, or ``geowombat.util.catalog.GCPCatalog``, to store
+            ``list_gcp`` results in. ``download_cube`` plans from the catalogue instead of listing queries
+            that are already catalogued.
+        catalog_max_age (Optional[float]): The age (in days) after which catalogued queries are listed again.
+    """
+
+    def __init__(self, transport=None, n_workers=4, retries=3, catalog=None, catalog_max_age=None):
+
+        self.transport = transport if transport else GsutilTransport()
+        self.n_workers = n_workers
+        self.retries = retries
+
+        if isinstance(catalog, GCPCatalog) or (catalog is None):
+            self.catalog = catalog
+        else:
+            self.catalog = GCPCatalog(catalog, max_age=catalog_max_age)
 
         self.gcp_public = 'https://storage.googleapis.com/gcp-public-data'
         self.aws_l8_public = 'https://landsat-pds.s3.amazonaws.com/c1/L8'
@@ -332,6 +838,8 @@ class GeoDownloads(object):
                       chunks=512,
                       cloud_heights=None,
                       num_threads=1,
+                      n_process_workers=1,
+                      max_pending=None,
                       **kwargs):
 
         """
@@ -367,6 +875,10 @@ class GeoDownloads(object):
             chunks (Optional[int]): The chunk size to read at.
             cloud_heights (Optional[list]): The cloud heights, in kilometers.
             num_threads (Optional[int]): The number of GDAL warp threads.
+            n_process_workers (Optional[int]): The number of scenes to process concurrently, in separate processes,
+                while the next scenes download. File downloads are concurrent up to ``GeoDownloads.n_workers``.
+            max_pending (Optional[int]): The maximum number of downloaded scenes that wait on processing before
+                downloads pause. Default is 2 x ``n_process_workers``.
             kwargs (Optional[dict]): Keyword arguments passed to ``to_raster``.
 
         Examples:
@@ -408,12 +920,6 @@ class GeoDownloads(object):
 
         nodataval = kwargs['nodata'] if 'nodata' in kwargs else 65535
 
-        angle_infos = {}
-
-        rt = RadTransforms()
-        br = BRDF()
-        la = LinearAdjustments()
-
         main_path = Path(outdir)
         outdir_brdf = main_path.joinpath('brdf')
 
@@ -423,9 +929,12 @@ class GeoDownloads(object):
         # Logging file
         status = Path(outdir).joinpath('status.txt')
 
+        # Per-scene stage tracking, so that interrupted runs skip completed scenes
+        scene_status = _SceneStatus(Path(outdir).joinpath('scene_status.json'))
+
         if not status.is_file():
 
-            with open(str(status), mode='w') as tx:
+            with open(str(status), mode='w'):
                 pass
 
         # Get bounds from geometry
@@ -519,458 +1028,184 @@ class GeoDownloads(object):
                 else:
                     year_months[y] = months
 
-        year = dt1.year
-
-        while True:
-
-            if year > dt2.year:
-                break
-
-            for m in year_months[year]:
+        scene_options = dict(status=status,
+                             main_path=main_path,
+                             outdir_brdf=outdir_brdf,
+                             bands=bands,
+                             bands_out=bands_out,
+                             crs=crs,
+                             out_bounds=out_bounds,
+                             ref_res=ref_res,
+                             resampling=resampling,
+                             l57_angles_path=l57_angles_path,
+                             l8_angles_path=l8_angles_path,
+                             write_angle_files=write_angle_files,
+                             mask_qa=mask_qa,
+                             lqa_mask_items=lqa_mask_items,
+                             chunks=chunks,
+                             cloud_heights=cloud_heights,
+                             num_threads=num_threads,
+                             nodataval=nodataval,
+                             angle_kwargs=angle_kwargs,
+                             kwargs=kwargs)
+
+        if not max_pending:
+            max_pending = 2 * n_process_workers
+
+        # Scenes are processed in separate processes while the next scenes download
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=n_process_workers)
+        pending = {}
 
-                yearmonth_query = '{:d}{:02d}'.format(year, m)
-
-                for sensor in sensors:
-
-                    band_associations = self.associations[sensor]
-
-                    # TODO: get path/row and MGRS from geometry
-                    # location = '21/H/UD' # or '225/083'
-
-                    if sensor.lower() in ['s2', 's2a', 's2b', 's2c']:
-
-                        locations = ['{}/{}/{}'.format(dfrow.Name[:2], dfrow.Name[2], dfrow.Name[3:])
-                                     for dfi, dfrow in shp_dict['mgrs'].iterrows()]
-
-                    else:
-
-                        locations = ['{:03d}/{:03d}'.format(int(dfrow.PATH), int(dfrow.ROW))
-                                     for dfi, dfrow in shp_dict['wrs'].iterrows()]
-
-                    for location in locations:
+        try:
 
-                        if sensor.lower() in ['s2', 's2a', 's2b', 's2c']:
+            year = dt1.year
 
-                            query = '{LOCATION}/{LEVEL}*{YM}*.SAFE/GRANULE/*'.format(LOCATION=location,
-                                                                                     LEVEL=sensor.upper(),
-                                                                                     YM=yearmonth_query)
+            while True:
 
-                        else:
+                if year > dt2.year:
+                    break
 
-                            query = '{LOCATION}/*{PATHROW}_{YM}*_T*'.format(LOCATION=location,
-                                                                            PATHROW=location.replace('/', ''),
-                                                                            YM=yearmonth_query)
+                for m in year_months[year]:
 
-                        # Query and list available files on the GCP
-                        self.list_gcp(sensor, query)
+                    yearmonth_query = '{:d}{:02d}'.format(year, m)
 
-                        if not self.search_dict:
+                    for sensor in sensors:
 
-                            logger.warning(
-                                '  No results found for {SENSOR} at location {LOC}, year {YEAR:d}, month {MONTH:d}.'.format(
-                                    SENSOR=sensor,
-                                    LOC=location,
-                                    YEAR=year,
-                                    MONTH=m))
+                        band_associations = self.associations[sensor]
 
-                            continue
+                        # TODO: get path/row and MGRS from geometry
+                        # location = '21/H/UD' # or '225/083'
 
-                        # Download data
                         if sensor.lower() in ['s2', 's2a', 's2b', 's2c']:
 
-                            load_bands = ['B{:02d}'.format(band_associations[bd]) if bd != 'rededge'
-                                          else 'B{:01d}A'.format(band_associations[bd]) for bd in bands]
-
-                            search_wildcards = ['MTD_TL.xml'] + [bd + '.jp2' for bd in load_bands]
-
-                            file_info = self.download_gcp(sensor,
-                                                          outdir=outdir,
-                                                          outdir_brdf=outdir_brdf,
-                                                          search_wildcards=search_wildcards,
-                                                          check_file=str(status),
-                                                          verbose=1)
-
-                            # Reorganize the dictionary to combine bands and metadata
-                            new_dict_ = dict()
-                            for finfo_key, finfo_dict in file_info.items():
-
-                                sub_dict_ = dict()
-
-                                if 'meta' in finfo_dict:
-
-                                    key = finfo_dict['meta'].name
-
-                                    sub_dict_['meta'] = finfo_dict['meta']
-
-                                    for finfo_key_, finfo_dict_ in file_info.items():
-
-                                        if 'meta' not in finfo_dict_:
-                                            for bdkey_, bdinfo_ in finfo_dict_.items():
-                                                if '_'.join(bdinfo_.name.split('_')[:-1]) in key:
-                                                    sub_dict_[bdkey_] = bdinfo_
-
-                                    new_dict_[finfo_key] = sub_dict_
-
-                            file_info = new_dict_
+                            locations = ['{}/{}/{}'.format(dfrow.Name[:2], dfrow.Name[2], dfrow.Name[3:])
+                                         for dfi, dfrow in shp_dict['mgrs'].iterrows()]
 
                         else:
 
-                            del_keys = [k for k, v in self.search_dict.items() if 'gap_mask' in k]
+                            locations = ['{:03d}/{:03d}'.format(int(dfrow.PATH), int(dfrow.ROW))
+                                         for dfi, dfrow in shp_dict['wrs'].iterrows()]
 
-                            for dk in del_keys:
-                                del self.search_dict[dk]
+                        for location in locations:
 
-                            load_bands = sorted(['B{:d}'.format(band_associations[bd]) for bd in bands])
-
-                            search_wildcards = ['ANG.txt', 'MTL.txt', 'BQA.TIF'] + [bd + '.TIF' for bd in load_bands]
+                            if sensor.lower() in ['s2', 's2a', 's2b', 's2c']:
 
-                            file_info = self.download_gcp(sensor,
-                                                          outdir=outdir,
-                                                          outdir_brdf=outdir_brdf,
-                                                          search_wildcards=search_wildcards,
-                                                          check_file=str(status),
-                                                          verbose=1)
+                                query = '{LOCATION}/{LEVEL}*{YM}*.SAFE/GRANULE/*'.format(LOCATION=location,
+                                                                                         LEVEL=sensor.upper(),
+                                                                                         YM=yearmonth_query)
 
-                        logger.info('  Finished downloading files for yyyymm query, {}.'.format(yearmonth_query))
+                            else:
 
-                        # Create pixel angle files
-                        # TODO: this can be run in parallel
-                        for finfo_key, finfo_dict in file_info.items():
+                                query = '{LOCATION}/*{PATHROW}_{YM}*_T*'.format(LOCATION=location,
+                                                                                PATHROW=location.replace('/', ''),
+                                                                                YM=yearmonth_query)
 
-                            # Incomplete dictionary because file was checked, existed, and cleaned
-                            if 'meta' not in finfo_dict:
-                                logger.warning('  The metadata does not exist.')
-                                _clean_and_update(status, None, finfo_dict, None, check_angles=False)
-                                continue
+                            # Query the catalogue, or list available files on the GCP
+                            if self.catalog and self.catalog.is_listed(sensor, query):
 
-                            brdfp = '_'.join(Path(finfo_dict['meta'].name).name.split('_')[:-1])
-                            out_brdf = outdir_brdf.joinpath(brdfp + '.tif')
-                            out_angles = outdir_brdf.joinpath(brdfp + '_angles.tif')
+                                self.search_dict = self.catalog.search(sensor,
+                                                                       location=location,
+                                                                       start=yearmonth_query,
+                                                                       end=yearmonth_query)
 
-                            if sensor in ['s2', 's2a', 's2b', 's2c']:
-                                outdir_angles = main_path.joinpath('angles_{}'.format(Path(finfo_dict['meta'].name).name.replace('_MTD_TL.xml', '')))
                             else:
-                                outdir_angles = main_path.joinpath('angles_{}'.format(Path(finfo_dict['meta'].name).name.replace('_MTL.txt', '')))
-
-                            if not Path(finfo_dict['meta'].name).is_file():
-                                logger.warning('  The metadata does not exist.')
-                                _clean_and_update(status, outdir_angles, finfo_dict, finfo_dict['meta'].name, check_angles=False)
-                                continue
+                                self.list_gcp(sensor, query)
 
-                            if out_brdf.is_file():
+                            if not self.search_dict:
 
-                                logger.warning('  The output BRDF file, {}, already exists.'.format(brdfp))
-                                _clean_and_update(status, outdir_angles, finfo_dict, finfo_dict['meta'].name, check_angles=False)
-                                continue
+                                logger.warning(
+                                    '  No results found for {SENSOR} at location {LOC}, year {YEAR:d}, month {MONTH:d}.'.format(
+                                        SENSOR=sensor,
+                                        LOC=location,
+                                        YEAR=year,
+                                        MONTH=m))
 
-                            if load_bands[0] not in finfo_dict:
-                                logger.warning('  The download for {} was incomplete.'.format(brdfp))
-                                _clean_and_update(status, outdir_angles, finfo_dict, finfo_dict['meta'].name, check_angles=False)
                                 continue
 
-                            outdir_angles.mkdir(parents=True, exist_ok=True)
-
-                            ref_file = finfo_dict[load_bands[0]].name
-
-                            logger.info('  Processing angles for {} ...'.format(brdfp))
-
+                            # Download data
                             if sensor.lower() in ['s2', 's2a', 's2b', 's2c']:
 
-                                angle_info = sentinel_pixel_angles(finfo_dict['meta'].name,
-                                                                   ref_file,
-                                                                   str(outdir_angles),
-                                                                   nodata=-32768,
-                                                                   overwrite=False,
-                                                                   verbose=1)
-
-                                if ' '.join(bands) == 'coastal blue green red nir1 nir2 nir3 nir rededge water cirrus swir1 swir2':
-                                    rad_sensor = 's2af' if angle_info.sensor == 's2a' else 's2bf'
-                                elif ' '.join(bands) == 'coastal blue red nir1 nir rededge water cirrus swir1 swir2':
-                                    rad_sensor = 's2acloudless' if angle_info.sensor == 's2a' else 's2bcloudless'
-                                elif ' '.join(bands) == 'blue green red nir1 nir2 nir3 nir rededge swir1 swir2':
-                                    rad_sensor = angle_info.sensor
-                                elif ' '.join(bands) == 'blue green red nir swir1 swir2':
-                                    rad_sensor = 's2al7' if angle_info.sensor == 's2a' else 's2bl7'
-                                elif ' '.join(bands) == 'nir1 nir2 nir3 rededge swir1 swir2':
-                                    rad_sensor = 's2a20' if angle_info.sensor == 's2a' else 's2b20'
-                                elif ' '.join(bands) == 'blue green red nir':
-                                    rad_sensor = 's2a10' if angle_info.sensor == 's2a' else 's2b10'
-                                else:
-                                    rad_sensor = angle_info.sensor
-
-                                bandpass_sensor = angle_info.sensor
-
-                            else:
-
-                                meta = rt.get_landsat_coefficients(finfo_dict['meta'].name)
-
-                                angle_info = landsat_pixel_angles(finfo_dict['angle'].name,
-                                                                  ref_file,
-                                                                  str(outdir_angles),
-                                                                  meta.sensor,
-                                                                  l57_angles_path=l57_angles_path,
-                                                                  l8_angles_path=l8_angles_path,
-                                                                  verbose=1)
-
-                                if (len(bands) == 1) and (bands[0] == 'pan'):
-                                    rad_sensor = sensor + bands[0]
-                                else:
-
-                                    if (len(bands) == 6) and (meta.sensor == 'l8'):
-                                        rad_sensor = 'l8l7'
-                                    elif (len(bands) == 7) and (meta.sensor == 'l8') and ('pan' in bands):
-                                        rad_sensor = 'l8l7mspan'
-                                    elif (len(bands) == 7) and (meta.sensor == 'l7') and ('pan' in bands):
-                                        rad_sensor = 'l7mspan'
-                                    else:
-                                        rad_sensor = meta.sensor
-
-                                bandpass_sensor = sensor
+                                load_bands = ['B{:02d}'.format(band_associations[bd]) if bd != 'rededge'
+                                              else 'B{:01d}A'.format(band_associations[bd]) for bd in bands]
 
-                            if sensor in ['s2', 's2a', 's2b', 's2c']:
-
-                                logger.info('  Translating jp2 files to gtiff for {} ...'.format(brdfp))
-
-                                load_bands_names = []
-
-                                # Convert to GeoTiffs to avoid CRS issue with jp2 format
-                                for bd in load_bands:
-
-                                    # Check if the file exists to avoid duplicate GCP filenames`
-                                    if Path(finfo_dict[bd].name).is_file():
-
-                                        warp(finfo_dict[bd].name,
-                                             finfo_dict[bd].name.replace('.jp2', '.tif'),
-                                             overwrite=True,
-                                             delete_input=True,
-                                             multithread=True,
-                                             warpMemoryLimit=256,
-                                             outputBounds=out_bounds,
-                                             xRes=ref_res[0],
-                                             yRes=ref_res[1],
-                                             resampleAlg=RESAMPLING_DICT[resampling],
-                                             creationOptions=['TILED=YES',
-                                                              'COMPRESS=LZW',
-                                                              'BLOCKXSIZE={CHUNKS:d}'.format(CHUNKS=chunks),
-                                                              'BLOCKYSIZE={CHUNKS:d}'.format(CHUNKS=chunks)])
-
-                                        load_bands_names.append(finfo_dict[bd].name.replace('.jp2', '.tif'))
+                                search_wildcards = ['MTD_TL.xml'] + [bd + '.jp2' for bd in load_bands]
 
                             else:
 
-                                # Get band names from user
-                                load_bands_names = [finfo_dict[bd].name for bd in load_bands]
-
-                            logger.info('  Applying BRDF and SR correction for {} ...'.format(brdfp))
-
-                            with gw.config.update(sensor=rad_sensor,
-                                                  ref_bounds=out_bounds,
-                                                  ref_crs=crs,
-                                                  ref_res=ref_res if ref_res else load_bands_names[-1]):
-
-                                valid_data = True
-
-                                # Ensure there is data
-                                with gw.open(load_bands_names[0],
-                                             band_names=[1],
-                                             chunks=chunks,
-                                             num_threads=num_threads) as data:
-
-                                    if data.sel(band=1).min().data.compute(num_threads=num_threads) > 10000:
-                                        valid_data = False
-
-                                    if valid_data:
-
-                                        if data.sel(band=1).max().data.compute(num_threads=num_threads) == 0:
-                                            valid_data = False
-
-                                if valid_data:
-
-                                    with gw.open(angle_info.sza,
-                                                 chunks=chunks,
-                                                 resampling='cubic') as sza, \
-                                            gw.open(angle_info.vza,
-                                                    chunks=chunks,
-                                                    resampling='cubic') as vza, \
-                                            gw.open(angle_info.saa,
-                                                    chunks=chunks,
-                                                    resampling='cubic') as saa, \
-                                            gw.open(angle_info.vaa,
-                                                    chunks=chunks,
-                                                    resampling='cubic') as vaa, \
-                                            gw.open(load_bands_names,
-                                                    band_names=bands,
-                                                    stack_dim='band',
-                                                    chunks=chunks,
-                                                    resampling=resampling,
-                                                    num_threads=num_threads) as data:
-
-                                        attrs = data.attrs.copy()
-
-                                        if mask_qa:
-
-                                            if sensor.lower() in ['s2', 's2a', 's2b', 's2c']:
-
-                                                if S2CLOUDLESS_INSTALLED:
-
-                                                    cloud_detector = S2PixelCloudDetector(threshold=0.4,
-                                                                                          average_over=1,
-                                                                                          dilation_size=5,
-                                                                                          all_bands=False)
-
-                                                    # Get the S2Cloudless bands
-                                                    data_cloudless = data.sel(band=['coastal', 'blue', 'red', 'nir1', 'nir', 'rededge', 'water', 'cirrus', 'swir1', 'swir2'])
-
-                                                    # Scale from 0-10000 to 0-1 and reshape
-                                                    X = (data_cloudless * 0.0001).clip(0, 1).data\
-                                                            .compute(num_workers=num_threads)\
-                                                            .transpose(1, 2, 0)[np.newaxis, :, :, :]
-
-                                                    # Predict clouds
-                                                    # Potential classes? Currently, only clear and clouds are returned.
-                                                    # clear=0, clouds=1, shadow=2, snow=3, cirrus=4, water=5
-                                                    mask = ndarray_to_xarray(data,
-                                                                             cloud_detector.get_cloud_masks(X),
-                                                                             ['mask'])
-
-                                                else:
-
-                                                    if bands_out:
-
-                                                        # If there are extra bands, remove them because they
-                                                        # are not supported in the BRDF kernels.
-                                                        data = _assign_attrs(data, attrs, bands_out)
-
-                                                    logger.warning('  S2Cloudless is not installed, so skipping Sentinel cloud masking.')
-
-                                        if sensor.lower() in ['s2', 's2a', 's2b', 's2c']:
-
-                                            # The S-2 data are in TOAR (0-10000)
-                                            toar_scaled = (data * 0.0001).clip(0, 1).astype('float64')
-                                            toar_scaled.attrs = attrs
-
-                                            # Convert TOAR to surface reflectance
-                                            sr = rt.toar_to_sr(toar_scaled,
-                                                               sza, saa, vza, vaa,
-                                                               rad_sensor,
-                                                               dst_nodata=nodataval)
+                                del_keys = [k for k, v in self.search_dict.items() if 'gap_mask' in k]
 
-                                        else:
+                                for dk in del_keys:
+                                    del self.search_dict[dk]
 
-                                            # Convert DN to surface reflectance
-                                            sr = rt.dn_to_sr(data,
-                                                             sza, saa, vza, vaa,
-                                                             sensor=rad_sensor,
-                                                             meta=meta,
-                                                             src_nodata=nodataval,
-                                                             dst_nodata=nodataval)
+                                load_bands = sorted(['B{:d}'.format(band_associations[bd]) for bd in bands])
 
-                                        # BRDF normalization
-                                        sr_brdf = br.norm_brdf(sr,
-                                                               sza, saa, vza, vaa,
-                                                               sensor=rad_sensor,
-                                                               wavelengths=data.band.values.tolist(),
-                                                               out_range=10000.0,
-                                                               src_nodata=nodataval,
-                                                               dst_nodata=nodataval)
+                                search_wildcards = ['ANG.txt', 'MTL.txt', 'BQA.TIF'] + [bd + '.TIF' for bd in load_bands]
 
-                                        if bandpass_sensor.lower() in ['l5', 'l7', 's2', 's2a', 's2b', 's2c']:
+                            # Download one scene at a time and hand it to the processing pool as soon as its files finish
+                            for scene_key, scene_keys in _group_scenes(list(self.search_dict.keys())).items():
 
-                                            # Linearly adjust to Landsat 8
-                                            sr_brdf = la.bandpass(sr_brdf,
-                                                                  bandpass_sensor.lower(),
-                                                                  to='l8',
-                                                                  scale_factor=0.0001,
-                                                                  src_nodata=nodataval,
-                                                                  dst_nodata=nodataval)
+                                scene_id = _scene_id(scene_key)
 
-                                        if mask_qa:
+                                if scene_status.done(scene_id, 'process'):
+                                    logger.info('  {} was already processed.'.format(scene_id))
+                                    continue
 
-                                            if sensor.lower() in ['s2', 's2a', 's2b', 's2c']:
-
-                                                if S2CLOUDLESS_INSTALLED:
+                                file_info = self.download_gcp(sensor,
+                                                              downloads=scene_keys,
+                                                              outdir=outdir,
+                                                              outdir_brdf=outdir_brdf,
+                                                              search_wildcards=search_wildcards,
+                                                              check_file=str(status),
+                                                              verbose=1)
 
-                                                    wavel_sub = sr_brdf.gw.set_nodata(nodataval,
-                                                                                      nodataval,
-                                                                                      (0, 1),
-                                                                                      'float64')
+                                if sensor.lower() in ['s2', 's2a', 's2b', 's2c']:
 
-                                                    # Estimate the cloud shadows
-                                                    mask = estimate_cloud_shadows(wavel_sub,
-                                                                                  mask,
-                                                                                  sza,
-                                                                                  saa,
-                                                                                  vza,
-                                                                                  vaa,
-                                                                                  heights=cloud_heights,
-                                                                                  num_workers=num_threads)
+                                    # Reorganize the dictionary to combine bands and metadata
+                                    new_dict_ = dict()
+                                    for finfo_key, finfo_dict in file_info.items():
 
-                                                    # Update the bands with the mask
-                                                    sr_brdf = xr.where((mask.sel(band='mask') == 0) &
-                                                                       (sr_brdf != nodataval),
-                                                                       sr_brdf.clip(0, 10000),
-                                                                       nodataval).astype('uint16')
+                                        sub_dict_ = dict()
 
-                                                sr_brdf = _assign_attrs(sr_brdf, attrs, bands_out)
-                                                sr_brdf.gw.to_raster(str(out_brdf), **kwargs)
+                                        if 'meta' in finfo_dict:
 
-                                            else:
+                                            key = finfo_dict['meta'].name
 
-                                                with gw.open(finfo_dict['qa'].name,
-                                                             band_names=['qa']) as qa:
+                                            sub_dict_['meta'] = finfo_dict['meta']
 
-                                                    if sensor.lower() == 'l8':
-                                                        qa_sensor = 'l8-c1'
-                                                    else:
-                                                        qa_sensor = 'l-c1'
+                                            for finfo_key_, finfo_dict_ in file_info.items():
 
-                                                    mask = QAMasker(qa,
-                                                                    qa_sensor,
-                                                                    mask_items=lqa_mask_items,
-                                                                    confidence_level='maybe').to_mask()
+                                                if 'meta' not in finfo_dict_:
+                                                    for bdkey_, bdinfo_ in finfo_dict_.items():
+                                                        if '_'.join(bdinfo_.name.split('_')[:-1]) in key:
+                                                            sub_dict_[bdkey_] = bdinfo_
 
-                                                    # Mask non-clear pixels
-                                                    sr_brdf = xr.where(mask.sel(band='mask') < 2,
-                                                                       sr_brdf.clip(0, 10000),
-                                                                       nodataval).astype('uint16')
+                                            new_dict_[finfo_key] = sub_dict_
 
-                                                    sr_brdf = _assign_attrs(sr_brdf, attrs, bands_out)
-                                                    sr_brdf.gw.to_raster(str(out_brdf), **kwargs)
+                                    file_info = new_dict_
 
-                                        else:
+                                for finfo_dict in file_info.values():
 
-                                            # Set 'no data' values
-                                            sr_brdf = sr_brdf.gw.set_nodata(nodataval,
-                                                                            nodataval,
-                                                                            (0, 10000),
-                                                                            'uint16')
+                                    scene_status.mark(scene_id, 'download', 'done' if 'meta' in finfo_dict else 'missing')
 
-                                            sr_brdf = _assign_attrs(sr_brdf, attrs, bands_out)
-                                            sr_brdf.gw.to_raster(str(out_brdf), **kwargs)
+                                    # Record the scenes that have finished, and bound the number of downloaded
+                                    # scenes that wait on processing
+                                    _collect_scenes(pending, scene_status, concurrent.futures.FIRST_COMPLETED, timeout=0)
 
-                                        if write_angle_files:
+                                    while len(pending) >= max_pending:
+                                        _collect_scenes(pending, scene_status, concurrent.futures.FIRST_COMPLETED)
 
-                                            angle_stack = xr.concat((sza, saa), dim='band').astype('int16')
-                                            angle_stack.attrs = sza.attrs.copy()
-                                            angle_stack.gw.to_raster(str(out_angles), **angle_kwargs)
+                                    pending[executor.submit(_process_scene, sensor, finfo_dict, load_bands, scene_options)] = scene_id
 
-                                else:
+                            logger.info('  Finished downloading files for yyyymm query, {}.'.format(yearmonth_query))
 
-                                    logger.warning('  Not enough data for {} to store on disk.'.format(str(out_brdf)))
+                year += 1
 
-                                    # Write an empty file for tracking
-                                    with open(str(out_brdf).replace('.tif', '.nodata'), 'w') as tx:
-                                        tx.writelines([])
+        finally:
 
-                            angle_infos[finfo_key] = angle_info
+            # Wait on the submitted scenes, even if downloading stopped early, so that their results are recorded
+            _collect_scenes(pending, scene_status, concurrent.futures.ALL_COMPLETED)
 
-                            _clean_and_update(status,
-                                              outdir_angles,
-                                              finfo_dict,
-                                              finfo_dict['meta'].name,
-                                              load_bands_names=load_bands_names)
-
-            year += 1
+            executor.shutdown()
 
     def list_gcp(self, sensor, query):
 
@@ -1016,24 +1251,15 @@ class GeoDownloads(object):
             raise NameError
 
         if sensor in ['s2', 's2a', 's2b', 's2c']:
-            gcp_str = "gsutil ls -r gs://gcp-public-data-sentinel-2"
+            gcp_str = 'gs://gcp-public-data-sentinel-2'
         else:
-            gcp_str = "gsutil ls -r gs://gcp-public-data-landsat"
-
-        gsutil_str = gcp_str + "/" + gcp_dict[sensor] + "/" + query
+            gcp_str = 'gs://gcp-public-data-landsat'
 
-        try:
+        output = self.transport.list(gcp_str + '/' + gcp_dict[sensor] + '/' + query)
 
-            proc = subprocess.run(gsutil_str.split(' '),
-                                  stdout=subprocess.PIPE,
-                                  stderr=subprocess.PIPE)
+        search_list = [outp for outp in output if '$folder$' not in outp]
 
-        except:
-            logger.exception('gsutil must be installed.')
-
-        output = proc.stdout
-
-        search_list = [outp for outp in output.decode('utf-8').split('\n') if '$folder$' not in outp]
+        search_dict = dict()
 
         if search_list:
 
@@ -1041,9 +1267,14 @@ class GeoDownloads(object):
             if search_list[0]:
 
                 if sensor in ['s2', 's2a', 's2b', 's2c']:
-                    self.search_dict = self._prepare_gcp_dict(search_list, 'gs://gcp-public-data-sentinel-2/')
+                    search_dict = self._prepare_gcp_dict(search_list, 'gs://gcp-public-data-sentinel-2/')
                 else:
-                    self.search_dict = self._prepare_gcp_dict(search_list, 'gs://gcp-public-data-landsat/')
+                    search_dict = self._prepare_gcp_dict(search_list, 'gs://gcp-public-data-landsat/')
+
+                self.search_dict = search_dict
+
+        if self.catalog:
+            self.catalog.ingest(sensor, query, search_dict)
 
     @staticmethod
     def _prepare_gcp_dict(search_list, gcp_str):
@@ -1133,11 +1364,14 @@ class GeoDownloads(object):
             downloads = [downloads]
 
         if sensor in ['s2', 's2a', 's2b', 's2c']:
-            gcp_str = 'gsutil cp -r gs://gcp-public-data-sentinel-2'
+            gcp_str = 'gs://gcp-public-data-sentinel-2'
         else:
-            gcp_str = 'gsutil cp -r gs://gcp-public-data-landsat'
+            gcp_str = 'gs://gcp-public-data-landsat'
 
-        FileInfo = namedtuple('FileInfo', 'name key')
+        manager = DownloadManager(transport=self.transport,
+                                  n_workers=self.n_workers,
+                                  retries=self.retries,
+                                  verbose=verbose)
 
         downloaded = {}
         null_items = []
@@ -1224,10 +1458,9 @@ class GeoDownloads(object):
 
                 download_list_names = [Path(dfn).name for dfn in sub_download_list]
 
-                for fname, fn in zip(download_list_names, sub_download_list):
+                pending = []
 
-                    # Renaming Sentinel data
-                    rename = False
+                for fname, fn in zip(download_list_names, sub_download_list):
 
                     # Full path of GCP local download
                     down_file = str(poutdir.joinpath(fname))
@@ -1243,7 +1476,6 @@ class GeoDownloads(object):
                         fbase = Path(fn).parent.name
                         down_file = str(poutdir.joinpath(fbase + '_MTD_TL.xml'))
                         key = 'meta'
-                        rename = True
 
                     elif down_file.endswith('_BQA.TIF'):
                         fbase = fname.replace('_BQA.TIF', '')
@@ -1255,7 +1487,6 @@ class GeoDownloads(object):
                             fbase = Path(fn).parent.parent.name
                             key = Path(fn).name.split('.')[0].split('_')[-1]
                             down_file = str(poutdir.joinpath(fbase + '_' + key + '.jp2'))
-                            rename = True
 
                         else:
 
@@ -1312,27 +1543,25 @@ class GeoDownloads(object):
 
                     if continue_download:
 
-                        ###################
-                        # Download the file
-                        ###################
-
-                        if not Path(down_file).is_file():
+                        if fn.lower().startswith('gs://gcp-public-data'):
+                            src = fn
+                        else:
+                            src = '{}/{}'.format(gcp_str, fn)
 
-                            if fn.lower().startswith('gs://gcp-public-data'):
-                                com = 'gsutil cp -r {} {}'.format(fn, outdir)
-                            else:
-                                com = 'gsutil cp -r {}/{} {}'.format(gcp_str, fn, outdir)
+                        # Renamed files are downloaded straight to the new name
+                        pending.append((key, DownloadTask(src=src, dst=down_file)))
 
-                            if verbose > 0:
-                                logger.info('  Downloading {} ...'.format(fname))
+                ######################################
+                # Download the scene files in parallel
+                ######################################
 
-                            subprocess.call(com, shell=True)
+                status = manager.download([task for key, task in pending])
 
-                            if rename:
-                                os.rename(str(Path(outdir).joinpath(Path(fn).name)), down_file)
+                for key, task in pending:
 
-                        # Store file information
-                        downloaded_sub[key] = FileInfo(name=down_file, key=key)
+                    # Store file information
+                    if status[task.dst] != 'failed':
+                        downloaded_sub[key] = FileInfo(name=task.dst, key=key)
 
                 if downloaded_sub:
 
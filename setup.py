@@ -150,6 +150,7 @@ def setup_package():
                     keywords=' '.join(keywords),
                     url=git_url,
                     download_url=download_url,
+                    python_requires='>=3.7',
                     install_requires=required_packages,
                     extras_require=get_extra_requires(extras),
                     include_dirs=include_dirs,
@@ -157,7 +158,6 @@ def setup_package():
                                  'License :: MIT',
                                  'Topic :: Scientific :: Remote Sensing',
                                  'Programming Language :: Cython',
-                                 'Programming Language :: Python :: 3.6',
                                  'Programming Language :: Python :: 3.7',
                                  'Programming Language :: Python :: 3.8'])
 
@@ -0,0 +1,99 @@
+"""
+Synthetic data for the tests
+
+Tests write small GeoTiffs to a temporary directory, so the suite does not depend on downloaded imagery.
+"""
+
+import tempfile
+import shutil
+from pathlib import Path
+
+import numpy as np
+import rasterio as rio
+from rasterio.crs import CRS
+from affine import Affine
+
+
+CRS_UTM = CRS.from_epsg(32618)
+CELL_SIZE = 30.0
+LEFT = 300000.0
+TOP = 4500000.0
+
+
+class TempDirMixin(object):
+
+    """
+    Creates a temporary directory for each test
+    """
+
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp(prefix='gw_test_'))
+
+    def tearDown(self):
+        shutil.rmtree(str(self.tmp), ignore_errors=True)
+
+    def file(self, name):
+        return str(self.tmp.joinpath(name))
+
+
+def index_values(nbands=1, nrows=64, ncols=64, dtype='uint16'):
+
+    """
+    Creates values equal to the flat pixel index (+1), so offsets can be checked from the values
+
+    Returns:
+        ``numpy.ndarray``, shaped (band, rows, columns)
+    """
+
+    values = np.arange(1, nrows * ncols + 1).reshape(1, nrows, ncols)
+
+    return np.concatenate([values + b * nrows * ncols for b in range(0, nbands)], axis=0).astype(dtype)
+
+
+def write_raster(filename,
+                 values,
+                 left=LEFT,
+                 top=TOP,
+                 cell_size=CELL_SIZE,
+                 nodata=None,
+                 block_size=16):
+
+    """
+    Writes a tiled GeoTiff
+
+    Args:
+        filename (str): The output file.
+        values (ndarray): The values, shaped (band, rows, columns).
+        left (Optional[float]): The left coordinate.
+        top (Optional[float]): The top coordinate.
+        cell_size (Optional[float]): The cell size.
+        nodata (Optional[int or float]): The 'no data' value.
+        block_size (Optional[int]): The tile size.
+
+    Returns:
+        ``str``
+    """
+
+    with rio.open(filename,
+                  mode='w',
+                  driver='GTiff',
+                  width=values.shape[2],
+                  height=values.shape[1],
+                  count=values.shape[0],
+                  dtype=values.dtype.name,
+                  nodata=nodata,
+                  crs=CRS_UTM,
+                  transform=Affine(cell_size, 0.0, left, 0.0, -cell_size, top),
+                  tiled=True,
+                  blockxsize=block_size,
+                  blockysize=block_size) as dst:
+
+        dst.write(values)
+
+    return filename
+
+
+def read_raster(filename):
+
+    with rio.open(filename) as src:
+        return src.read()
@@ -0,0 +1,140 @@
+import unittest
+
+import geowombat as gw
+from geowombat.radiometry.angles import _parse_sentinel_angle_grids, sentinel_pixel_angles_lazy
+
+import numpy as np
+
+from .common import TempDirMixin, LEFT, TOP, index_values, write_raster
+
+
+GRID_STEP = 5000.0
+CELL_SIZE = 250.0
+
+METADATA = """<?xml version="1.0" encoding="UTF-8"?>
+<n1:Level-1C_Tile_ID xmlns:n1="https://psd-14.sentinel2.eo.esa.int/PSD/S2_PDI_Level-1C_Tile_Metadata.xsd">
+  <n1:General_Info>
+    <TILE_ID>S2A_OPER_MSI_L1C_TL_SGS__20160519T222029_A004735_T18TWL_N02.02</TILE_ID>
+  </n1:General_Info>
+  <n1:Geometric_Info>
+    <Tile_Geocoding>
+      <HORIZONTAL_CS_CODE>EPSG:32618</HORIZONTAL_CS_CODE>
+      <Geoposition resolution="10">
+        <ULX>{left}</ULX>
+        <ULY>{top}</ULY>
+      </Geoposition>
+    </Tile_Geocoding>
+    <Tile_Angles>
+      <Sun_Angles_Grid>
+        <Zenith>{sza}</Zenith>
+        <Azimuth>{saa}</Azimuth>
+      </Sun_Angles_Grid>
+      <Viewing_Incidence_Angles_Grids bandId="0" detectorId="1">
+        <Zenith>{vza1}</Zenith>
+        <Azimuth>{vaa1}</Azimuth>
+      </Viewing_Incidence_Angles_Grids>
+      <Viewing_Incidence_Angles_Grids bandId="0" detectorId="2">
+        <Zenith>{vza2}</Zenith>
+        <Azimuth>{vaa2}</Azimuth>
+      </Viewing_Incidence_Angles_Grids>
+    </Tile_Angles>
+  </n1:Geometric_Info>
+</n1:Level-1C_Tile_ID>
+"""
+
+
+def _grid_xml(grid):
+
+    rows = ''.join('<VALUES>{}</VALUES>'.format(' '.join('NaN' if np.isnan(v) else '{:.4f}'.format(v) for v in row))
+                   for row in grid)
+
+    return ('<COL_STEP unit="m">{step:.0f}</COL_STEP>'
+            '<ROW_STEP unit="m">{step:.0f}</ROW_STEP>'
+            '<Values_List>{rows}</Values_List>').format(step=GRID_STEP, rows=rows)
+
+
+class TestSentinelAngles(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestSentinelAngles, self).setUp()
+
+        rows, cols = np.mgrid[0:3, 0:3].astype('float64')
+
+        # The solar zenith is linear in the grid nodes, so bilinear interpolation is exact
+        self.sza = 30.0 + 2.0 * cols + rows
+
+        # Each detector covers part of the grid
+        vza1 = np.where(cols < 2, 5.0, np.nan)
+        vza2 = np.where(cols > 0, 7.0, np.nan)
+
+        vaa1 = np.where(cols < 2, 350.0, np.nan)
+        vaa2 = np.where(cols > 0, 10.0, np.nan)
+
+        self.metadata = self.file('MTD_TL.xml')
+
+        with open(self.metadata, mode='w') as f:
+
+            f.write(METADATA.format(left=LEFT,
+                                    top=TOP,
+                                    sza=_grid_xml(self.sza),
+                                    saa=_grid_xml(np.full((3, 3), 150.0)),
+                                    vza1=_grid_xml(vza1),
+                                    vza2=_grid_xml(vza2),
+                                    vaa1=_grid_xml(vaa1),
+                                    vaa2=_grid_xml(vaa2)))
+
+        self.filename = write_raster(self.file('image.tif'),
+                                     index_values(nbands=1, nrows=32, ncols=32),
+                                     cell_size=CELL_SIZE)
+
+    def test_parse_grids(self):
+
+        grids = _parse_sentinel_angle_grids(self.metadata)
+
+        self.assertEqual((grids['ulx'], grids['uly']), (LEFT, TOP))
+        self.assertEqual((grids['col_step'], grids['row_step']), (GRID_STEP, GRID_STEP))
+        self.assertEqual(grids['crs'], 'EPSG:32618')
+
+        self.assertTrue(np.allclose(grids['sza'], self.sza))
+
+        # View angles are averaged over detectors where they overlap
+        self.assertTrue(np.allclose(grids['vza'][:, 0], 5.0))
+        self.assertTrue(np.allclose(grids['vza'][:, 1], 6.0))
+        self.assertTrue(np.allclose(grids['vza'][:, 2], 7.0))
+
+        # Azimuths are averaged on the circle, so 350 and 10 degrees average to 0, not 180
+        vaa = grids['vaa'][:, 1]
+        self.assertTrue(np.allclose(np.minimum(vaa, 360.0 - vaa), 0.0, atol=1e-6))
+
+    def test_lazy_angles(self):
+
+        with gw.open(self.filename, chunks=16) as src:
+
+            angles = sentinel_pixel_angles_lazy(self.metadata, src)
+
+            self.assertEqual(angles.sensor, 's2a')
+
+            for angle_name in ['vza', 'vaa', 'sza', 'saa']:
+
+                angle_data = getattr(angles, angle_name)
+
+                self.assertEqual(angle_data.shape, (1,) + src.shape[-2:])
+                self.assertEqual(angle_data.data.chunks[-2:], src.data.chunks[-2:])
+                self.assertEqual(angle_data.dtype, 'int16')
+
+            sza = angles.sza.data.compute()[0]
+            saa = angles.saa.data.compute()[0]
+
+        rows, cols = np.mgrid[0:32, 0:32]
+
+        # Pixel centers in grid node units
+        gx = (cols + 0.5) * CELL_SIZE / GRID_STEP
+        gy = (rows + 0.5) * CELL_SIZE / GRID_STEP
+
+        self.assertTrue(np.abs(sza - np.round((30.0 + 2.0 * gx + gy) / 0.01)).max() <= 1)
+        self.assertTrue(np.all(saa == 15000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+
+import geowombat as gw
+from geowombat.core.api import read_blocks, _block_aligned_windows
+from geowombat.core.util import Chunks
+
+import numpy as np
+from rasterio.windows import Window
+
+from .common import TempDirMixin, index_values, write_raster
+
+
+class TestReadBlocks(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestReadBlocks, self).setUp()
+
+        self.values = index_values(nbands=2, nrows=70, ncols=90)
+        self.filename = write_raster(self.file('image.tif'), self.values, block_size=16)
+
+    def test_block_aligned_windows(self):
+
+        window = Window(col_off=10, row_off=5, width=40, height=30)
+
+        windows = _block_aligned_windows(window, 16, 16)
+
+        # Sub-windows cover the window exactly once
+        coverage = np.zeros((70, 90), dtype='uint8')
+
+        for w in windows:
+
+            coverage[w.row_off:w.row_off+w.height, w.col_off:w.col_off+w.width] += 1
+
+            # Sub-windows never cross a file block boundary
+            self.assertEqual(w.row_off // 16, (w.row_off + w.height - 1) // 16)
+            self.assertEqual(w.col_off // 16, (w.col_off + w.width - 1) // 16)
+
+        self.assertEqual(int(coverage[5:35, 10:50].min()), 1)
+        self.assertEqual(int(coverage.sum()), 30 * 40)
+
+    def test_concurrent_read(self):
+
+        window = Window(col_off=10, row_off=5, width=61, height=47)
+
+        data = read_blocks(self.filename, num_workers=4, window=window)
+
+        self.assertTrue(np.array_equal(data, self.values[:, 5:52, 10:71]))
+
+    def test_concurrent_read_indexes(self):
+
+        data = read_blocks(self.filename, num_workers=3, indexes=[2], out_dtype='float64')
+
+        self.assertEqual(data.dtype, np.float64)
+        self.assertTrue(np.array_equal(data, self.values[1:].astype('float64')))
+
+
+class TestAutoChunks(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestAutoChunks, self).setUp()
+
+        self.filename = write_raster(self.file('image.tif'), index_values(nbands=1, nrows=512, ncols=512), block_size=16)
+
+    def test_auto_chunks(self):
+
+        # 0.01 MB fits 20 uint16 blocks of 16 x 16 pixels
+        self.assertEqual(Chunks().auto_chunks(self.filename, chunk_mem=0.01), (1, 64, 80))
+
+        # Stacked layers share the budget
+        self.assertEqual(Chunks().auto_chunks(self.filename, n_layers=5, chunk_mem=0.01), (1, 32, 32))
+
+        # Chunks are capped by the image size
+        self.assertEqual(Chunks().auto_chunks(self.filename, chunk_mem=64), (1, 512, 512))
+
+    def test_open_auto(self):
+
+        with gw.config.update(chunk_mem=0.01):
+
+            with gw.open(self.filename, chunks='auto') as src:
+
+                self.assertEqual(tuple(src.attrs['auto_chunks']), (1, 64, 80))
+                self.assertEqual(src.data.chunksize, (1, 64, 80))
+
+
+if __name__ == '__main__':
+    unittest.main()
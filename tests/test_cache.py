@@ -0,0 +1,179 @@
+import os
+import sys
+import unittest
+import subprocess
+from pathlib import Path
+from unittest import mock
+
+import geowombat as gw
+from geowombat.backends.cache_ import WarpCache, cached_warp, _release_leases
+from geowombat.backends.rasterio_ import warp
+
+import numpy as np
+import rasterio as rio
+from rasterio.crs import CRS
+from rasterio.enums import Resampling
+from rasterio.vrt import WarpedVRT
+from affine import Affine
+
+from .common import TempDirMixin, CELL_SIZE, LEFT, TOP, index_values, write_raster
+
+
+class TestWarpCache(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestWarpCache, self).setUp()
+
+        self.filename = write_raster(self.file('image.tif'), index_values(nbands=2, nrows=64, ncols=64), nodata=0)
+        self.cache_dir = self.file('cache')
+
+        # Warp to a coarser grid
+        self.vrt_options = dict(crs=CRS.from_epsg(32618),
+                                transform=Affine(CELL_SIZE * 2, 0.0, LEFT, 0.0, -CELL_SIZE * 2, TOP),
+                                width=32,
+                                height=32,
+                                resampling=Resampling.nearest,
+                                nodata=0)
+
+    def _warp(self):
+
+        with rio.open(self.filename) as src:
+            return cached_warp(self.filename, src, self.vrt_options, self.cache_dir, 100)
+
+    def test_cached_warp(self):
+
+        entry = self._warp()
+
+        with rio.open(self.filename) as src:
+
+            with WarpedVRT(src, **self.vrt_options) as vrt:
+                expected = vrt.read()
+
+        with rio.open(entry) as cached:
+
+            self.assertEqual(cached.shape, (32, 32))
+            self.assertEqual(cached.transform, self.vrt_options['transform'])
+            self.assertTrue(np.array_equal(cached.read(), expected))
+
+        # The second warp reads from the cache
+        with mock.patch.object(WarpCache, 'put', side_effect=AssertionError('The warp was not cached.')):
+            self.assertEqual(self._warp(), entry)
+
+    def test_key(self):
+
+        key = WarpCache.key(self.filename, self.vrt_options)
+
+        self.assertEqual(WarpCache.key(self.filename, self.vrt_options), key)
+
+        # A different grid is a new entry
+        vrt_options = self.vrt_options.copy()
+        vrt_options['resampling'] = Resampling.bilinear
+
+        self.assertNotEqual(WarpCache.key(self.filename, vrt_options), key)
+
+        # A changed source file is a new entry
+        stat = os.stat(self.filename)
+        os.utime(self.filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        self.assertNotEqual(WarpCache.key(self.filename, self.vrt_options), key)
+
+    def test_evict(self):
+
+        cache = WarpCache(self.cache_dir, max_size=100)
+
+        with rio.open(self.filename) as src:
+
+            entry1 = cache.put('a', src, self.vrt_options)
+            os.utime(entry1, ns=(0, 0))
+            entry2 = cache.put('b', src, self.vrt_options)
+
+        # The entries are no longer used by this process
+        _release_leases()
+
+        # Keep one entry
+        cache.max_size = os.path.getsize(entry2) / 1024.0 / 1024.0
+
+        cache.evict()
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), entry2)
+
+        cache.clear()
+
+        self.assertIsNone(cache.get('b'))
+
+    def test_evict_leased(self):
+
+        cache = WarpCache(self.cache_dir, max_size=100)
+
+        with rio.open(self.filename) as src:
+
+            entry1 = cache.put('a', src, self.vrt_options)
+            os.utime(entry1, ns=(0, 0))
+            entry2 = cache.put('b', src, self.vrt_options)
+
+        cache.max_size = os.path.getsize(entry2) / 1024.0 / 1024.0
+
+        # Both entries are leased by this process
+        cache.evict()
+
+        self.assertTrue(os.path.isfile(entry1))
+        self.assertTrue(os.path.isfile(entry2))
+
+        # A lease of a stopped process does not protect an entry
+        _release_leases()
+
+        proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+        proc.wait()
+
+        stale_lease = Path('{}.{:d}.lease'.format(entry1, proc.pid))
+        stale_lease.touch()
+
+        cache.evict()
+
+        self.assertFalse(os.path.isfile(entry1))
+        self.assertFalse(stale_lease.is_file())
+        self.assertTrue(os.path.isfile(entry2))
+
+    def test_oversize(self):
+
+        cache = WarpCache(self.cache_dir, max_size=100)
+
+        with rio.open(self.filename) as src:
+            entry = cache.put('a', src, self.vrt_options)
+
+        entry_size = os.path.getsize(entry)
+
+        cache.clear()
+
+        # The cache is smaller than one entry
+        max_size = entry_size / 2.0 / 1024.0 / 1024.0
+
+        with rio.open(self.filename) as src:
+            self.assertIsNone(cached_warp(self.filename, src, self.vrt_options, self.cache_dir, max_size))
+
+        self.assertEqual(list(Path(self.cache_dir).glob('*.tif')), [])
+
+        # The size is recorded, so the image is not warped again
+        with mock.patch.object(WarpCache, 'put', side_effect=AssertionError('The warp was repeated.')):
+
+            with rio.open(self.filename) as src:
+                self.assertIsNone(cached_warp(self.filename, src, self.vrt_options, self.cache_dir, max_size))
+
+        # A larger cache keeps the entry
+        with rio.open(self.filename) as src:
+            self.assertIsNotNone(cached_warp(self.filename, src, self.vrt_options, self.cache_dir, 100))
+
+    def test_warp_oversize(self):
+
+        with gw.config.update(warp_cache=self.cache_dir, warp_cache_mb=1e-6):
+            output = warp(self.filename, res=(CELL_SIZE * 2, CELL_SIZE * 2), nodata=0)
+
+        # Images that are larger than the cache are warped on the fly
+        self.assertIsInstance(output, WarpedVRT)
+        self.assertEqual((output.width, output.height), (32, 32))
+
+
+if __name__ == '__main__':
+    unittest.main()
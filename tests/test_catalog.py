@@ -0,0 +1,112 @@
+import time
+import unittest
+
+from geowombat.util.catalog import GCPCatalog, parse_gcp_url
+
+from .common import TempDirMixin
+
+
+L8_SCENE = 'LC08_L1TP_042034_20161104_20170219_01_T1'
+L8_URL = 'gs://gcp-public-data-landsat/LC08/01/042/034/{scene}/{scene}_{band}'
+
+S2_SCENE = 'S2A_MSIL1C_20160519T222025_N0202_R029_T21HUD_20160519T222029.SAFE'
+S2_URL = 'gs://gcp-public-data-sentinel-2/tiles/21/H/UD/{scene}/GRANULE/L1C_T21HUD_A004735_20160519T222029/IMG_DATA/T21HUD_20160519T222025_{band}'
+
+
+def l8_urls(scene, bands=('B4.TIF', 'B5.TIF', 'MTL.txt')):
+    return [L8_URL.format(scene=scene, band=band) for band in bands]
+
+
+class TestParseUrl(unittest.TestCase):
+
+    def test_landsat(self):
+        self.assertEqual(parse_gcp_url(L8_URL.format(scene=L8_SCENE, band='B4.TIF')), ('042/034', '20161104', 'B4'))
+
+    def test_sentinel2(self):
+        self.assertEqual(parse_gcp_url(S2_URL.format(scene=S2_SCENE, band='B04.jp2')), ('21/H/UD', '20160519', 'B04'))
+
+    def test_metadata(self):
+
+        url = 'gs://gcp-public-data-sentinel-2/tiles/21/H/UD/{}/GRANULE/L1C_T21HUD_A004735_20160519T222029/MTD_TL.xml'.format(S2_SCENE)
+
+        self.assertEqual(parse_gcp_url(url), ('21/H/UD', '20160519', 'MTD_TL'))
+
+    def test_unparsed(self):
+        self.assertEqual(parse_gcp_url('gs://bucket/file.TIF'), (None, None, 'file'))
+
+
+class TestGCPCatalog(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestGCPCatalog, self).setUp()
+
+        self.scenes = [L8_SCENE,
+                       'LC08_L1TP_042034_20161222_20170219_01_T1',
+                       'LC08_L1TP_043034_20161111_20170219_01_T1']
+
+        self.catalog = GCPCatalog(self.file('db/catalog.sqlite'))
+        self.catalog.ingest('l8', 'LC08/01/042/034/LC08*2016*', {scene: l8_urls(scene) for scene in self.scenes})
+
+    def tearDown(self):
+
+        self.catalog.close()
+
+        super(TestGCPCatalog, self).tearDown()
+
+    def test_search(self):
+
+        search_dict = self.catalog.search('l8')
+
+        self.assertEqual(list(search_dict), sorted(self.scenes))
+        self.assertEqual(search_dict[L8_SCENE], sorted(l8_urls(L8_SCENE)))
+
+    def test_search_filters(self):
+
+        search_dict = self.catalog.search('l8', location='042/034', start='201612', end='20161231', bands=['MTL', 'B4'])
+
+        self.assertEqual(list(search_dict), [self.scenes[1]])
+        self.assertEqual(search_dict[self.scenes[1]], sorted(l8_urls(self.scenes[1], bands=('B4.TIF', 'MTL.txt'))))
+
+        self.assertFalse(self.catalog.search('s2'))
+
+    def test_listed(self):
+
+        self.assertTrue(self.catalog.is_listed('l8', 'LC08/01/042/034/LC08*2016*'))
+        self.assertFalse(self.catalog.is_listed('l8', 'LC08/01/042/034/LC08*2017*'))
+
+        # Empty listings are recorded
+        self.catalog.ingest('l8', 'LC08/01/042/034/LC08*2017*', {})
+
+        self.assertTrue(self.catalog.is_listed('l8', 'LC08/01/042/034/LC08*2017*'))
+
+    def test_persistent(self):
+
+        self.catalog.close()
+
+        self.catalog = GCPCatalog(self.file('db/catalog.sqlite'))
+
+        self.assertTrue(self.catalog.is_listed('l8', 'LC08/01/042/034/LC08*2016*'))
+        self.assertEqual(len(self.catalog.search('l8')), 3)
+
+    def test_max_age(self):
+
+        self.catalog.max_age = 1
+
+        self.assertTrue(self.catalog.is_listed('l8', 'LC08/01/042/034/LC08*2016*'))
+
+        with self.catalog._conn:
+            self.catalog._conn.execute('UPDATE listings SET listed_at = ?', (time.time() - 2 * 86400.0,))
+
+        self.assertFalse(self.catalog.is_listed('l8', 'LC08/01/042/034/LC08*2016*'))
+
+    def test_reingest(self):
+
+        # Listing a query again replaces rows instead of duplicating them
+        self.catalog.ingest('l8', 'LC08/01/042/034/LC08*2016*', {L8_SCENE: l8_urls(L8_SCENE)})
+
+        self.assertEqual(len(self.catalog.search('l8')[L8_SCENE]), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+
+import geowombat as gw
+
+import numpy as np
+
+from .common import TempDirMixin, read_raster, write_raster
+
+
+class TestComposite(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestComposite, self).setUp()
+
+        rng = np.random.RandomState(0)
+
+        # 4 dates x 2 bands, with 'no data' (0) scattered across dates
+        self.values = rng.randint(1, 1000, size=(4, 2, 40, 48)).astype('uint16')
+        self.values[rng.random_sample(self.values.shape) < 0.2] = 0
+
+        # A pixel with no valid observations
+        self.values[:, :, 0, 0] = 0
+
+        self.files = [write_raster(self.file('image{:d}.tif'.format(i)), self.values[i], nodata=0)
+                      for i in range(0, self.values.shape[0])]
+
+    def _expected_median(self):
+
+        values = np.where(self.values == 0, np.nan, self.values.astype('float64'))
+
+        with np.errstate(all='ignore'):
+            expected = np.nanmedian(values, axis=0)
+
+        return np.where(np.isnan(expected), 0, expected)
+
+    def test_median_file_list(self):
+
+        out_file = self.file('median.tif')
+
+        gw.composite(self.files, out_file, method='median', nodata=0, chunks=16)
+
+        data = read_raster(out_file)
+
+        self.assertEqual(data.dtype, np.float32)
+        self.assertEqual(data[0, 0, 0], 0)
+        self.assertTrue(np.allclose(data, self._expected_median()))
+
+    def test_median_file_list_dtype(self):
+
+        out_file = self.file('median.tif')
+
+        gw.composite(self.files, out_file, method='median', nodata=0, chunks=16, dtype='uint16')
+
+        data = read_raster(out_file)
+
+        self.assertEqual(data.dtype, np.uint16)
+
+    def test_mask_file_list(self):
+
+        # Mask the first date everywhere
+        masks = [write_raster(self.file('mask{:d}.tif'.format(i)),
+                              np.full((1, 40, 48), 1 if i == 0 else 0, dtype='uint8'))
+                 for i in range(0, self.values.shape[0])]
+
+        out_file = self.file('median.tif')
+
+        gw.composite(self.files, out_file, method='median', mask=masks, nodata=0, chunks=16)
+
+        values = np.where(self.values[1:] == 0, np.nan, self.values[1:].astype('float64'))
+
+        with np.errstate(all='ignore'):
+            expected = np.nanmedian(values, axis=0)
+
+        self.assertTrue(np.allclose(read_raster(out_file), np.where(np.isnan(expected), 0, expected)))
+
+    def test_lazy_stack(self):
+
+        with gw.open(self.files, stack_dim='time', chunks=16) as src:
+
+            result = gw.composite(src, method='median', nodata=0)
+
+            self.assertEqual(result.shape, (2, 40, 48))
+            self.assertTrue(np.allclose(result.data.compute(), self._expected_median()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+import geowombat as gw
+
+
+class TestThreadBudget(unittest.TestCase):
+
+    def test_thread_budget(self):
+
+        self.assertEqual(gw.config.thread_budget(max_threads=6), 6)
+
+        with gw.config.update(max_threads=3):
+            self.assertEqual(gw.config.thread_budget(), 3)
+
+    def test_allocate_threads(self):
+
+        for n_workers, n_threads, max_threads in [(1, 1, 16), (2, 2, 16), (4, 1, 12), (3, 2, 7), (8, 4, 16)]:
+
+            alloc = gw.config.allocate_threads(n_workers=n_workers, n_threads=n_threads, max_threads=max_threads)
+
+            n_outer = alloc['n_workers'] * alloc['n_threads']
+
+            self.assertTrue(n_outer <= max_threads)
+
+            # GDAL and BLAS share the inner threads
+            if max_threads // n_outer >= 2:
+                self.assertTrue(n_outer * (alloc['gdal_threads'] + alloc['blas_threads']) <= max_threads)
+
+    def test_allocate_inner_threads(self):
+
+        self.assertEqual(gw.config.allocate_threads(n_workers=2, n_threads=2, max_threads=16),
+                         dict(n_workers=2, n_threads=2, gdal_threads=2, blas_threads=2))
+
+        self.assertEqual(gw.config.allocate_threads(n_workers=8, n_threads=4, max_threads=16),
+                         dict(n_workers=8, n_threads=2, gdal_threads=1, blas_threads=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
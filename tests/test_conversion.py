@@ -0,0 +1,102 @@
+import unittest
+
+import geowombat as gw
+
+import numpy as np
+
+from .common import TempDirMixin, write_raster
+
+
+class TestArrayToPolygon(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestArrayToPolygon, self).setUp()
+
+        values = np.zeros((1, 8, 8), dtype='uint8')
+
+        # Two pixels that only touch diagonally, across both block seams
+        values[0, 3, 3] = 1
+        values[0, 4, 4] = 1
+
+        # A rectangle split by the column seam
+        values[0, 6, 2:6] = 2
+
+        self.filename = write_raster(self.file('image.tif'), values)
+
+    def _polygonize(self, connectivity):
+
+        with gw.open(self.filename, chunks=4) as src:
+
+            return gw.array_to_polygon(src,
+                                       mask='source',
+                                       connectivity=connectivity,
+                                       row_chunks=4,
+                                       col_chunks=4)
+
+    def test_seams_4_connectivity(self):
+
+        df = self._polygonize(4)
+
+        self.assertEqual(int((df.value == 1).sum()), 2)
+        self.assertEqual(int((df.value == 2).sum()), 1)
+
+    def test_seams_8_connectivity(self):
+
+        df = self._polygonize(8)
+
+        self.assertEqual(int((df.value == 1).sum()), 1)
+        self.assertEqual(int((df.value == 2).sum()), 1)
+
+        # Dissolving keeps the pixel areas
+        self.assertAlmostEqual(df.loc[df.value == 1].area.sum(), 2 * 30.0 * 30.0)
+        self.assertAlmostEqual(df.loc[df.value == 2].area.sum(), 4 * 30.0 * 30.0)
+
+
+def _features(df):
+    return sorted((float(value), round(geom.area), tuple(np.round(geom.bounds, 6))) for value, geom in zip(df.value, df.geometry))
+
+
+class TestManyBlocks(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestManyBlocks, self).setUp()
+
+        # Three classes of small patches, which touch many seams
+        values = np.random.RandomState(0).randint(1, 4, size=(1, 96, 80)).astype('uint8')
+
+        self.filename = write_raster(self.file('image.tif'), values)
+
+    def _polygonize(self, connectivity, chunks, num_workers=1):
+
+        with gw.open(self.filename, chunks=chunks) as src:
+
+            return gw.array_to_polygon(src,
+                                       connectivity=connectivity,
+                                       num_workers=num_workers,
+                                       row_chunks=chunks,
+                                       col_chunks=chunks)
+
+    def _check(self, connectivity, num_workers=1):
+
+        # A single block has no seams
+        reference = _features(self._polygonize(connectivity, 96))
+        features = _features(self._polygonize(connectivity, 8, num_workers=num_workers))
+
+        self.assertEqual(features, reference)
+
+    def test_4_connectivity(self):
+        self._check(4)
+
+    def test_8_connectivity(self):
+        self._check(8)
+
+    def test_processes(self):
+
+        # Blocks finish out of order
+        self._check(8, num_workers=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
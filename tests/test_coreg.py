@@ -0,0 +1,115 @@
+import unittest
+
+import geowombat as gw
+from geowombat.core.coreg import phase_correlation, estimate_shift_field
+
+import numpy as np
+from scipy.ndimage import gaussian_filter
+
+from .common import TempDirMixin, LEFT, CELL_SIZE, write_raster
+
+
+# The target is shifted so that target[y + ROW_SHIFT, x + COL_SHIFT] = reference[y, x]
+ROW_SHIFT = 2
+COL_SHIFT = -3
+
+
+def _texture(size, pad=5, seed=0):
+
+    """
+    Creates a smooth random texture with ``pad`` extra pixels on each side
+    """
+
+    values = gaussian_filter(np.random.RandomState(seed).rand(size + 2*pad, size + 2*pad), 2)
+
+    return ((values - values.min()) / (values.max() - values.min()) * 10000).astype('uint16')
+
+
+def _shifted_pair(size=128, pad=5):
+
+    texture = _texture(size, pad=pad)
+
+    reference = texture[pad:pad+size, pad:pad+size]
+    target = texture[pad-ROW_SHIFT:pad-ROW_SHIFT+size, pad-COL_SHIFT:pad-COL_SHIFT+size]
+
+    return reference, target
+
+
+class TestPhaseCorrelation(unittest.TestCase):
+
+    def test_shift(self):
+
+        reference, target = _shifted_pair()
+
+        row_shift, col_shift, quality = phase_correlation(reference.astype('float64'), target.astype('float64'))
+
+        self.assertAlmostEqual(row_shift, ROW_SHIFT, delta=0.1)
+        self.assertAlmostEqual(col_shift, COL_SHIFT, delta=0.1)
+        self.assertGreater(quality, 0.5)
+
+    def test_no_shift(self):
+
+        reference = _texture(64, pad=0).astype('float64')
+
+        row_shift, col_shift, quality = phase_correlation(reference, reference)
+
+        self.assertAlmostEqual(row_shift, 0, delta=0.01)
+        self.assertAlmostEqual(col_shift, 0, delta=0.01)
+
+
+class TestTiledCoregister(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestTiledCoregister, self).setUp()
+
+        self.reference, self.target = _shifted_pair()
+
+        self.ref_file = write_raster(self.file('reference.tif'), self.reference[np.newaxis])
+        self.tar_file = write_raster(self.file('target.tif'), self.target[np.newaxis])
+
+    def test_shift_field(self):
+
+        with gw.open(self.tar_file, chunks=32) as tar, gw.open(self.ref_file, chunks=32) as ref:
+
+            field_rows, field_cols, row_shifts, col_shifts = estimate_shift_field(tar.isel(band=0),
+                                                                                  ref.isel(band=0),
+                                                                                  wsize=64,
+                                                                                  spacing=32,
+                                                                                  n_workers=2)
+
+        self.assertEqual(field_rows.tolist(), [32, 64, 96])
+        self.assertEqual(field_cols.tolist(), [32, 64, 96])
+        self.assertTrue(np.allclose(row_shifts, ROW_SHIFT, atol=0.1))
+        self.assertTrue(np.allclose(col_shifts, COL_SHIFT, atol=0.1))
+
+    def test_coregister(self):
+
+        with gw.open(self.tar_file, chunks=32) as tar, gw.open(self.ref_file, chunks=32) as ref:
+
+            results = gw.coregister(tar, ref, tiled=True, wsize=64, spacing=32, n_workers=2)
+
+            self.assertEqual(results.data.chunks, tar.data.chunks)
+            self.assertAlmostEqual(results.attrs['coreg_shift_rows'], ROW_SHIFT, delta=0.1)
+            self.assertAlmostEqual(results.attrs['coreg_shift_cols'], COL_SHIFT, delta=0.1)
+
+            values = results.data.compute()[0].astype('float64')
+
+        # Away from the edges, the co-registered target matches the reference
+        error = np.abs(values - self.reference)[8:-8, 8:-8]
+
+        self.assertLess(error.max(), 100)
+        self.assertGreater(np.abs(self.target.astype('float64') - self.reference)[8:-8, 8:-8].max(), 1000)
+
+    def test_grid_mismatch(self):
+
+        self.tar_file = write_raster(self.file('target_offset.tif'), self.target[np.newaxis], left=LEFT + CELL_SIZE)
+
+        with gw.open(self.tar_file, chunks=32) as tar, gw.open(self.ref_file, chunks=32) as ref:
+
+            with self.assertRaises(ValueError):
+                gw.coregister(tar, ref, tiled=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
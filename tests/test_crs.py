@@ -0,0 +1,61 @@
+import unittest
+
+from geowombat.backends.rasterio_ import crs_equal, crs_key, get_transformer, transform_coords
+
+import numpy as np
+from rasterio.crs import CRS
+import pyproj
+
+
+class TestCRS(unittest.TestCase):
+
+    def test_crs_key(self):
+
+        self.assertEqual(crs_key(32618), 'EPSG:32618')
+        self.assertEqual(crs_key(' epsg:32618 '), 'epsg:32618')
+        self.assertEqual(crs_key({'proj': 'longlat', 'datum': 'WGS84', 'no_defs': True}), '+datum=WGS84 +no_defs +proj=longlat')
+
+        with self.assertRaises(TypeError):
+            crs_key(1.5)
+
+    def test_crs_equal(self):
+
+        self.assertTrue(crs_equal(4326, 'epsg:4326'))
+        self.assertTrue(crs_equal(CRS.from_epsg(32618), pyproj.CRS.from_epsg(32618)))
+        self.assertTrue(crs_equal(CRS.from_epsg(32618), CRS.from_epsg(32618).to_wkt()))
+        self.assertFalse(crs_equal(32618, 32619))
+
+    def test_get_transformer(self):
+
+        # Transformers are cached by CRS
+        self.assertIs(get_transformer('epsg:4326', 32618), get_transformer('epsg:4326', 32618))
+
+        # A missing CRS is the geographic CRS of the other
+        transformer = get_transformer(32618, None)
+
+        self.assertTrue(crs_equal(transformer.target_crs, pyproj.CRS.from_epsg(32618).geodetic_crs))
+
+    def test_transform_coords(self):
+
+        # The central meridian of UTM zone 18N is -75 degrees
+        x, y = transform_coords(500000.0, 0.0, 32618, 4326)
+
+        self.assertAlmostEqual(x, -75.0)
+        self.assertAlmostEqual(y, 0.0)
+
+        x, y = transform_coords([-75.0, -75.0], [0.0, 10.0], 4326, 32618)
+
+        self.assertIsInstance(x, np.ndarray)
+        self.assertTrue(np.allclose(x, 500000.0))
+        self.assertAlmostEqual(y[0], 0.0)
+        self.assertTrue(y[1] > 1e6)
+
+        # Round trip
+        lon, lat = transform_coords(x, y, 32618, 4326)
+
+        self.assertTrue(np.allclose(lon, -75.0))
+        self.assertTrue(np.allclose(lat, [0.0, 10.0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,286 @@
+import os
+import threading
+import unittest
+from pathlib import Path
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+from geowombat.util.download import DownloadManager, DownloadTask, LocalTransport, HTTPTransport, Transport, \
+    PART_SUFFIX, REQUESTS_INSTALLED
+
+from .common import TempDirMixin
+
+
+class FlakyTransport(LocalTransport):
+
+    """
+    A local transport that copies the next few bytes of a file and then fails, ``n_failures`` times per file
+
+    Transports that cannot resume write junk instead, which must be discarded before the next attempt.
+    """
+
+    def __init__(self, root, n_failures=1, resumable=True):
+
+        super(FlakyTransport, self).__init__(root)
+
+        self.n_failures = n_failures
+        self.resumable = resumable
+        self.calls = {}
+
+    def fetch(self, src, dst):
+
+        self.calls[src] = self.calls.get(src, 0) + 1
+
+        if self.calls[src] <= self.n_failures:
+
+            offset = os.path.getsize(dst) if os.path.isfile(dst) else 0
+
+            with open(dst, mode='ab') as f:
+                f.write(self.path(src).read_bytes()[offset:offset+4] if self.resumable else b'junk')
+
+            raise IOError('connection reset')
+
+        super(FlakyTransport, self).fetch(src, dst)
+
+
+class CountingTransport(LocalTransport):
+
+    """
+    A local transport that counts transfers
+    """
+
+    def __init__(self, root):
+
+        super(CountingTransport, self).__init__(root)
+
+        self.n_fetches = 0
+
+    def fetch(self, src, dst):
+
+        self.n_fetches += 1
+
+        super(CountingTransport, self).fetch(src, dst)
+
+
+class ShortTransport(Transport):
+
+    """
+    A transport that always writes fewer bytes than it reports
+    """
+
+    def fetch(self, src, dst):
+
+        with open(dst, mode='wb') as f:
+            f.write(b'abc')
+
+    def size(self, src):
+        return 10
+
+
+class TestDownloadManager(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestDownloadManager, self).setUp()
+
+        self.root = self.tmp.joinpath('bucket')
+        self.root.joinpath('scene').mkdir(parents=True)
+
+        self.contents = {}
+
+        for band in ['B1', 'B2', 'B3']:
+
+            content = band.encode('utf-8') + bytes(range(256))
+            self.root.joinpath('scene', band + '.TIF').write_bytes(content)
+            self.contents[band] = content
+
+        self.tasks = [DownloadTask(src='gs://scene/{}.TIF'.format(band),
+                                   dst=self.file('out/{}.TIF'.format(band)))
+                      for band in sorted(self.contents)]
+
+    def test_download(self):
+
+        status = DownloadManager(transport=LocalTransport(str(self.root)), n_workers=2).download(self.tasks)
+
+        self.assertEqual(set(status.values()), {'done'})
+
+        for band, content in self.contents.items():
+            self.assertEqual(Path(self.file('out/{}.TIF'.format(band))).read_bytes(), content)
+
+    def test_skip_existing(self):
+
+        os.makedirs(self.file('out'))
+        Path(self.file('out/B1.TIF')).write_bytes(b'existing')
+
+        status = DownloadManager(transport=LocalTransport(str(self.root))).download(self.tasks)
+
+        self.assertEqual(status[self.file('out/B1.TIF')], 'skipped')
+        self.assertEqual(Path(self.file('out/B1.TIF')).read_bytes(), b'existing')
+
+    def test_retry_resumes(self):
+
+        transport = FlakyTransport(str(self.root), n_failures=2)
+
+        status = DownloadManager(transport=transport, retries=2, backoff=0).download(self.tasks)
+
+        self.assertEqual(set(status.values()), {'done'})
+
+        for band, content in self.contents.items():
+
+            # Each attempt continues from the partial file
+            self.assertEqual(Path(self.file('out/{}.TIF'.format(band))).read_bytes(), content)
+            self.assertEqual(transport.calls['gs://scene/{}.TIF'.format(band)], 3)
+
+    def test_retry_restarts(self):
+
+        transport = FlakyTransport(str(self.root), n_failures=1, resumable=False)
+
+        status = DownloadManager(transport=transport, retries=1, backoff=0).download(self.tasks)
+
+        self.assertEqual(set(status.values()), {'done'})
+
+        for band, content in self.contents.items():
+            self.assertEqual(Path(self.file('out/{}.TIF'.format(band))).read_bytes(), content)
+
+    def test_failed(self):
+
+        transport = FlakyTransport(str(self.root), n_failures=5)
+
+        status = DownloadManager(transport=transport, retries=1, backoff=0).download(self.tasks[:1])
+
+        self.assertEqual(status[self.tasks[0].dst], 'failed')
+        self.assertFalse(os.path.isfile(self.tasks[0].dst))
+
+    def test_complete_part(self):
+
+        # The process stopped after the transfer, but before the rename
+        os.makedirs(self.file('out'))
+        Path(self.tasks[0].dst + PART_SUFFIX).write_bytes(self.contents['B1'])
+
+        transport = CountingTransport(str(self.root))
+
+        status = DownloadManager(transport=transport, retries=0).download(self.tasks[:1])
+
+        self.assertEqual(status[self.tasks[0].dst], 'done')
+        self.assertEqual(transport.n_fetches, 0)
+        self.assertEqual(Path(self.tasks[0].dst).read_bytes(), self.contents['B1'])
+        self.assertFalse(os.path.isfile(self.tasks[0].dst + PART_SUFFIX))
+
+    def test_larger_part(self):
+
+        os.makedirs(self.file('out'))
+        Path(self.tasks[0].dst + PART_SUFFIX).write_bytes(self.contents['B1'] + b'junk')
+
+        status = DownloadManager(transport=LocalTransport(str(self.root)), retries=0).download(self.tasks[:1])
+
+        self.assertEqual(status[self.tasks[0].dst], 'done')
+        self.assertEqual(Path(self.tasks[0].dst).read_bytes(), self.contents['B1'])
+
+    def test_incomplete(self):
+
+        status = DownloadManager(transport=ShortTransport(), retries=1, backoff=0).download(self.tasks[:1])
+
+        self.assertEqual(status[self.tasks[0].dst], 'failed')
+        self.assertFalse(os.path.isfile(self.tasks[0].dst))
+        self.assertTrue(os.path.isfile(self.tasks[0].dst + PART_SUFFIX))
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+
+    """
+    Serves ``content`` with single open-ended range requests, like a storage bucket
+    """
+
+    content = b''
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(self.content)))
+        self.end_headers()
+
+    def do_GET(self):
+
+        offset = int(self.headers['Range'][len('bytes='):-1]) if 'Range' in self.headers else 0
+
+        if offset >= len(self.content):
+
+            self.send_response(416)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+            return
+
+        body = self.content[offset:]
+
+        self.send_response(206 if offset > 0 else 200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@unittest.skipUnless(REQUESTS_INSTALLED, 'requests is not installed')
+class TestHTTPTransport(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestHTTPTransport, self).setUp()
+
+        RangeHandler.content = b'B1' + bytes(range(256))
+
+        self.server = HTTPServer(('127.0.0.1', 0), RangeHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+        self.transport = HTTPTransport(prefix_map={'gs://': 'http://127.0.0.1:{:d}/'.format(self.server.server_port)})
+        self.part = self.file('B1.TIF' + PART_SUFFIX)
+
+    def tearDown(self):
+
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+        super(TestHTTPTransport, self).tearDown()
+
+    def test_resume(self):
+
+        Path(self.part).write_bytes(RangeHandler.content[:100])
+
+        self.transport.fetch('gs://scene/B1.TIF', self.part)
+
+        self.assertEqual(Path(self.part).read_bytes(), RangeHandler.content)
+
+    def test_complete_part(self):
+
+        # The server answers 416 to a range that starts at the end of the file
+        Path(self.part).write_bytes(RangeHandler.content)
+
+        self.transport.fetch('gs://scene/B1.TIF', self.part)
+
+        self.assertEqual(Path(self.part).read_bytes(), RangeHandler.content)
+
+        status = DownloadManager(transport=self.transport, retries=0).download([DownloadTask(src='gs://scene/B1.TIF',
+                                                                                             dst=self.file('B1.TIF'))])
+
+        self.assertEqual(status[self.file('B1.TIF')], 'done')
+        self.assertEqual(Path(self.file('B1.TIF')).read_bytes(), RangeHandler.content)
+
+
+class TestLocalTransport(TempDirMixin, unittest.TestCase):
+
+    def test_list(self):
+
+        self.tmp.joinpath('LC08', '042').mkdir(parents=True)
+        self.tmp.joinpath('LC08', '042', 'B1.TIF').write_bytes(b'1')
+        self.tmp.joinpath('LC08', '042', 'B2.TIF').write_bytes(b'2')
+
+        lines = LocalTransport(str(self.tmp)).list('gs://LC08/*')
+
+        self.assertEqual(lines, ['gs://LC08/042/:', 'gs://LC08/042/B1.TIF', 'gs://LC08/042/B2.TIF', ''])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,378 @@
+import os
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import geowombat as gw
+
+import numpy as np
+import rasterio as rio
+from rasterio.enums import Resampling
+from rasterio.errors import RasterBlockError
+
+from .common import TempDirMixin, index_values, read_raster, write_raster
+
+
+class TestPipeline(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestPipeline, self).setUp()
+
+        self.values = index_values(nbands=2, nrows=80, ncols=72)
+        self.filename = write_raster(self.file('image.tif'), self.values)
+
+    def _write(self, out_file, **kwargs):
+
+        with gw.open(self.filename, chunks=16) as src:
+
+            gw.to_raster(src,
+                         out_file,
+                         dtype='uint16',
+                         n_workers=2,
+                         n_threads=1,
+                         **kwargs)
+
+        return read_raster(out_file)
+
+    def test_pipeline_threads(self):
+
+        data = self._write(self.file('pipeline.tif'), pipeline=True, scheduler='threads', n_readers=2, queue_size=(2, 4))
+
+        self.assertTrue(np.array_equal(data, self.values))
+
+    def test_pipeline_processes(self):
+
+        data = self._write(self.file('pipeline.tif'), pipeline=True, scheduler='processes')
+
+        self.assertTrue(np.array_equal(data, self.values))
+
+    def test_pipeline_matches_pool(self):
+
+        data_pipeline = self._write(self.file('pipeline.tif'), pipeline=True, scheduler='threads')
+        data_pool = self._write(self.file('pool.tif'), scheduler='threads')
+
+        self.assertTrue(np.array_equal(data_pipeline, data_pool))
+
+
+def _parse_window_key(wkey):
+
+    # Keys are formatted as y<row>_x<column>_h<height>_w<width>
+    return [int(part[1:]) for part in wkey.split('_')]
+
+
+def _fail_below(data, row):
+
+    """
+    Returns a copy of ``data`` that raises on blocks below ``row``, as if the write crashed
+    """
+
+    def _block_func(block, block_info=None):
+
+        if block_info[0]['array-location'][-2][0] >= row:
+            raise RuntimeError('crash')
+
+        return block
+
+    return data.copy(data=data.data.map_blocks(_block_func, dtype=data.dtype))
+
+
+class TestResume(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestResume, self).setUp()
+
+        self.values = index_values(nbands=2, nrows=80, ncols=72)
+        self.filename = write_raster(self.file('image.tif'), self.values)
+        self.out_file = self.file('output.tif')
+        self.journal_file = Path(self.out_file + '.journal')
+
+    def _check_resume(self, **kwargs):
+
+        with gw.open(self.filename, chunks=8) as src:
+
+            with self.assertRaises(RuntimeError):
+
+                gw.to_raster(_fail_below(src, 72),
+                             self.out_file,
+                             dtype='uint16',
+                             resume=True,
+                             **kwargs)
+
+        self.assertTrue(self.journal_file.is_file())
+
+        with open(str(self.journal_file), mode='r') as jf:
+            completed = [line.strip() for line in jf if line.strip()]
+
+        # The pipeline queues are bounded, so the writer reaches at least one checkpoint before the crash
+        self.assertTrue(len(completed) > 0)
+
+        # Every journaled window is on disk
+        data = read_raster(self.out_file)
+
+        for wkey in completed:
+
+            row_off, col_off, height, width = _parse_window_key(wkey)
+
+            self.assertTrue(row_off < 72)
+            self.assertTrue(np.array_equal(data[:, row_off:row_off+height, col_off:col_off+width],
+                                           self.values[:, row_off:row_off+height, col_off:col_off+width]))
+
+        # Resume with the same call
+        with gw.open(self.filename, chunks=8) as src:
+
+            gw.to_raster(src,
+                         self.out_file,
+                         dtype='uint16',
+                         resume=True,
+                         **kwargs)
+
+        self.assertFalse(self.journal_file.is_file())
+        self.assertTrue(np.array_equal(read_raster(self.out_file), self.values))
+
+    def test_resume(self):
+        self._check_resume(n_workers=1)
+
+    def test_resume_pipeline(self):
+        self._check_resume(n_workers=2, n_threads=1, scheduler='threads', pipeline=True)
+
+    def test_crash_after_create(self):
+
+        # The run stops after the output is created, before any window is written
+        with mock.patch('geowombat.core.io.create_overviews', side_effect=RuntimeError('crash')):
+
+            with gw.open(self.filename, chunks=8) as src:
+
+                with self.assertRaises(RuntimeError):
+                    gw.to_raster(src, self.out_file, dtype='uint16', resume=True, overviews=[2])
+
+        self.assertTrue(os.path.isfile(self.out_file))
+        self.assertTrue(self.journal_file.is_file())
+
+        # The output has no overviews, so the rerun writes it again
+        with gw.open(self.filename, chunks=8) as src:
+            gw.to_raster(src, self.out_file, dtype='uint16', resume=True, overviews=[2])
+
+        self.assertFalse(self.journal_file.is_file())
+        self.assertTrue(np.array_equal(read_raster(self.out_file), self.values))
+
+        with rio.open(self.out_file) as src:
+            self.assertEqual(src.overviews(1), [2])
+
+
+def _allocated_blocks(filename):
+
+    """
+    Gets the (row, column) indices of the allocated blocks of the first band
+    """
+
+    allocated = []
+
+    with rio.open(filename) as src:
+
+        for (i, j), __ in src.block_windows(1):
+
+            try:
+
+                if src.block_size(1, i, j) > 0:
+                    allocated.append((i, j))
+
+            except RasterBlockError:
+                pass
+
+    return allocated
+
+
+class TestSkipEmpty(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestSkipEmpty, self).setUp()
+
+        # The top half is empty
+        self.values = index_values(nbands=1, nrows=64, ncols=64)
+        self.values[:, :32] = 0
+
+        self.filename = write_raster(self.file('image.tif'), self.values, nodata=0)
+
+    def _write(self, out_file, src, **kwargs):
+
+        gw.to_raster(src,
+                     out_file,
+                     blockxsize=16,
+                     blockysize=16,
+                     skip_empty=True,
+                     **kwargs)
+
+        return read_raster(out_file)
+
+    def test_skip_nodata(self):
+
+        out_file = self.file('output.tif')
+
+        # A single image has no footprint grid
+        with gw.open(self.filename, chunks=16) as src:
+            data = self._write(out_file, src, dtype='uint16', nodata=0, n_workers=1)
+
+        self.assertTrue(np.array_equal(data, self.values))
+
+        # Only the bottom half is allocated
+        self.assertEqual(sorted(_allocated_blocks(out_file)), [(i, j) for i in range(2, 4) for j in range(0, 4)])
+
+    def test_skip_processes(self):
+
+        out_file = self.file('output.tif')
+
+        with gw.open(self.filename, chunks=16) as src:
+            data = self._write(out_file, src, dtype='uint16', nodata=0, n_workers=2, scheduler='processes')
+
+        # Several writer processes need a pre-allocated (not sparse) file
+        self.assertTrue(np.array_equal(data, self.values))
+        self.assertEqual(len(_allocated_blocks(out_file)), 16)
+
+    def test_no_nodata(self):
+
+        out_file = self.file('output.tif')
+
+        with gw.open(self.filename, chunks=16) as src:
+
+            src_nan = src.astype('float32').where(src != 0)
+            src_nan.attrs = src.attrs.copy()
+
+            # NaNs are data without a 'no data' value, so no windows are skipped
+            data = self._write(out_file, src_nan, dtype='float32', n_workers=1)
+
+        self.assertTrue(np.isnan(data[:, :32]).all())
+        self.assertTrue(np.array_equal(data[:, 32:], self.values[:, 32:].astype('float32')))
+        self.assertEqual(len(_allocated_blocks(out_file)), 16)
+
+
+class TestThreadLimits(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestThreadLimits, self).setUp()
+
+        self.filename = write_raster(self.file('image.tif'), index_values(nbands=1, nrows=32, ncols=32))
+        self.gdal_env = os.environ.get('GDAL_NUM_THREADS')
+
+    def tearDown(self):
+
+        if self.gdal_env is None:
+            os.environ.pop('GDAL_NUM_THREADS', None)
+        else:
+            os.environ['GDAL_NUM_THREADS'] = self.gdal_env
+
+        super(TestThreadLimits, self).tearDown()
+
+    def test_restore_limits(self):
+
+        os.environ['GDAL_NUM_THREADS'] = 'ALL_CPUS'
+
+        with gw.open(self.filename, chunks=16) as src:
+            gw.to_raster(src, self.file('output.tif'), dtype='uint16', n_workers=2, n_threads=1, scheduler='threads', max_threads=2)
+
+        self.assertEqual(os.environ['GDAL_NUM_THREADS'], 'ALL_CPUS')
+
+        del os.environ['GDAL_NUM_THREADS']
+
+        with gw.open(self.filename, chunks=16) as src:
+            gw.to_raster(src, self.file('output2.tif'), dtype='uint16', n_workers=1, n_threads=1)
+
+        self.assertNotIn('GDAL_NUM_THREADS', os.environ)
+
+
+def _read_overviews(filename):
+
+    with rio.open(filename) as src:
+        n_levels = len(src.overviews(1))
+
+    levels = []
+
+    for level in range(0, n_levels):
+
+        with rio.open(filename, overview_level=level) as src:
+            levels.append(src.read())
+
+    return levels
+
+
+class TestOverviews(TempDirMixin, unittest.TestCase):
+
+    factors = [2, 4, 8]
+
+    def setUp(self):
+
+        super(TestOverviews, self).setUp()
+
+        values = np.random.RandomState(0).rand(2, 64, 48) * 10000
+
+        self.values = {'uint16': values.astype('uint16'), 'float32': values.astype('float32')}
+
+    def _reference(self, dtype, resampling):
+
+        # Overviews built by GDAL from the full output
+        filename = write_raster(self.file('reference_{}.tif'.format(dtype)), self.values[dtype])
+
+        with rio.open(filename, mode='r+') as dst:
+            dst.build_overviews(self.factors, getattr(Resampling, resampling))
+
+        return _read_overviews(filename)
+
+    def _write(self, out_file, dtype, resampling, **kwargs):
+
+        in_file = write_raster(self.file('image_{}.tif'.format(dtype)), self.values[dtype])
+
+        with gw.open(in_file, chunks=16) as src:
+            gw.to_raster(src, out_file, dtype=dtype, overviews=self.factors, resampling=resampling, **kwargs)
+
+        with rio.open(out_file) as src:
+            self.assertEqual(src.overviews(1), self.factors)
+
+        self.assertTrue(np.array_equal(read_raster(out_file), self.values[dtype]))
+
+        return _read_overviews(out_file)
+
+    def _assert_nearest(self, **kwargs):
+
+        reference = self._reference('uint16', 'nearest')
+        levels = self._write(self.file('output.tif'), 'uint16', 'nearest', **kwargs)
+
+        for level, reference_level in zip(levels, reference):
+            self.assertTrue(np.array_equal(level, reference_level))
+
+    def test_nearest_single_worker(self):
+        self._assert_nearest(n_workers=1, n_threads=1)
+
+    def test_nearest_processes(self):
+        self._assert_nearest(n_workers=2, n_threads=1)
+
+    def test_nearest_threads(self):
+        self._assert_nearest(n_workers=2, n_threads=1, scheduler='threads')
+
+    def test_nearest_pipeline(self):
+        self._assert_nearest(n_workers=2, n_threads=1, pipeline=True, scheduler='threads')
+
+    def test_average(self):
+
+        reference = self._reference('float32', 'average')
+        levels = self._write(self.file('output.tif'), 'float32', 'average', n_workers=2, n_threads=1)
+
+        for level, reference_level in zip(levels, reference):
+            self.assertTrue(np.allclose(level, reference_level, rtol=1e-5))
+
+    def test_average_integer(self):
+
+        reference = self._reference('uint16', 'average')
+        levels = self._write(self.file('output.tif'), 'uint16', 'average', n_workers=2, n_threads=1)
+
+        self.assertTrue(np.array_equal(levels[0], reference[0]))
+
+        # GDAL averages coarser levels from the previous rounded level, so they can differ by one
+        for level, reference_level in zip(levels[1:], reference[1:]):
+            self.assertLessEqual(np.abs(level.astype('int64') - reference_level).max(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import sys
+import unittest
+import subprocess
+
+
+def _run(code):
+
+    """
+    Runs code in a new interpreter, so that no geowombat modules are imported beforehand
+    """
+
+    proc = subprocess.run([sys.executable, '-c', code],
+                          stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE,
+                          check=True)
+
+    return proc.stdout.decode('utf-8').split()
+
+
+class TestLazyImport(unittest.TestCase):
+
+    def test_accessor(self):
+
+        # The accessors are registered without using the API
+        output = _run('import xarray as xr; import geowombat; '
+                      'print(hasattr(xr.DataArray, "gw"), hasattr(xr.Dataset, "gw"))')
+
+        self.assertEqual(output, ['True', 'True'])
+
+    def test_accessor_instance(self):
+
+        output = _run('import numpy as np; import xarray as xr; import geowombat; '
+                      'data = xr.DataArray(np.zeros((1, 2, 2)), dims=("band", "y", "x")); '
+                      'print(type(data.gw).__name__, data.gw.nrows)')
+
+        self.assertEqual(output, ['GeoWombatAccessor', '2'])
+
+    def test_submodule_names(self):
+
+        # The geowombat.moving package is imported by gw.open, before gw.moving is resolved
+        output = _run('import inspect; import geowombat as gw; import geowombat.moving; gw.open; '
+                      'import geowombat.core.compositing, geowombat.core.prediction; '
+                      'print(*[inspect.isfunction(f) or inspect.ismethod(f) '
+                      'for f in [gw.moving, gw.composite, gw.predict, gw.core.composite, gw.core.predict]])')
+
+        self.assertEqual(output, ['True'] * 5)
+
+    def test_moving_window(self):
+
+        # The subpackage is still importable by name
+        output = _run('from geowombat.moving import moving_window; print(callable(moving_window))')
+
+        self.assertEqual(output, ['True'])
+
+
+if __name__ == '__main__':
+    unittest.main()
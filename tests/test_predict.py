@@ -0,0 +1,95 @@
+import unittest
+
+import geowombat as gw
+
+import numpy as np
+
+from .common import TempDirMixin, index_values, write_raster, read_raster
+
+
+class ThresholdModel(object):
+
+    """
+    A fitted model stand-in that labels pixels by the first feature
+    """
+
+    classes_ = np.array([1, 2])
+
+    def predict(self, X):
+        return np.where(X[:, 0] > 2048, 2, 1)
+
+    def predict_proba(self, X):
+
+        p = (X[:, 0] > 2048).astype('float64')
+
+        return np.stack((1.0 - p, p), axis=1)
+
+
+class TestPredict(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestPredict, self).setUp()
+
+        self.values = index_values(nbands=2, nrows=64, ncols=64)
+
+        # The 'no data' rows
+        self.values[:, :3] = 0
+
+        self.filename = write_raster(self.file('image.tif'), self.values)
+        self.expected = np.where(self.values[0] > 2048, 2, 1)
+        self.expected[:3] = 0
+
+    def test_predict(self):
+
+        with gw.open(self.filename, chunks=16) as src:
+            pred = gw.predict(src, ThresholdModel(), nodata=0)
+
+        self.assertEqual(pred.shape, (1, 64, 64))
+        self.assertEqual(pred.dtype, 'uint8')
+        self.assertTrue(np.array_equal(pred.data.compute()[0], self.expected))
+
+    def test_predict_to_file(self):
+
+        with gw.open(self.filename, chunks=16) as src:
+            gw.predict(src, ThresholdModel(), outname=self.file('pred.tif'), nodata=0, dtype='int16', n_jobs=2)
+
+        values = read_raster(self.file('pred.tif'))
+
+        self.assertEqual(values.dtype, 'int16')
+        self.assertTrue(np.array_equal(values[0], self.expected))
+
+    def test_predict_proba_to_file(self):
+
+        with gw.open(self.filename, chunks=16) as src:
+
+            gw.predict(src,
+                       ThresholdModel(),
+                       outname=self.file('proba.tif'),
+                       nodata=0,
+                       proba=True,
+                       scale=100,
+                       n_jobs=2,
+                       n_threads=2,
+                       backend='threads')
+
+        values = read_raster(self.file('proba.tif'))
+
+        self.assertEqual(values.shape, (2, 64, 64))
+        self.assertEqual(values.dtype, 'uint8')
+        self.assertTrue(np.all(values[:, :3] == 255))
+        self.assertTrue(np.array_equal(values[1, 3:], np.where(self.expected[3:] == 2, 100, 0)))
+
+    def test_accessor_config_nodata(self):
+
+        # The configured 'no data' value is not passed twice
+        with gw.config.update(nodata=0):
+
+            with gw.open(self.filename, chunks=16) as src:
+                src.gw.predict(ThresholdModel(), outname=self.file('pred.tif'), dtype='int16')
+
+        self.assertTrue(np.array_equal(read_raster(self.file('pred.tif'))[0], self.expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import unittest
+
+import geowombat as gw
+from geowombat.core.profiling import WindowProfiler, window_record
+
+from .common import TempDirMixin, index_values, write_raster
+
+
+class TestWindowProfiler(TempDirMixin, unittest.TestCase):
+
+    def test_summary(self):
+
+        profiler = WindowProfiler()
+
+        # Stages of the same window can be added separately
+        for i in range(0, 4):
+
+            profiler.add(window_record('w{:d}'.format(i), read=(0.0, 1.0), bytes_read=1000))
+            profiler.add(window_record('w{:d}'.format(i), compute=(1.0, 1.0 + i), write=(2.0, 2.5), bytes_written=500))
+
+        profiler.close()
+
+        stats = profiler.summary()
+
+        self.assertEqual(stats['n_windows'], 4)
+        self.assertEqual(stats['n_workers'], 1)
+        self.assertEqual(stats['read']['n'], 4)
+        self.assertAlmostEqual(stats['compute']['total'], 6.0)
+        self.assertAlmostEqual(stats['compute']['max'], 3.0)
+        self.assertAlmostEqual(stats['write']['p50'], 0.5)
+        self.assertEqual(stats['bytes_read'], 4000)
+        self.assertEqual(stats['bytes_written'], 2000)
+
+    def test_chrome_trace(self):
+
+        trace_file = self.file('trace.json')
+
+        profiler = WindowProfiler(trace_file=trace_file)
+        profiler.add(window_record('w0', read=(profiler.start, profiler.start + 0.5)))
+        profiler.close()
+
+        with open(trace_file, mode='r') as tf:
+            events = json.load(tf)['traceEvents']
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]['name'], 'read')
+        self.assertEqual(events[0]['ph'], 'X')
+        self.assertAlmostEqual(events[0]['dur'], 0.5e6)
+        self.assertEqual(events[0]['args']['window'], 'w0')
+
+    def test_instrument_to_raster(self):
+
+        filename = write_raster(self.file('image.tif'), index_values(nbands=1, nrows=64, ncols=64))
+        trace_file = self.file('trace.json')
+
+        with gw.open(filename, chunks=16) as src:
+            gw.to_raster(src, self.file('output.tif'), dtype='uint16', n_workers=1, instrument=trace_file)
+
+        with open(trace_file, mode='r') as tf:
+            events = json.load(tf)['traceEvents']
+
+        # Every window is written
+        self.assertEqual(len(set(e['args']['window'] for e in events if e['name'] == 'write')), 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+import geowombat as gw
+
+import geopandas as gpd
+from shapely.geometry import Point
+
+from .common import TempDirMixin, CRS_UTM, CELL_SIZE, LEFT, TOP, index_values, write_raster
+
+
+class TestChunkGrid(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestChunkGrid, self).setUp()
+
+        self.filename = write_raster(self.file('image.tif'), index_values(nbands=1, nrows=64, ncols=56))
+
+    def test_chunk_grid(self):
+
+        with gw.open(self.filename, chunks=16) as src:
+
+            grid = src.gw.chunk_grid
+
+            # 4 row chunks x 4 column chunks, where the last column chunk is 8 pixels wide
+            self.assertEqual(len(grid), 16)
+            self.assertEqual(grid.chunk.tolist(), list(range(1, 17)))
+            self.assertEqual(grid.row_chunk.tolist()[:5], [0, 0, 0, 0, 1])
+            self.assertEqual(grid.col_chunk.tolist()[:5], [0, 1, 2, 3, 0])
+            self.assertEqual(grid.width.tolist()[:4], [16, 16, 16, 8])
+
+            chunk = grid.iloc[5]
+
+            self.assertEqual((chunk.row_off, chunk.col_off), (16, 16))
+            self.assertEqual(chunk.geometry.bounds, (LEFT + 16 * CELL_SIZE,
+                                                     TOP - 32 * CELL_SIZE,
+                                                     LEFT + 32 * CELL_SIZE,
+                                                     TOP - 16 * CELL_SIZE))
+
+            # The grid is cached until the chunks change
+            self.assertIs(src.gw.chunk_grid, grid)
+
+    def test_chunk_grid_rechunk(self):
+
+        with gw.open(self.filename, chunks=16) as src:
+
+            self.assertEqual(len(src.gw.chunk_grid), 16)
+            self.assertEqual(len(src.chunk({'y': 32, 'x': 32}).gw.chunk_grid), 4)
+
+    def test_chunks_intersecting(self):
+
+        with gw.open(self.filename, chunks=16) as src:
+
+            # A point inside of chunk (row 2, column 1)
+            point = Point(LEFT + 20 * CELL_SIZE, TOP - 40 * CELL_SIZE)
+
+            chunks = src.gw.chunks_intersecting(point)
+
+            self.assertEqual(chunks.chunk.tolist(), [10])
+
+            # Geometries in another CRS are transformed
+            df = gpd.GeoDataFrame(geometry=[point.buffer(10 * CELL_SIZE)], crs=CRS_UTM).to_crs('epsg:4326')
+
+            chunks = src.gw.chunks_intersecting(df)
+
+            self.assertEqual(sorted(chunks.chunk.tolist()), [5, 6, 9, 10, 13, 14])
+
+    def test_footprint_grid(self):
+
+        # A single image has no footprint grid
+        with gw.open(self.filename, chunks=16) as src:
+            self.assertIsNone(src.gw.footprint_grid)
+
+
+if __name__ == '__main__':
+    unittest.main()
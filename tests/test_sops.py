@@ -0,0 +1,153 @@
+import unittest
+
+import geowombat as gw
+
+import numpy as np
+import geopandas as gpd
+from shapely.geometry import Point, box
+
+from .common import TempDirMixin, CRS_UTM, CELL_SIZE, LEFT, TOP, index_values, write_raster
+
+
+class TestSubset(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestSubset, self).setUp()
+
+        self.values = index_values(nbands=2, nrows=64, ncols=64)
+        self.filename = write_raster(self.file('image.tif'), self.values)
+
+    def test_subset_offsets(self):
+
+        with gw.open(self.filename, chunks=16) as src:
+
+            # The upper left corner falls inside pixel (row 7, column 5)
+            ds_sub = gw.subset(src,
+                               left=LEFT + 5 * CELL_SIZE + 1.0,
+                               top=TOP - 7 * CELL_SIZE - 1.0,
+                               rows=10,
+                               cols=12)
+
+            self.assertEqual(ds_sub.shape, (2, 10, 12))
+            self.assertTrue(np.array_equal(ds_sub.data.compute(), self.values[:, 7:17, 5:17]))
+            self.assertEqual(ds_sub.gw.transform[2], LEFT + 5 * CELL_SIZE)
+            self.assertEqual(ds_sub.gw.transform[5], TOP - 7 * CELL_SIZE)
+
+            # Slicing keeps the source chunk boundaries
+            self.assertEqual(ds_sub.data.chunks[1], (9, 1))
+            self.assertEqual(ds_sub.data.chunks[2], (11, 1))
+
+    def test_subset_bounds(self):
+
+        with gw.open(self.filename, chunks=16) as src:
+
+            ds_sub = gw.subset(src,
+                               left=LEFT + 20 * CELL_SIZE,
+                               top=TOP - 30 * CELL_SIZE,
+                               right=LEFT + 36 * CELL_SIZE,
+                               bottom=TOP - 40 * CELL_SIZE)
+
+            self.assertTrue(np.array_equal(ds_sub.data.compute(), self.values[:, 30:40, 20:36]))
+
+    def test_subset_edges(self):
+
+        with gw.open(self.filename, chunks=16) as src:
+
+            # Centered on the upper left pixel, so the subset is cut at the image edge
+            ds_sub = gw.subset(src,
+                               left=LEFT,
+                               top=TOP,
+                               rows=8,
+                               cols=8,
+                               center=True)
+
+            self.assertTrue(np.array_equal(ds_sub.data.compute(), self.values[:, :4, :4]))
+            self.assertEqual(ds_sub.gw.transform[2], LEFT)
+            self.assertEqual(ds_sub.gw.transform[5], TOP)
+
+
+class TestClip(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestClip, self).setUp()
+
+        self.values = index_values(nbands=1, nrows=32, ncols=32)
+        self.filename = write_raster(self.file('image.tif'), self.values)
+
+        # A polygon inside of columns 3-7 and rows 4-8
+        self.df = gpd.GeoDataFrame(geometry=[box(LEFT + 3 * CELL_SIZE + 1.0,
+                                                 TOP - 9 * CELL_SIZE + 1.0,
+                                                 LEFT + 8 * CELL_SIZE - 1.0,
+                                                 TOP - 4 * CELL_SIZE - 1.0)],
+                                   crs=CRS_UTM)
+
+    def test_clip_offsets(self):
+
+        with gw.open(self.filename, chunks=16) as src:
+
+            ds_clip = gw.clip(src, self.df)
+
+            self.assertTrue(np.array_equal(ds_clip.data.compute(), self.values[:, 4:9, 3:8]))
+            self.assertEqual(ds_clip.gw.transform[2], LEFT + 3 * CELL_SIZE)
+            self.assertEqual(ds_clip.gw.transform[5], TOP - 4 * CELL_SIZE)
+
+    def test_clip_mask(self):
+
+        with gw.open(self.filename, chunks=16) as src:
+
+            ds_clip = gw.clip(src, self.df, mask_data=True)
+
+            self.assertFalse(bool(ds_clip.isnull().any()))
+            self.assertTrue(np.array_equal(ds_clip.data.compute(), self.values[:, 4:9, 3:8]))
+
+
+class TestExtractTimeseries(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestExtractTimeseries, self).setUp()
+
+        self.values = [index_values(nbands=2, nrows=32, ncols=32),
+                       index_values(nbands=2, nrows=32, ncols=32) * 2]
+
+        # The second image is shifted 10 columns to the right
+        self.files = [write_raster(self.file('image1.tif'), self.values[0]),
+                      write_raster(self.file('image2.tif'), self.values[1], left=LEFT + 10 * CELL_SIZE)]
+
+        # Pixel (row 3, column 12) and (row 20, column 5) of the first image
+        self.df = gpd.GeoDataFrame(data={'id': [10, 20]},
+                                   geometry=[Point(LEFT + 12.5 * CELL_SIZE, TOP - 3.5 * CELL_SIZE),
+                                             Point(LEFT + 5.5 * CELL_SIZE, TOP - 20.5 * CELL_SIZE)],
+                                   crs=CRS_UTM)
+
+    def test_wide(self):
+
+        df = gw.extract_timeseries(self.files, self.df, band_names=['b1', 'b2'], n_workers=2)
+
+        self.assertEqual(df.id.tolist(), [10, 20])
+        self.assertEqual(df.t1_b1.tolist(), [self.values[0][0, 3, 12], self.values[0][0, 20, 5]])
+        self.assertEqual(df.t1_b2.tolist(), [self.values[0][1, 3, 12], self.values[0][1, 20, 5]])
+
+        # The second point is outside of the second image
+        self.assertEqual(df.t2_b1.iloc[0], self.values[1][0, 3, 2])
+        self.assertTrue(np.isnan(df.t2_b1.iloc[1]))
+
+    def test_long(self):
+
+        df = gw.extract_timeseries(self.files,
+                                   self.df.to_crs('epsg:4326'),
+                                   bands=2,
+                                   band_names=['b2'],
+                                   time_names=['2020-01-01', '2020-02-01'],
+                                   layout='long')
+
+        self.assertEqual(df.shape[0], 4)
+        self.assertEqual(df.time.tolist(), ['2020-01-01', '2020-02-01'] * 2)
+        self.assertEqual(df.b2.iloc[0], self.values[0][1, 3, 12])
+        self.assertEqual(df.b2.iloc[1], self.values[1][1, 3, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import time
+import unittest
+import concurrent.futures
+
+from geowombat.util.web import _SceneStatus, _collect_scenes, _group_scenes, _scene_id
+
+from .common import TempDirMixin
+
+
+def _process(result):
+
+    if result == 'error':
+        raise ValueError('bad scene')
+
+    return result
+
+
+def _process_slow(result):
+
+    time.sleep(0.5)
+
+    return result
+
+
+class TestSceneStatus(TempDirMixin, unittest.TestCase):
+
+    def test_mark(self):
+
+        scene_status = _SceneStatus(self.file('scene_status.json'))
+
+        self.assertFalse(scene_status.done('scene1', 'process'))
+
+        scene_status.mark('scene1', 'process', 'done')
+        scene_status.mark('scene2', 'process', 'failed')
+
+        # Reloaded by the next run
+        scene_status = _SceneStatus(self.file('scene_status.json'))
+
+        self.assertTrue(scene_status.done('scene1', 'process'))
+        self.assertFalse(scene_status.done('scene2', 'process'))
+        self.assertFalse(scene_status.done('scene1', 'download'))
+
+    def test_collect(self):
+
+        scene_status = _SceneStatus(self.file('scene_status.json'))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+
+            pending = {executor.submit(_process, 'done'): 'scene1',
+                       executor.submit(_process, 'nodata'): 'scene2',
+                       executor.submit(_process, 'error'): 'scene3'}
+
+            _collect_scenes(pending, scene_status, concurrent.futures.ALL_COMPLETED)
+
+        self.assertFalse(pending)
+        self.assertEqual(scene_status.scenes, {'scene1': {'process': 'done'},
+                                               'scene2': {'process': 'nodata'},
+                                               'scene3': {'process': 'failed'}})
+
+        self.assertTrue(scene_status.done('scene2', 'process'))
+        self.assertFalse(scene_status.done('scene3', 'process'))
+
+    def test_collect_finished(self):
+
+        scene_status = _SceneStatus(self.file('scene_status.json'))
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+
+            future = executor.submit(_process, 'done')
+            future.result()
+
+            pending = {future: 'scene1',
+                       executor.submit(_process_slow, 'done'): 'scene2'}
+
+            # Only the finished scene is recorded, without waiting on the other
+            _collect_scenes(pending, scene_status, concurrent.futures.FIRST_COMPLETED, timeout=0)
+
+            self.assertEqual(list(pending.values()), ['scene2'])
+            self.assertEqual(scene_status.scenes, {'scene1': {'process': 'done'}})
+
+            _collect_scenes(pending, scene_status, concurrent.futures.ALL_COMPLETED)
+
+        self.assertTrue(scene_status.done('scene2', 'process'))
+
+
+class TestGroupScenes(unittest.TestCase):
+
+    def test_landsat(self):
+
+        keys = ['LC08/01/042/034/LC08_L1TP_042034_20161104_20170219_01_T1',
+                'LC08/01/042/034/LC08_L1TP_042034_20161120_20170219_01_T1']
+
+        scenes = _group_scenes(keys)
+
+        self.assertEqual(scenes, {k: [k] for k in keys})
+        self.assertEqual(_scene_id(keys[0]), 'LC08_L1TP_042034_20161104_20170219_01_T1')
+
+    def test_sentinel(self):
+
+        granule1 = 'tiles/21/H/UD/S2A_MSIL1C_20190101T135111_N0207_R024_T21HUD_20190101T153000.SAFE/GRANULE/L1C_T21HUD_A018512_20190101T135534'
+        granule2 = 'tiles/21/H/UD/S2A_MSIL1C_20190111T135111_N0207_R024_T21HUD_20190111T153000.SAFE/GRANULE/L1C_T21HUD_A018655_20190111T135534'
+
+        # The image files of each granule are listed in sub-directories
+        keys = [granule2 + '/IMG_DATA',
+                granule1,
+                granule1 + '/IMG_DATA',
+                granule1 + '/QI_DATA',
+                granule2]
+
+        scenes = _group_scenes(keys)
+
+        self.assertEqual(scenes, {granule1: [granule1, granule1 + '/IMG_DATA', granule1 + '/QI_DATA'],
+                                  granule2: [granule2, granule2 + '/IMG_DATA']})
+        self.assertEqual(_scene_id(granule1), 'L1C_T21HUD_A018512_20190101T135534')
+
+
+if __name__ == '__main__':
+    unittest.main()
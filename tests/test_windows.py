@@ -0,0 +1,82 @@
+import unittest
+
+from geowombat.core.windows import WindowGrid, get_window_offsets
+
+import numpy as np
+from affine import Affine
+from shapely.geometry import Point
+
+
+SHAPES = [(100, 100, 10, 10), (101, 97, 16, 32), (5, 300, 64, 64), (256, 256, 256, 256)]
+
+
+class TestWindowGrid(unittest.TestCase):
+
+    def test_matches_list(self):
+
+        for n_rows, n_cols, row_chunks, col_chunks in SHAPES:
+
+            windows = get_window_offsets(n_rows, n_cols, row_chunks, col_chunks, return_as='list')
+            grid = get_window_offsets(n_rows, n_cols, row_chunks, col_chunks, return_as='grid')
+
+            self.assertIsInstance(grid, WindowGrid)
+            self.assertEqual(len(grid), len(windows))
+            self.assertEqual(grid.to_list(), windows)
+            self.assertEqual(grid[len(grid)-1], windows[-1])
+
+    def test_matches_padded_list(self):
+
+        padding = (2, 3, 4, 5)
+
+        for n_rows, n_cols, row_chunks, col_chunks in SHAPES:
+
+            windows = get_window_offsets(n_rows, n_cols, row_chunks, col_chunks, return_as='list', padding=padding)
+            grid = get_window_offsets(n_rows, n_cols, row_chunks, col_chunks, return_as='grid', padding=padding)
+
+            self.assertEqual(grid.to_list(), windows)
+
+    def test_slicing(self):
+
+        windows = get_window_offsets(101, 97, 16, 32, return_as='list')
+        grid = WindowGrid.from_shape(101, 97, 16, 32)
+
+        self.assertEqual(grid[3:9].to_list(), windows[3:9])
+
+        mask = np.array([i % 3 == 0 for i in range(0, len(windows))])
+
+        self.assertEqual(grid[mask].to_list(), [w for w, m in zip(windows, mask) if m])
+        self.assertEqual(grid[np.array([5, 1])].to_list(), [windows[5], windows[1]])
+
+    def test_keys(self):
+
+        grid = WindowGrid.from_shape(20, 20, 16, 16)
+
+        self.assertEqual(grid.keys().tolist(), ['y000000000_x000000000_h000000016_w000000016',
+                                                'y000000000_x000000016_h000000016_w000000004',
+                                                'y000000016_x000000000_h000000004_w000000016',
+                                                'y000000016_x000000016_h000000004_w000000004'])
+
+    def test_intersects(self):
+
+        transform = Affine(30.0, 0.0, 300000.0, 0.0, -30.0, 4500000.0)
+
+        grid = WindowGrid.from_shape(100, 100, 10, 10)
+
+        bounds = grid.bounds(transform)
+
+        self.assertEqual(tuple(bounds[0]), (300000.0, 4500000.0 - 300.0, 300300.0, 4500000.0))
+
+        # A point in the center of window (row 2, column 3)
+        point = Point(300000.0 + 3 * 300.0 + 150.0, 4500000.0 - 2 * 300.0 - 150.0)
+
+        self.assertEqual(np.flatnonzero(grid.intersects(point, transform)).tolist(), [23])
+
+        # A buffer that reaches into the neighboring windows
+        mask = grid.intersects(point.buffer(200.0), transform)
+
+        self.assertEqual(np.flatnonzero(mask).tolist(), [13, 22, 23, 24, 33])
+        self.assertTrue(grid.intersects_bounds(point.buffer(200.0).bounds, transform)[[12, 14, 32, 34]].all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+
+import geowombat as gw
+
+import numpy as np
+
+from .common import TempDirMixin, CELL_SIZE, LEFT, TOP, index_values, write_raster
+
+
+class TestZarrStore(TempDirMixin, unittest.TestCase):
+
+    def setUp(self):
+
+        super(TestZarrStore, self).setUp()
+
+        self.values = index_values(nbands=3, nrows=40, ncols=56)
+        self.filename = write_raster(self.file('image.tif'), self.values)
+
+    def test_round_trip(self):
+
+        out_file = self.file('image.zarr')
+
+        with gw.open(self.filename, chunks=16) as src:
+
+            gw.to_raster(src,
+                         out_file,
+                         dtype='uint16',
+                         n_workers=2,
+                         n_threads=1,
+                         scheduler='threads')
+
+        with gw.open(out_file) as src:
+
+            self.assertEqual(src.shape, self.values.shape)
+            self.assertTrue(np.array_equal(src.data.compute(), self.values))
+            self.assertEqual(tuple(src.gw.transform)[:6], (CELL_SIZE, 0.0, LEFT, 0.0, -CELL_SIZE, TOP))
+            self.assertEqual(src.gw.nbands, 3)
+
+            # The zarr chunks match the write windows
+            self.assertEqual(src.data.chunks[1][0], 16)
+            self.assertEqual(src.data.chunks[2][0], 16)
+
+    def test_round_trip_chunks(self):
+
+        out_file = self.file('image.zarr')
+
+        with gw.open(self.filename, chunks=16) as src:
+
+            gw.to_raster(src,
+                         out_file,
+                         dtype='uint16',
+                         readxsize=32,
+                         readysize=8)
+
+        with gw.open(out_file) as src:
+
+            self.assertEqual(src.data.chunks[1][0], 8)
+            self.assertEqual(src.data.chunks[2][0], 32)
+
+        with gw.open(out_file, chunks=(20, 20)) as src:
+
+            self.assertEqual(src.data.chunks[1][0], 20)
+            self.assertTrue(np.array_equal(src.data.compute(), self.values))
+
+
+if __name__ == '__main__':
+    unittest.main()